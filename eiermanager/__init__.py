@@ -1,5 +1,7 @@
 # eiermanager/__init__.py
 import os
+import time
+import logging
 from datetime import timedelta
 from flask import Flask, abort
 from flask_login import current_user
@@ -20,6 +22,13 @@ def admin_required(func):
 
 
 def create_app():
+    t_start = time.perf_counter()
+    zeiten = {}
+
+    def _phase(name, t0):
+        zeiten[name] = round((time.perf_counter() - t0) * 1000, 1)
+        return time.perf_counter()
+
     # App + instance/ (DB/Secrets)
     app = Flask(__name__, instance_relative_config=True)
     os.makedirs(app.instance_path, exist_ok=True)
@@ -28,6 +37,13 @@ def create_app():
     # Konfiguration
     # ------------------------------------------------------------------
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-insecure')
+    # Pepper für den PIN-Index – nach dem ersten Start nicht mehr ändern (Index wird sonst ungültig).
+    # Ohne PIN_PEPPER: zufällig erzeugt und in instance/pin_pepper abgelegt (nie ein fester Wert).
+    from eiermanager.security import pepper_laden
+    app.config['PIN_PEPPER'] = os.environ.get('PIN_PEPPER') or pepper_laden(app.instance_path)
+    # Pepper-Wechsel: alten Wert vorübergehend als PIN_PEPPER_ALT setzen – Indizes werden
+    # beim nächsten Login umgeschlüsselt (kostet bis dahin einen zweiten Index je Login)
+    app.config['PIN_PEPPER_ALT'] = os.environ.get('PIN_PEPPER_ALT') or None
 
     db_url = os.environ.get('DATABASE_URL')
     if db_url:
@@ -42,22 +58,61 @@ def create_app():
     app.config['REMEMBER_COOKIE_DURATION'] = timedelta(0)
     app.config['REMEMBER_COOKIE_REFRESH_EACH_REQUEST'] = False
 
+    # Hinter Reverse-Proxy (nginx/Caddy): Anzahl vertrauenswürdiger Proxies davor. Erst damit ist
+    # request.remote_addr der echte Client (Login-Drossel!) – ohne Proxy 0 lassen, sonst fälschbar
+    app.config['PROXY_ANZAHL'] = int(os.environ.get('PROXY_ANZAHL', '0'))
+    if app.config['PROXY_ANZAHL']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        n = app.config['PROXY_ANZAHL']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=n, x_proto=n, x_host=n)
+
+    # Conditional GET (ETag aus Datenversionen) für die Übersichten
+    app.config['ETAG_ENABLED'] = os.environ.get('ETAG_ENABLED', '1') != '0'
+
+    # Kaltstart-Budget je Worker (ms) – Überschreitung wird als Warnung geloggt
+    app.config['STARTUP_BUDGET_MS'] = int(os.environ.get('STARTUP_BUDGET_MS', '1500'))
+
+    # SQLite-Produktionsprofil (WAL, busy_timeout, Pool) – Engine-Optionen vor db.init_app
+    from eiermanager import sqlite_profil
+    sqlite_profil.konfigurieren(app)
+
     # ------------------------------------------------------------------
     # Extensions
     # ------------------------------------------------------------------
     db.init_app(app)
+    sqlite_profil.init_app(app)         # Pragmas je Verbindung (SQLITE_PROFIL=0 schaltet ab)
     login_manager.init_app(app)
-
-    # 1) Models laden
-    from eiermanager import models  # noqa: F401
-
-    # 2) Tabellen anlegen
-    with app.app_context():
-        db.create_all()
-
-    # 3) Bootstrap/Seeding
-    from eiermanager.bootstrap import bootstrap_data
-    bootstrap_data(app)
+    from eiermanager import perf
+    perf.init_app(app)                  # SQL-/Latenz-Messung je Request (PERF_ENABLED=0 schaltet ab)
+
+    # 1) Models laden (+ Mapper-Events: Bestand, Hennen-Ledger, Abo-Version)
+    from eiermanager import models, bestand, herde, abholplan, berechtigungen  # noqa: F401
+    app.cli.add_command(bestand.bestand_cli)
+    app.cli.add_command(herde.herde_cli)
+    t = _phase("init", t_start)
+
+    # Plugins (Platzhalter-Module aus SEED_MODULES): nur aktive laden – vor dem Schema-Schritt,
+    # damit Plugin-Models in Fingerprint und create_all landen
+    from eiermanager.plugins import plugins_laden
+    plugins_laden(app)
+    t = _phase("plugins", t)
+
+    # 2+3) Schema + Seeds nur, wenn sich Models oder SEED_VERSION seit dem letzten Start geändert haben
+    from eiermanager.schema import ensure_schema, start_version, gespeicherte_start_version, start_version_speichern
+    from eiermanager.bootstrap import bootstrap_data, SEED_VERSION
+    version = start_version(SEED_VERSION)
+    if os.environ.get('FORCE_BOOTSTRAP') or gespeicherte_start_version(app) != version:
+        # Tabellen anlegen (+ neue Spalten/Indizes an bestehenden Tabellen)
+        with app.app_context():
+            db.create_all()
+        ensure_schema(app)
+        t = _phase("schema", t)
+        bootstrap_data(app)
+        start_version_speichern(app, version)
+        t = _phase("bootstrap", t)
+    else:
+        app.logger.info("[start] Schema/Seeds unverändert (Version %s) – Bootstrap übersprungen.", version)
+        t = _phase("schema", t)
 
     # 4) Stabile Blueprints registrieren (+ NEU: abonnenten)
     from eiermanager import benutzer, core, eier, huehner, einstellungen, abonnenten
@@ -69,80 +124,58 @@ def create_app():
     app.register_blueprint(einstellungen.einstellungen_bp)  # Einstellungen
     app.register_blueprint(abonnenten.abonnenten_bp)        # Abonnenten (NEU)
 
-    # 4a) Safety-Upserts: Module in DB sicherstellen + Admin zuweisen
+    # CLI: historischer CSV-Import
+    from eiermanager.importer import import_cli
+    app.cli.add_command(import_cli)
+
+    # CLI: synthetische Testdaten + Endpoint-Benchmark (Baseline in instance/)
+    from eiermanager.testdaten import testdaten_cli
+    from eiermanager.benchmark import benchmark_cli
+    app.cli.add_command(testdaten_cli)
+    app.cli.add_command(benchmark_cli)
+
+    t = _phase("blueprints", t)
+
+    # Modul-Registry erst jetzt laden: Sichtbarkeit hängt an den registrierten Endpoints
+    from eiermanager import modulregister
     with app.app_context():
-        from eiermanager.models import Module, User
-        try:
-            def ensure_module(key: str, label: str, endpoint: str,
-                              admin_only: bool = False, active: bool = True) -> Module:
-                m = Module.query.filter_by(key=key).first()
-                if not m:
-                    m = Module(key=key, label=label, endpoint=endpoint,
-                               admin_only=admin_only, active=active)
-                    db.session.add(m)
-                    db.session.commit()
-                else:
-                    changed = False
-                    if m.endpoint != endpoint:
-                        m.endpoint = endpoint; changed = True
-                    if m.admin_only != admin_only:
-                        m.admin_only = admin_only; changed = True
-                    if m.active != active:
-                        m.active = active; changed = True
-                    if changed:
-                        db.session.commit()
-                return m
-
-            mod_eier       = ensure_module("eier",        "Eier",        "eier.index",        admin_only=False, active=True)
-            mod_huehner    = ensure_module("huehner",     "Hühner",      "huehner.index",     admin_only=False, active=True)
-            mod_settings   = ensure_module("einstellungen","Einstellungen","einstellungen.index", admin_only=True,  active=True)
-            mod_abos       = ensure_module("abonnenten",  "Abonnenten",  "abonnenten.index",  admin_only=False, active=True)
-
-            admin = User.query.filter_by(is_admin=True).first()
-            if admin:
-                for m in (mod_eier, mod_huehner, mod_settings, mod_abos):
-                    if all(mm.id != m.id for mm in admin.modules):
-                        admin.modules.append(m)
-                db.session.commit()
-        except Exception as e:
-            app.logger.warning("[safety-upsert] Module konnten nicht sichergestellt werden: %r", e)
-
-    # Login-User-Loader
+        modulregister.laden()
+    t = _phase("registry", t)
+
+    # Login-User-Loader: unveränderlicher Snapshot aus dem Berechtigungs-Cache (kein Query pro Request)
     @login_manager.user_loader
     def load_user(user_id):
-        from eiermanager.models import User
-        return User.query.get(int(user_id))
+        return berechtigungen.benutzer(int(user_id))
 
     # Menü-Utilities (für Templates)
     @app.context_processor
     def utility_processor():
         from flask import current_app
-        from eiermanager.models import Module
 
         def has_endpoint(name: str) -> bool:
             return name in current_app.view_functions
 
-        def can_access_module(m: "Module") -> bool:
-            if not getattr(m, "active", True):
-                return False
-            if getattr(current_user, "is_admin", False):
-                return True
-            if getattr(m, "admin_only", False):
-                return False
-            if hasattr(current_user, "modules") and current_user.modules:
-                return any(um.id == m.id for um in current_user.modules)
-            return True
+        def can_access_module(m) -> bool:
+            if current_user.is_authenticated:
+                return current_user.darf(m)
+            return getattr(m, "active", True) and not getattr(m, "admin_only", False)
 
-        return dict(has_endpoint=has_endpoint, can_access_module=can_access_module, Module=Module)
+        return dict(has_endpoint=has_endpoint, can_access_module=can_access_module)
 
-    # Debug-Infos beim Start
-    with app.app_context():
-        try:
+    # Debug-Infos beim Start (nur im Debug-Log; Details auch unter /_debug/modules)
+    if app.logger.isEnabledFor(logging.DEBUG):
+        with app.app_context():
             from eiermanager.models import Module, User
-            app.logger.info("Registered endpoints: %s", list(app.view_functions.keys()))
-            app.logger.info("Modules in DB: %s", [(m.key, m.endpoint, m.active) for m in Module.query.all()])
-            app.logger.info("Users in DB: %s", [(u.username, u.is_admin) for u in User.query.all()])
-        except Exception as e:
-            app.logger.warning("Startup debug-info failed: %r", e)
+            app.logger.debug("Registered endpoints: %s", list(app.view_functions.keys()))
+            app.logger.debug("Modules in DB: %s", [(m.key, m.endpoint, m.active) for m in Module.query.all()])
+            app.logger.debug("Users in DB: %s", [(u.username, u.is_admin) for u in User.query.all()])
+
+    gesamt = round((time.perf_counter() - t_start) * 1000, 1)
+    app.config['STARTUP_MS'] = gesamt
+    app.config['STARTUP_PHASEN'] = zeiten
+    if gesamt > app.config['STARTUP_BUDGET_MS']:
+        app.logger.warning("[start] Kaltstart %s ms > Budget %s ms %s", gesamt, app.config['STARTUP_BUDGET_MS'], zeiten)
+    else:
+        app.logger.info("[start] Kaltstart %s ms %s", gesamt, zeiten)
 
     return app
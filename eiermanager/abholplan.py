@@ -0,0 +1,206 @@
+# eiermanager/abholplan.py
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from sqlalchemy import or_, and_
+from eiermanager.extensions import db
+from eiermanager.models import Abonnement, AboException, AboAbholung, LogEntry
+from eiermanager import versionen
+
+BEREICH = "abos"            # Versionszähler: Abos + Ausnahmen
+MAX_TAGE = 731              # Schutz gegen riesige Zeiträume (2 Jahre)
+CACHE_GROESSE = 64
+
+versionen.beobachten(Abonnement, BEREICH)
+versionen.beobachten(AboException, BEREICH)
+
+# LRU-Cache pro Prozess für Wochenpläne; Schlüssel enthält die Abo-Version -> nie veraltet
+_cache = OrderedDict()
+
+
+# -----------------------------
+# Plan berechnen
+# -----------------------------
+def _ausnahmen(von: date, bis: date) -> dict:
+    """
+    Ausnahmen für alle (abo, datum), bei denen irgendeine Ausnahme den Zeitraum betrifft
+    (ursprünglicher Tag ODER Zieltag im Zeitraum) – in einem Query. Zu diesen Schlüsseln
+    werden ALLE Ausnahmen geladen, auch jüngere mit Ursprung und Ziel außerhalb: die
+    jüngste gilt (sonst gewänne eine ältere Verschiebung in den Zeitraum hinein).
+    """
+    betroffen = (db.session.query(AboException.abo_id, AboException.datum)
+                 .filter(or_(and_(AboException.datum >= von, AboException.datum <= bis),
+                             and_(AboException.new_datum >= von, AboException.new_datum <= bis)))
+                 .distinct()
+                 .subquery())
+    rows = (AboException.query
+            .join(betroffen, and_(AboException.abo_id == betroffen.c.abo_id,
+                                  AboException.datum == betroffen.c.datum))
+            .order_by(AboException.created_at.asc(), AboException.id.asc())
+            .all())
+    return {(ex.abo_id, ex.datum): ex for ex in rows}
+
+
+def berechnen(von: date, bis: date) -> list:
+    """
+    Alle aktiven Abos über [von, bis] in Abholungen je Tag auflösen.
+    'skip' entfernt den Termin, 'shift' verschiebt ihn auf new_datum (auch über die
+    Zeitraumgrenzen hinweg). Ausnahmen ohne regulären Termin am Ausgangstag werden ignoriert.
+    Rückgabe: [{"datum", "abholungen", "ausgesetzt", "summe"}, ...] je Tag.
+    """
+    # nur Spalten laden (keine ORM-Objekte) – bei hunderten Abos x 365 Tagen spürbar
+    abos = [
+        (r.id, r.name, r.menge, r.abholtag, r.created_at.date())
+        for r in db.session.query(Abonnement.id, Abonnement.name, Abonnement.menge,
+                                  Abonnement.abholtag, Abonnement.created_at)
+        .filter(Abonnement.aktiv.is_(True))
+    ]
+    abos.sort(key=lambda a: a[1].lower())
+    by_id = {a[0]: a for a in abos}
+    je_wochentag = {wd: [a for a in abos if a[3] == wd] for wd in range(7)}
+    ausnahmen = _ausnahmen(von, bis)
+
+    tage = OrderedDict()
+    d = von
+    while d <= bis:
+        abholungen, ausgesetzt = [], []
+        for abo_id, name, menge, _, seit in je_wochentag[d.weekday()]:
+            if d < seit:
+                continue
+            ex = ausnahmen.get((abo_id, d))
+            if ex is None:
+                abholungen.append({"abo_id": abo_id, "name": name, "menge": menge, "verschoben_von": None})
+            else:
+                ausgesetzt.append({"abo_id": abo_id, "name": name, "action": ex.action,
+                                   "new_datum": ex.new_datum if ex.action == "shift" else None})
+        tage[d] = {"datum": d, "abholungen": abholungen, "ausgesetzt": ausgesetzt, "summe": 0}
+        d += timedelta(days=1)
+
+    # Verschiebungen in den Zeitraum hinein (Ausgangstag darf außerhalb liegen)
+    verschoben = set()
+    for (abo_id, ursprung), ex in ausnahmen.items():
+        a = by_id.get(abo_id)
+        if ex.action != "shift" or a is None or ex.new_datum not in tage:
+            continue
+        if ursprung.weekday() != a[3] or ursprung < a[4]:
+            continue    # kein regulärer Termin am Ausgangstag
+        tage[ex.new_datum]["abholungen"].append(
+            {"abo_id": a[0], "name": a[1], "menge": a[2], "verschoben_von": ursprung})
+        verschoben.add(ex.new_datum)
+
+    for d, tag in tage.items():
+        if d in verschoben:
+            tag["abholungen"].sort(key=lambda x: x["name"].lower())
+        tag["summe"] = sum(x["menge"] for x in tag["abholungen"])
+    return list(tage.values())
+
+
+def montag(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def wochenplan(d: date) -> list:
+    """Plan der Woche (Mo–So), die `d` enthält – gecacht pro Abo-Version."""
+    start = montag(d)
+    key = (start, versionen.version(BEREICH))
+    hit = _cache.get(key)
+    if hit is not None:
+        _cache.move_to_end(key)
+        return hit
+    data = berechnen(start, start + timedelta(days=6))
+    _cache[key] = data
+    while len(_cache) > CACHE_GROESSE:
+        _cache.popitem(last=False)
+    return data
+
+
+def plan(von: date, bis: date) -> list:
+    """Plan für beliebige Zeiträume; bis zwei Wochen aus dem Wochen-Cache, sonst direkt berechnet."""
+    if von > bis:
+        return []
+    if (bis - von).days + 1 <= 7 * 2:
+        tage = []
+        w = montag(von)
+        while w <= bis:
+            tage.extend(t for t in wochenplan(w) if von <= t["datum"] <= bis)
+            w += timedelta(days=7)
+        return tage
+    return berechnen(von, bis)
+
+
+def tagesplan(d: date) -> dict:
+    """Plan eines Tages (aus dem Wochen-Cache)."""
+    return wochenplan(d)[d.weekday()]
+
+
+def als_json(tage: list) -> list:
+    def _iso(v):
+        return v.isoformat() if isinstance(v, date) else v
+    return [{
+        "datum": t["datum"].isoformat(),
+        "summe": t["summe"],
+        "abholungen": [{k: _iso(v) for k, v in x.items()} for x in t["abholungen"]],
+        "ausgesetzt": [{k: _iso(v) for k, v in x.items()} for x in t["ausgesetzt"]],
+    } for t in tage]
+
+
+# -----------------------------
+# Abholungen buchen (idempotent, gebündelt)
+# -----------------------------
+def gebuchte_abholungen(datum: date, abo_ids) -> dict:
+    """{abo_id: menge} der an `datum` bereits gebuchten Abholungen (ein IN-Query)."""
+    if not abo_ids:
+        return {}
+    return dict(
+        db.session.query(AboAbholung.abo_id, AboAbholung.menge)
+        .filter(AboAbholung.datum == datum, AboAbholung.abo_id.in_(list(abo_ids)))
+        .all()
+    )
+
+
+def abholungen_buchen(mengen: dict, datum: date, benutzer=None) -> dict:
+    """
+    Abholungen für {abo_id: menge_override ('' = Abo-Menge)} an `datum` buchen:
+    je Abo ein AboAbholung + LogEntry (Abgang), alles in einem Flush/Commit.
+    Nur Abos, die laut Abholplan an `datum` fällig sind (Aussetzen/Verschieben berücksichtigt);
+    bereits gebuchte werden übersprungen. Die Unique-Constraint (abo_id, datum) fängt
+    gleichzeitige Buchungen ab (IntegrityError -> Aufrufer macht Rollback).
+    """
+    faellig = {x["abo_id"] for x in tagesplan(datum)["abholungen"]}
+    ids = [i for i in mengen if i in faellig]
+    abos = (Abonnement.query.filter(Abonnement.id.in_(ids), Abonnement.aktiv.is_(True)).all()
+            if ids else [])
+    gebucht = gebuchte_abholungen(datum, [a.id for a in abos])
+
+    zeitpunkt = datetime.now().strftime("%H:%M")
+    neu = []
+    total = 0
+    for a in abos:
+        if a.id in gebucht:
+            continue
+        # Menge lesen (override oder default)
+        try:
+            menge = int(mengen[a.id] or a.menge or 0)
+        except (TypeError, ValueError):
+            menge = a.menge or 0
+        if menge <= 0:
+            continue
+        neu.append(AboAbholung(
+            abo_id=a.id, datum=datum, menge=menge, benutzer=benutzer,
+            buchung=LogEntry(
+                datum=datum,
+                zeitpunkt=zeitpunkt,
+                typ="abgang",
+                menge=menge,
+                benutzer=benutzer,
+                name=f"Abo {a.name}",
+                kategorie="abo",
+                abo_id=a.id,
+            ),
+        ))
+        total += menge
+
+    if neu:
+        db.session.add_all(neu)
+        db.session.commit()
+    return {"gebucht": len(neu), "menge": total, "bereits": len(gebucht),
+            "nicht_faellig": len(mengen) - len(ids)}
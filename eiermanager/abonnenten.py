@@ -1,9 +1,16 @@
 # eiermanager/abonnenten.py
-from datetime import date, datetime
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from datetime import date, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from eiermanager.extensions import db
-from eiermanager.models import Abonnement, LogEntry
+from eiermanager.models import Abonnement
+from eiermanager.abholplan import (tagesplan, plan as abholplan, als_json, montag, abholungen_buchen,
+                                   gebuchte_abholungen, MAX_TAGE, BEREICH as ABOS)
+from eiermanager.etag import versioniert
+from eiermanager.sqlite_profil import mit_wiederholung
+from eiermanager.modulregister import BEREICH as MODULE
+from eiermanager.paging import parse_date
 
 abonnenten_bp = Blueprint("abonnenten", __name__, url_prefix="/abonnenten")
 
@@ -18,6 +25,7 @@ def index():
 # ----------------- Liste -----------------
 @abonnenten_bp.route("/liste", endpoint="liste")
 @login_required
+@versioniert(ABOS, MODULE)
 def liste():
     abos = Abonnement.query.order_by(Abonnement.aktiv.desc(), Abonnement.name.asc()).all()
     return render_template("abonnenten/liste.html", abos=abos)
@@ -107,53 +115,81 @@ def delete(abo_id: int):
 # ----------------- HEUTE BUCHEN -----------------
 @abonnenten_bp.route("/heute", methods=["GET", "POST"], endpoint="heute")
 @login_required
+@mit_wiederholung
 def heute():
     today = date.today()
     weekday = today.weekday()  # Mo=0 ... So=6
     if request.method == "POST":
         # Es kommen mehrere Felder: selected_<id>=on und menge_<id>=value
-        count = 0
-        total = 0
-        for key, val in request.form.items():
+        mengen = {}
+        for key in request.form:
             if not key.startswith("selected_"):
                 continue
             try:
                 abo_id = int(key.split("_", 1)[1])
-            except Exception:
-                continue
-            a = Abonnement.query.get(abo_id)
-            if not a or not a.aktiv:
-                continue
-
-            # Menge lesen (override oder default)
-            menge_str = request.form.get(f"menge_{abo_id}", "")
-            try:
-                menge = int(menge_str or a.menge or 0)
             except ValueError:
-                menge = a.menge or 0
-
-            if menge <= 0:
                 continue
+            mengen[abo_id] = request.form.get(f"menge_{abo_id}", "")
 
-            # LogEntry anlegen (Abgang)
-            db.session.add(LogEntry(
-                datum=today,
-                zeitpunkt=datetime.now().strftime("%H:%M"),
-                typ="abgang",
-                menge=menge,
-                benutzer=getattr(current_user, "username", None),
-                name=f"Abo {a.name}"
-            ))
-            count += 1
-            total += menge
-
-        db.session.commit()
-        if count == 0:
+        # Idempotenz über Unique (abo_id, datum): erneutes Absenden (Doppeltipp, Retry bei
+        # schlechter Verbindung) bucht nichts ein zweites Mal. Kam eine gleichzeitige Buchung
+        # dazwischen, einmal neu aufsetzen – dann zählen deren Abos als "bereits gebucht"
+        benutzer = getattr(current_user, "username", None)
+        try:
+            r = abholungen_buchen(mengen, today, benutzer)
+        except IntegrityError:
+            db.session.rollback()
+            try:
+                r = abholungen_buchen(mengen, today, benutzer)
+            except IntegrityError:
+                db.session.rollback()
+                flash("Abos werden gerade von einem anderen Gerät gebucht – bitte Liste prüfen.", "warning")
+                return redirect(url_for("abonnenten.heute"))
+
+        if r["nicht_faellig"]:
+            flash(f"{r['nicht_faellig']} Abo(s) sind heute nicht fällig – übersprungen.", "warning")
+        if r["bereits"]:
+            flash(f"{r['bereits']} Abo(s) waren heute bereits gebucht.", "info")
+        if not r["gebucht"]:
             flash("Keine Abgänge gebucht.", "warning")
         else:
-            flash(f"{count} Abo-Buchungen erfasst (gesamt {total} Eier).", "success")
+            flash(f"{r['gebucht']} Abo-Buchungen erfasst (gesamt {r['menge']} Eier).", "success")
         return redirect(url_for("abonnenten.heute"))
 
-    # GET: aktive Abos für heutigen Wochentag
-    abos = Abonnement.query.filter_by(aktiv=True, abholtag=weekday).order_by(Abonnement.name.asc()).all()
-    return render_template("abonnenten/heute.html", abos=abos, weekday=weekday, today=today)
+    # GET: heute fällige Abos laut Abholplan (Aussetzen/Verschieben berücksichtigt)
+    plan = tagesplan(today)
+    verschoben = {x["abo_id"]: x["verschoben_von"] for x in plan["abholungen"] if x["verschoben_von"]}
+    ids = [x["abo_id"] for x in plan["abholungen"]]
+    abos = Abonnement.query.filter(Abonnement.id.in_(ids)).order_by(Abonnement.name.asc()).all() if ids else []
+    return render_template("abonnenten/heute.html", abos=abos, weekday=weekday, today=today,
+                           gebucht=gebuchte_abholungen(today, ids), verschoben=verschoben,
+                           ausgesetzt=plan["ausgesetzt"])
+
+
+# ----------------- Abholplan (Woche / API) -----------------
+@abonnenten_bp.route("/plan", endpoint="plan")
+@login_required
+def plan():
+    start = montag(parse_date(request.args.get("woche")) or date.today())
+    tage = abholplan(start, start + timedelta(days=6))
+    return render_template("abonnenten/plan.html", tage=tage, start=start,
+                           vorwoche=start - timedelta(days=7), naechste=start + timedelta(days=7),
+                           summe=sum(t["summe"] for t in tage), today=date.today())
+
+
+@abonnenten_bp.route("/api/plan", endpoint="api_plan")
+@login_required
+def api_plan():
+    von = parse_date(request.args.get("von")) or date.today()
+    bis = parse_date(request.args.get("bis")) or von + timedelta(days=6)
+    if von > bis:
+        return jsonify({"error": "von liegt nach bis"}), 400
+    if (bis - von).days + 1 > MAX_TAGE:
+        return jsonify({"error": f"Zeitraum zu groß (max. {MAX_TAGE} Tage)"}), 400
+    tage = abholplan(von, bis)
+    return jsonify({
+        "von": von.isoformat(),
+        "bis": bis.isoformat(),
+        "summe": sum(t["summe"] for t in tage),
+        "tage": als_json(tage),
+    })
@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, logout_user, current_user
-from eiermanager.models import User
+from eiermanager.security import user_fuer_pin, login_drossel
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -9,13 +9,18 @@ def index():
     if current_user.is_authenticated:
         return render_template('menu2.html')
     if request.method == 'POST':
-        pin = request.form['pin']
-        user = User.query.filter_by(pin=pin).first()
+        client = request.remote_addr or "?"
+        if login_drossel.wartezeit(client):
+            flash("Zu viele Fehlversuche – bitte warten.", "danger")
+            return render_template('login2.html')
+        user = user_fuer_pin(request.form['pin'])
         if user:
+            login_drossel.erfolg(client)
             login_user(user)
             session['username'] = user.username
             return redirect(url_for('auth.index'))
         else:
+            login_drossel.fehlschlag(client)
             flash("Falsche PIN!", "danger")
     return render_template('login2.html')
 
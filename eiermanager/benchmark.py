@@ -0,0 +1,304 @@
+# eiermanager/benchmark.py
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from datetime import datetime
+import click
+import numpy as np
+from flask import current_app, url_for
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from eiermanager.extensions import db
+from eiermanager.models import Mobilstall, Abonnement, User, Module, LogEntry
+
+# Diese dürfen nicht langsamer werden – werden bei --kritisch allein gemessen
+KRITISCH = ("eier.uebersicht", "huehner.uebersicht", "abonnenten.heute", "login")
+# GET-Endpoints mit Nebenwirkungen oder ohne Aussagekraft
+AUSGENOMMEN = {"static", "benutzer.logout", "auth.logout", "core.debug_perf_reset"}
+BASELINE_DATEI = "benchmark_baseline.json"
+# Parallel-Test bucht unter diesem Benutzer – nur dessen Buchungen werden wieder gelöscht
+TEST_BENUTZER = "benchmark-parallel"
+
+
+def _beispiel_argumente() -> dict:
+    """Werte für URL-Parameter (erste Datensätze der DB)."""
+    werte = {
+        "stall_id": db.session.query(Mobilstall.id).filter_by(aktiv=True).order_by(Mobilstall.id).limit(1).scalar(),
+        "abo_id": db.session.query(Abonnement.id).order_by(Abonnement.id).limit(1).scalar(),
+        "user_id": db.session.query(User.id).order_by(User.id).limit(1).scalar(),
+        "module_id": db.session.query(Module.id).order_by(Module.id).limit(1).scalar(),
+    }
+    return {k: v for k, v in werte.items() if v is not None}
+
+
+def ziele(app, nur: tuple = ()) -> list:
+    """[(endpoint, url), ...] aller GET-Endpoints, deren Parameter sich belegen lassen."""
+    args = _beispiel_argumente()
+    out = []
+    with app.test_request_context():
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.endpoint):
+            if "GET" not in rule.methods or rule.endpoint in AUSGENOMMEN:
+                continue
+            if nur and rule.endpoint not in nur:
+                continue
+            if not rule.arguments <= set(args):
+                continue
+            out.append((rule.endpoint, url_for(rule.endpoint, **{a: args[a] for a in rule.arguments})))
+    return out
+
+
+class _QueryZaehler:
+    def __init__(self):
+        self.n = 0
+
+    def __call__(self, *a, **kw):
+        self.n += 1
+
+
+def _kennzahlen(ms: list, queries: list, status: list) -> dict:
+    return {
+        "median_ms": round(float(np.median(ms)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "queries": int(max(queries)),
+        "status": sorted(set(status)),
+    }
+
+
+def _anfrage(app, client, methode: str, url: str, **kw):
+    """
+    Ein Request in eigenem App-Context: sonst teilen sich alle Requests das g der CLI
+    (Flask-Login merkt sich dort den User, Flask-SQLAlchemy die Session).
+    Streaming-Antworten werden komplett gelesen. Rückgabe: (ms, status).
+    """
+    with app.app_context():
+        t = time.perf_counter()
+        r = client.open(url, method=methode, **kw)
+        r.get_data()
+        ms = (time.perf_counter() - t) * 1000
+        r.close()
+    return ms, r
+
+
+def messen(app, wiederholungen: int = 20, pin: str = "0000", kritisch: bool = False) -> dict:
+    """Alle (bzw. die kritischen) Endpoints über den Test-Client messen: {name: kennzahlen}."""
+    zaehler = _QueryZaehler()
+    event.listen(db.engine, "before_cursor_execute", zaehler)
+    try:
+        ergebnis = {}
+
+        # Login: jede Wiederholung ein frischer Client (eigene IP -> keine Drossel)
+        ms, qs, st = [], [], []
+        for i in range(wiederholungen + 1):
+            zaehler.n = 0
+            t, r = _anfrage(app, app.test_client(), "POST", "/login", data={"pin": pin},
+                            environ_base={"REMOTE_ADDR": f"10.99.{i // 250}.{i % 250}"})
+            if i:                                               # erster Durchlauf = Warm-up
+                ms.append(t)
+                qs.append(zaehler.n)
+                st.append(r.status_code)
+        ergebnis["login"] = _kennzahlen(ms, qs, st)
+
+        client = app.test_client()
+        _, r = _anfrage(app, client, "POST", "/login", data={"pin": pin}, environ_base={"REMOTE_ADDR": "10.98.0.1"})
+        if r.status_code != 302 or "login" in (r.location or ""):
+            raise click.ClickException("Login für den Benchmark fehlgeschlagen (PIN?).")
+
+        for endpoint, url in ziele(app, KRITISCH if kritisch else ()):
+            _anfrage(app, client, "GET", url)                   # Warm-up (Caches, Template-Kompilat)
+            ms, qs, st = [], [], []
+            for _ in range(wiederholungen):
+                zaehler.n = 0
+                t, r = _anfrage(app, client, "GET", url)
+                ms.append(t)
+                qs.append(zaehler.n)
+                st.append(r.status_code)
+            ergebnis[endpoint] = dict(_kennzahlen(ms, qs, st), url=url)
+        return ergebnis
+    finally:
+        event.remove(db.engine, "before_cursor_execute", zaehler)
+
+
+def vergleichen(ergebnis: dict, baseline: dict, toleranz: float, min_ms: float, query_toleranz: int) -> list:
+    """Regressionen gegen die Baseline: [(name, text), ...]. Neue Endpoints sind keine Regression."""
+    out = []
+    for name, ist in ergebnis.items():
+        soll = baseline.get(name)
+        if soll is None:
+            continue
+        for feld in ("median_ms", "p95_ms"):
+            grenze = max(soll[feld] * toleranz, soll[feld] + min_ms)
+            if ist[feld] > grenze:
+                out.append((name, f"{feld} {ist[feld]} > {round(grenze, 2)} (Baseline {soll[feld]})"))
+        if ist["queries"] > soll["queries"] + query_toleranz:
+            out.append((name, f"queries {ist['queries']} > {soll['queries'] + query_toleranz} (Baseline {soll['queries']})"))
+    for name, ist in ergebnis.items():
+        if any(s >= 500 for s in ist["status"]):
+            out.append((name, f"Status {ist['status']}"))
+    return out
+
+
+def wegwerf_db() -> bool:
+    """Liegt die SQLite-Datei im Temp-Verzeichnis (Kopie/Test-DB statt Betriebs-DB)?"""
+    url = db.engine.url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return False
+    pfad = os.path.realpath(url.database)
+    return pfad.startswith(os.path.realpath(tempfile.gettempdir()) + os.sep)
+
+
+def _testbenutzer() -> str:
+    """Eigenen Benutzer für den Parallel-Test anlegen (zufällige PIN) – seine Buchungen sind markiert."""
+    from eiermanager.security import pin_setzen
+    pin = secrets.token_hex(8)
+    u = User.query.filter_by(username=TEST_BENUTZER).first()
+    if u is None:
+        u = User(username=TEST_BENUTZER, is_admin=False)
+        db.session.add(u)
+    pin_setzen(u, pin)
+    db.session.commit()
+    return pin
+
+
+def parallel_buchen(app, schreiber: int = 4, buchungen: int = 50) -> dict:
+    """
+    `schreiber` Threads (je eigener Client/Verbindung) buchen gleichzeitig je `buchungen`
+    Zugänge à 1 Ei über /eier/zugang – angemeldet als TEST_BENUTZER. Danach muss jede Buchung
+    im Log stehen und die Bestandszeile zum Log passen.
+    Rückgabe: erwartet, gebucht, bestand_delta, fremde, fehler, konsistent, ms.
+    """
+    from eiermanager.bestand import bestand_aktuell, bestand_pruefen
+    stall_id = db.session.query(Mobilstall.id).filter_by(aktiv=True).order_by(Mobilstall.id).limit(1).scalar()
+    if stall_id is None:
+        raise click.ClickException("Kein aktiver Stall vorhanden.")
+    pin = _testbenutzer()
+    max_id = int(db.session.query(db.func.max(LogEntry.id)).scalar() or 0)
+    vorher = bestand_aktuell()
+    db.session.commit()
+
+    fehler = []
+    start = threading.Barrier(schreiber)
+
+    def _schreiber(nr):
+        client = app.test_client()
+        _, r = _anfrage(app, client, "POST", "/login", data={"pin": pin},
+                        environ_base={"REMOTE_ADDR": f"10.97.0.{nr + 1}"})
+        start.wait()
+        for _ in range(buchungen):
+            try:
+                _, r = _anfrage(app, client, "POST", "/eier/zugang", data={"stall_id": stall_id, "menge": 1})
+                if r.status_code != 302 or "zugang" in (r.location or ""):
+                    fehler.append(f"Status {r.status_code} -> {r.location}")
+            except Exception as e:
+                fehler.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=_schreiber, args=(i,)) for i in range(schreiber)]
+    t = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    ms = (time.perf_counter() - t) * 1000
+
+    db.session.commit()                                         # frischer Snapshot
+    neu = db.session.query(LogEntry.benutzer, db.func.count(LogEntry.id), db.func.sum(LogEntry.menge)) \
+        .filter(LogEntry.id > max_id).group_by(LogEntry.benutzer).all()
+    gebucht = sum(int(m or 0) for b, _, m in neu if b == TEST_BENUTZER)
+    fremde = sum(n for b, n, _ in neu if b != TEST_BENUTZER)    # echte Buchungen während des Tests
+    gespeichert, berechnet = bestand_pruefen()
+    return {"erwartet": schreiber * buchungen, "gebucht": gebucht, "bestand_delta": gespeichert - vorher,
+            "fremde": fremde, "fehler": fehler, "konsistent": gespeichert == berechnet, "ms": round(ms, 1)}
+
+
+def _testbuchungen_entfernen() -> int:
+    """
+    Nur die Buchungen des Test-Benutzers löschen (über die Session -> Bestand/Tagesabschluss
+    ziehen mit), danach den Benutzer selbst.
+    """
+    eintraege = LogEntry.query.filter(LogEntry.benutzer == TEST_BENUTZER).all()
+    for e in eintraege:
+        db.session.delete(e)
+    User.query.filter_by(username=TEST_BENUTZER).delete()
+    db.session.commit()
+    return len(eintraege)
+
+
+# -----------------------------
+# CLI: flask benchmark run [--speichern] [--kritisch]
+# -----------------------------
+@click.group("benchmark")
+def benchmark_cli():
+    """Endpoints messen (Latenz, Queries) und gegen eine gespeicherte Baseline prüfen."""
+
+
+@benchmark_cli.command("run")
+@click.option("-n", "--wiederholungen", default=20, show_default=True, help="Messungen je Endpoint")
+@click.option("--pin", default="0000", show_default=True, help="Admin-PIN für den Login")
+@click.option("--kritisch", is_flag=True, help=f"Nur {', '.join(KRITISCH)}")
+@click.option("--baseline", "baseline_pfad", default=None, help=f"Baseline-Datei (Default: instance/{BASELINE_DATEI})")
+@click.option("--speichern", is_flag=True, help="Ergebnis als neue Baseline speichern")
+@click.option("--toleranz", default=1.5, show_default=True, help="Erlaubter Faktor auf Median/p95")
+@click.option("--min-ms", default=2.0, show_default=True, help="Mindest-Spielraum in ms (gegen Rauschen)")
+@click.option("--query-toleranz", default=0, show_default=True, help="Erlaubte zusätzliche Queries")
+@with_appcontext
+def run_cmd(wiederholungen, pin, kritisch, baseline_pfad, speichern, toleranz, min_ms, query_toleranz):
+    """Messen; Exit-Code 1 bei Regression gegenüber der Baseline."""
+    app = current_app._get_current_object()
+    pfad = baseline_pfad or os.path.join(app.instance_path, BASELINE_DATEI)
+    ergebnis = messen(app, wiederholungen=wiederholungen, pin=pin, kritisch=kritisch)
+
+    click.echo(f"{'Endpoint':40} {'Median':>9} {'p95':>9} {'Queries':>8}")
+    for name, k in sorted(ergebnis.items(), key=lambda x: -x[1]["p95_ms"]):
+        click.echo(f"{name:40} {k['median_ms']:>7} ms {k['p95_ms']:>6} ms {k['queries']:>8}")
+
+    if speichern:
+        with open(pfad, "w", encoding="utf-8") as fh:
+            json.dump({"erstellt": datetime.now().isoformat(timespec="seconds"),
+                       "wiederholungen": wiederholungen, "endpoints": ergebnis}, fh, indent=2)
+        click.echo(f"Baseline gespeichert: {pfad}")
+        return
+
+    if not os.path.exists(pfad):
+        click.echo(f"Keine Baseline unter {pfad} – mit --speichern anlegen.")
+        return
+    with open(pfad, encoding="utf-8") as fh:
+        baseline = json.load(fh)["endpoints"]
+    regressionen = vergleichen(ergebnis, baseline, toleranz, min_ms, query_toleranz)
+    if not regressionen:
+        click.echo("OK: keine Regression gegenüber der Baseline.")
+        return
+    for name, text in regressionen:
+        click.echo(f"REGRESSION {name}: {text}", err=True)
+    raise SystemExit(1)
+
+
+@benchmark_cli.command("parallel")
+@click.option("-s", "--schreiber", default=4, show_default=True, help="Gleichzeitige Clients (Tablets)")
+@click.option("-b", "--buchungen", default=50, show_default=True, help="Buchungen je Client")
+@click.option("--behalten", is_flag=True, help="Testbuchungen nicht wieder löschen")
+@click.option("--betriebs-db", is_flag=True,
+              help="Auch gegen eine DB außerhalb des Temp-Verzeichnisses laufen (schreibt Testbuchungen)")
+@with_appcontext
+def parallel_cmd(schreiber, buchungen, behalten, betriebs_db):
+    """Parallele Schreiber: keine verlorenen Buchungen, Bestand konsistent; sonst Exit-Code 1."""
+    if not betriebs_db and not wegwerf_db():
+        raise click.ClickException(f"Schreibt {schreiber * buchungen} Testbuchungen – nur gegen eine Kopie im "
+                                   f"Temp-Verzeichnis (DATABASE_URL) oder ausdrücklich mit --betriebs-db.")
+    app = current_app._get_current_object()
+    r = parallel_buchen(app, schreiber=schreiber, buchungen=buchungen)
+    click.echo(f"{r['erwartet']} Buchungen von {schreiber} Schreibern in {r['ms']} ms "
+               f"({r['erwartet'] / max(r['ms'], 1) * 1000:.0f}/s): gebucht={r['gebucht']}, "
+               f"Bestand +{r['bestand_delta']}, konsistent={r['konsistent']}, Fehler={len(r['fehler'])}")
+    for text in sorted(set(r["fehler"]))[:10]:
+        click.echo(f"  {text}", err=True)
+    if not behalten:
+        click.echo(f"{_testbuchungen_entfernen()} Testbuchungen entfernt.")
+    # Bestandsdelta nur vergleichbar, wenn währenddessen niemand sonst gebucht hat
+    delta_ok = r["fremde"] > 0 or r["bestand_delta"] == r["erwartet"]
+    ok = not r["fehler"] and r["gebucht"] == r["erwartet"] and delta_ok and r["konsistent"]
+    if not ok:
+        click.echo("FEHLER: Buchungen verloren oder Bestand inkonsistent.", err=True)
+        raise SystemExit(1)
+    click.echo("OK: keine verlorenen Buchungen.")
@@ -1,7 +1,7 @@
 # eiermanager/benutzer.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, current_user
-from eiermanager.models import User
+from eiermanager.security import user_fuer_pin, login_drossel
 
 benutzer_bp = Blueprint("benutzer", __name__)
 
@@ -13,17 +13,26 @@ def login():
         return redirect(url_for("core.dashboard"))
 
     if request.method == "POST":
+        # Gesperrt? Abweisen, bevor DB oder Hash-Check angefasst werden
+        client = request.remote_addr or "?"
+        warten = login_drossel.wartezeit(client)
+        if warten:
+            flash(f"Zu viele Fehlversuche – bitte {warten} s warten.", "danger")
+            return redirect(url_for("benutzer.login"))
+
         pin = (request.form.get("pin") or "").strip()
         if not pin:
             flash("Bitte PIN eingeben.", "warning")
             return redirect(url_for("benutzer.login"))
 
-        # Kein Filter auf "active" o.ä. – minimal & robust
-        u = User.query.filter_by(pin=pin).first()
+        # Index-Lookup + Hash-Check (kein Filter auf "active" o.ä. – minimal & robust)
+        u = user_fuer_pin(pin)
         if not u:
+            login_drossel.fehlschlag(client)
             flash("Falsche PIN.", "danger")
             return redirect(url_for("benutzer.login"))
 
+        login_drossel.erfolg(client)
         login_user(u, remember=False)  # Session-Cookie wird beim Browser-Schließen gelöscht
         return redirect(url_for("core.dashboard"))
 
@@ -0,0 +1,96 @@
+# eiermanager/berechtigungen.py
+import threading
+from collections import OrderedDict
+from flask_login import UserMixin
+from eiermanager.extensions import db
+from eiermanager.models import User
+from eiermanager import versionen
+from eiermanager.modulregister import BEREICH as MODULE
+
+BEREICH = "benutzer"        # Versionszähler der Benutzer (inkl. Modul-Zuordnung)
+CACHE_GROESSE = 256
+
+# Jede Änderung an User (auch nur an .modules) erhöht die Version in derselben Transaktion ->
+# alle Worker sehen entzogene Rechte beim nächsten Request, nicht erst nach einer TTL
+versionen.beobachten(User, BEREICH)
+
+
+class BenutzerSnapshot(UserMixin):
+    """
+    Unveränderliche Sicht auf einen Benutzer für current_user: Stammdaten + Modul-IDs
+    als frozenset. Keine Session-Bindung -> kein Lazy-Load, keine Queries pro Request.
+    """
+    __slots__ = ("id", "username", "is_admin", "modul_ids")
+
+    def __init__(self, id: int, username: str, is_admin: bool, modul_ids):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "username", username)
+        object.__setattr__(self, "is_admin", bool(is_admin))
+        object.__setattr__(self, "modul_ids", frozenset(modul_ids))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BenutzerSnapshot ist unveränderlich")
+
+    def darf(self, module) -> bool:
+        """Darf der Benutzer das Modul sehen? (aktiv, admin_only, Zuordnung – O(1))"""
+        if not getattr(module, "active", True):
+            return False
+        if self.is_admin:
+            return True
+        if getattr(module, "admin_only", False):
+            return False
+        # ohne Zuordnung: alle nicht-Admin-Module (wie bisher)
+        return not self.modul_ids or module.id in self.modul_ids
+
+    def __repr__(self) -> str:
+        return f"<BenutzerSnapshot {self.username} admin={self.is_admin} module={sorted(self.modul_ids)}>"
+
+
+# LRU-Cache pro Prozess: user_id -> (version, snapshot)
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _version() -> tuple:
+    """(Benutzer-Version, Modul-Version) – ein Primärschlüssel-Query."""
+    stand = versionen.stand(BEREICH, MODULE)
+    return stand[BEREICH][0], stand[MODULE][0]
+
+
+def _snapshot_laden(user_id: int):
+    # populate_existing: die Version hat sich geändert -> nicht die alte Instanz der Session nehmen
+    u = db.session.get(User, user_id, populate_existing=True)
+    if u is None:
+        return None
+    return BenutzerSnapshot(u.id, u.username, u.is_admin, (m.id for m in u.modules))
+
+
+def benutzer(user_id: int):
+    """
+    Snapshot aus dem Cache, solange sich Benutzer/Module in der DB nicht geändert haben
+    (ein Versions-Lookup je Request), sonst ein Query (User + Module).
+    """
+    version = _version()
+    with _lock:
+        hit = _cache.get(user_id)
+        if hit is not None and hit[0] == version:
+            _cache.move_to_end(user_id)
+            return hit[1]
+    snap = _snapshot_laden(user_id)
+    if snap is None:
+        return None
+    with _lock:
+        _cache[user_id] = (version, snap)
+        _cache.move_to_end(user_id)
+        while len(_cache) > CACHE_GROESSE:
+            _cache.popitem(last=False)
+    return snap
+
+
+def invalidieren(user_id: int = None) -> None:
+    """Einen Benutzer (oder alle) verwerfen."""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
@@ -0,0 +1,472 @@
+# eiermanager/bestand.py
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, case, select, insert, update, delete, inspect, bindparam
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry, EierBestand, Tagesabschluss, TagesabschlussStall, Mobilstall
+
+BESTAND_ID = 1
+
+# Spalten der Abgangs-Kategorien im Tagesabschluss (Reihenfolge = Anzeige)
+ABGANG_KATEGORIEN = ("defekt", "verkauf", "abo", "automat", "eigenbedarf", "sonstiges")
+
+_bestand_tbl = EierBestand.__table__
+_log_tbl = LogEntry.__table__
+_tag_tbl = Tagesabschluss.__table__
+_tag_stall_tbl = TagesabschlussStall.__table__
+_stall_tbl = Mobilstall.__table__
+
+
+# -----------------------------
+# Hilfsfunktionen
+# -----------------------------
+def _delta(typ, menge) -> int:
+    """Wirkung einer Buchung auf den Bestand (+ Zugang, - Abgang)."""
+    if typ == "zugang":
+        return int(menge or 0)
+    if typ == "abgang":
+        return -int(menge or 0)
+    return 0
+
+
+def abgang_kategorie(name) -> str:
+    """Abgangs-Kategorie aus dem Buchungstext ('Abgang Verkauf', 'Abo Müller', ...)."""
+    n = (name or "").strip().lower()
+    if n.startswith("abo "):
+        return "abo"
+    if "verkauf" in n:
+        return "verkauf"
+    if "verlust" in n or "defekt" in n or "bruch" in n:
+        return "defekt"
+    if "automat" in n:
+        return "automat"
+    if "eigenbedarf" in n:
+        return "eigenbedarf"
+    return "sonstiges"
+
+
+def _kategorie(kategorie, name) -> str:
+    """Gespeicherte Kategorie (falls gültig), sonst aus dem Buchungstext."""
+    return kategorie if kategorie in ABGANG_KATEGORIEN else abgang_kategorie(name)
+
+
+def stall_name_aus_text(name):
+    """'Produktion Mobil 1' -> 'Mobil 1' (sonst None)."""
+    n = (name or "").strip()
+    if n.startswith("Produktion "):
+        return n[len("Produktion "):].strip() or None
+    return None
+
+
+def _ledger_sum_stmt(vor_datum=None):
+    """SUM(zugang) - SUM(abgang) über das Eier-Log (optional nur Tage < vor_datum)."""
+    stmt = select(func.coalesce(func.sum(case(
+        (_log_tbl.c.typ == "zugang", _log_tbl.c.menge),
+        (_log_tbl.c.typ == "abgang", -_log_tbl.c.menge),
+        else_=0,
+    )), 0))
+    if vor_datum is not None:
+        stmt = stmt.where(_log_tbl.c.datum < vor_datum)
+    return stmt
+
+
+def _apply_delta(connection, delta: int) -> None:
+    """
+    Bestandszeile in der laufenden Transaktion anpassen (legt sie bei Bedarf an).
+    Erhöht immer die Log-Version – auch bei delta 0 (z.B. geänderter Buchungstext).
+    """
+    res = connection.execute(
+        update(_bestand_tbl)
+        .where(_bestand_tbl.c.id == BESTAND_ID)
+        .values(menge=_bestand_tbl.c.menge + delta, version=_bestand_tbl.c.version + 1,
+                updated_at=datetime.utcnow())
+    )
+    if res.rowcount == 0:
+        # Noch keine Bestandszeile (z.B. bestehende DB) -> einmalig aus dem Log berechnen.
+        # Die aktuelle Buchung ist zu diesem Zeitpunkt bereits geschrieben. Normalerweise
+        # legt bootstrap_data die Zeile an (bei Batch-Flushes wäre das Log hier schon weiter).
+        connection.execute(insert(_bestand_tbl).values(
+            id=BESTAND_ID,
+            menge=int(connection.execute(_ledger_sum_stmt()).scalar() or 0),
+            version=1,
+            updated_at=datetime.utcnow(),
+        ))
+
+
+def _vortag_ende(connection, datum) -> int:
+    """Endbestand des letzten Tagesabschlusses vor `datum` (Startbestand für `datum`)."""
+    ende = connection.execute(
+        select(_tag_tbl.c.ende)
+        .where(_tag_tbl.c.datum < datum)
+        .order_by(_tag_tbl.c.datum.desc())
+        .limit(1)
+    ).scalar()
+    if ende is None:
+        # Noch kein früherer Tag im Rollup -> einmalig aus dem Log (vor `datum`)
+        ende = connection.execute(_ledger_sum_stmt(vor_datum=datum)).scalar()
+    return int(ende or 0)
+
+
+def _insert_ignorieren(connection, tbl, schluessel: tuple, **werte) -> None:
+    """
+    Zeile anlegen, falls es zu `schluessel` (Unique-Spalten) noch keine gibt.
+    SQLite/PostgreSQL: INSERT ... ON CONFLICT DO NOTHING – zwei gleichzeitige erste Buchungen
+    eines Tages scheitern so nicht am Unique-Constraint. Andere DBs: prüfen, dann einfügen.
+    """
+    dialekt = connection.dialect.name
+    if dialekt == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialekt_insert
+    elif dialekt == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialekt_insert
+    else:
+        bedingung = [tbl.c[k] == werte[k] for k in schluessel]
+        if connection.execute(select(tbl.c.id).where(*bedingung)).scalar() is None:
+            connection.execute(insert(tbl).values(**werte))
+        return
+    connection.execute(
+        dialekt_insert(tbl).values(**werte).on_conflict_do_nothing(index_elements=list(schluessel))
+    )
+
+
+def _ensure_tag(connection, datum) -> None:
+    """Tageszeile anlegen, falls sie fehlt (Start = Ende des Vortags)."""
+    exists = connection.execute(select(_tag_tbl.c.id).where(_tag_tbl.c.datum == datum)).scalar()
+    if exists is None:
+        start = _vortag_ende(connection, datum)
+        _insert_ignorieren(
+            connection, _tag_tbl, ("datum",),
+            datum=datum, start=start, ende=start, updated_at=datetime.utcnow(),
+            **{c: 0 for c in ("zugang",) + tuple(f"abgang_{k}" for k in ABGANG_KATEGORIEN)}
+        )
+
+
+def _apply_tag(connection, b: dict, sign: int) -> None:
+    """Tagesabschluss für den Buchungstag und alle Folgetage nachführen."""
+    datum, typ = b["datum"], b["typ"]
+    delta = sign * _delta(typ, b["menge"])
+    if not delta or datum is None:
+        return
+    menge = sign * int(b["menge"] or 0)
+
+    if typ == "zugang":
+        values = {"zugang": _tag_tbl.c.zugang + menge}
+    else:
+        col = f"abgang_{_kategorie(b['kategorie'], b['name'])}"
+        values = {col: _tag_tbl.c[col] + menge}
+
+    _ensure_tag(connection, datum)
+    connection.execute(
+        update(_tag_tbl).where(_tag_tbl.c.datum == datum)
+        .values(ende=_tag_tbl.c.ende + delta, updated_at=datetime.utcnow(), **values)
+    )
+    # Rückwirkende Buchung: Start/Ende aller späteren Tage verschieben (heute: 0 Zeilen)
+    connection.execute(
+        update(_tag_tbl).where(_tag_tbl.c.datum > datum)
+        .values(start=_tag_tbl.c.start + delta, ende=_tag_tbl.c.ende + delta)
+    )
+
+    if typ == "zugang":
+        stall_id = b["stall_id"]
+        stall_name = stall_name_aus_text(b["name"]) if stall_id is None else None
+        if stall_name:
+            stall_id = connection.execute(
+                select(_stall_tbl.c.id).where(_stall_tbl.c.name == stall_name)
+            ).scalar()
+        if stall_id is not None:
+            _insert_ignorieren(connection, _tag_stall_tbl, ("datum", "stall_id"),
+                               datum=datum, stall_id=stall_id, menge=0)
+            connection.execute(
+                update(_tag_stall_tbl)
+                .where(_tag_stall_tbl.c.datum == datum, _tag_stall_tbl.c.stall_id == stall_id)
+                .values(menge=_tag_stall_tbl.c.menge + menge)
+            )
+
+
+# Felder einer Buchung, die Bestand/Tagesabschluss beeinflussen
+_BUCHUNG_FELDER = ("datum", "typ", "menge", "name", "stall_id", "kategorie")
+
+
+def _buchen(connection, b: dict, sign: int = 1) -> None:
+    _apply_delta(connection, sign * _delta(b["typ"], b["menge"]))
+    _apply_tag(connection, b, sign)
+
+
+def _buchung(target) -> dict:
+    return {f: getattr(target, f) for f in _BUCHUNG_FELDER}
+
+
+# -----------------------------
+# Mapper-Events: Bestand + Tagesabschluss in derselben Transaktion wie LogEntry
+# -----------------------------
+@event.listens_for(LogEntry, "after_insert")
+def _log_after_insert(mapper, connection, target):
+    _buchen(connection, _buchung(target))
+
+
+@event.listens_for(LogEntry, "after_delete")
+def _log_after_delete(mapper, connection, target):
+    _buchen(connection, _buchung(target), sign=-1)
+
+
+def _alten_wert_laden(target, value, oldvalue, initiator):
+    pass
+
+
+# Alten Wert beim Setzen laden, auch wenn das Attribut nach einem Commit abgelaufen ist –
+# sonst fehlt er in der History und after_update bucht die Änderung nicht um
+for _feld in _BUCHUNG_FELDER:
+    event.listen(getattr(LogEntry, _feld), "set", _alten_wert_laden, active_history=True)
+
+
+@event.listens_for(LogEntry, "after_update")
+def _log_after_update(mapper, connection, target):
+    state = inspect(target)
+    old = {}
+    for attr in _BUCHUNG_FELDER:
+        hist = state.attrs[attr].history
+        old[attr] = hist.deleted[0] if hist.deleted else getattr(target, attr)
+    neu = _buchung(target)
+    if old == neu:
+        return
+    _buchen(connection, old, sign=-1)
+    _buchen(connection, neu)
+
+
+# -----------------------------
+# Lesen / Neu berechnen / Prüfen
+# -----------------------------
+def bestand_aktuell() -> int:
+    """Aktueller Eierbestand aus der Bestandszeile (O(1))."""
+    menge = db.session.query(EierBestand.menge).filter(EierBestand.id == BESTAND_ID).scalar()
+    if menge is None:
+        menge = bestand_neu_berechnen()
+    return int(menge)
+
+
+def ledger_version() -> int:
+    """Versionszähler des Eier-Logs (für Caches; ändert sich bei jeder Buchung)."""
+    return int(db.session.query(EierBestand.version).filter(EierBestand.id == BESTAND_ID).scalar() or 0)
+
+
+def ledger_stand() -> tuple:
+    """(Version, letzte Änderung) des Eier-Logs – Grundlage für ETag/Last-Modified."""
+    row = db.session.execute(
+        select(_bestand_tbl.c.version, _bestand_tbl.c.updated_at).where(_bestand_tbl.c.id == BESTAND_ID)
+    ).first()
+    return (int(row.version), row.updated_at) if row else (0, None)
+
+
+def ledger_version_erhoehen() -> None:
+    """Version manuell erhöhen (Massen-Updates ohne Mapper-Events, Bestätigungen im Tagesabschluss)."""
+    db.session.execute(
+        update(_bestand_tbl).where(_bestand_tbl.c.id == BESTAND_ID)
+        .values(version=_bestand_tbl.c.version + 1, updated_at=datetime.utcnow())
+    )
+
+
+def bestand_aus_log() -> int:
+    """Bestand komplett aus dem Eier-Log berechnen (Full-Scan)."""
+    return int(db.session.execute(_ledger_sum_stmt()).scalar() or 0)
+
+
+def bestand_neu_berechnen(commit: bool = True) -> int:
+    """Bestandszeile aus dem Eier-Log neu aufbauen."""
+    menge = bestand_aus_log()
+    row = db.session.get(EierBestand, BESTAND_ID)
+    if row is None:
+        db.session.add(EierBestand(id=BESTAND_ID, menge=menge, version=1))
+    else:
+        row.menge = menge
+        row.version = (row.version or 0) + 1
+        row.updated_at = datetime.utcnow()
+    if commit:
+        db.session.commit()
+    return menge
+
+
+def bestand_pruefen() -> tuple:
+    """(gespeichert, berechnet) – beide Werte gleich = konsistent."""
+    gespeichert = db.session.query(EierBestand.menge).filter(EierBestand.id == BESTAND_ID).scalar()
+    return gespeichert, bestand_aus_log()
+
+
+def tagesabschluss_neu_aufbauen(commit: bool = True) -> int:
+    """
+    Backfill: Tagesabschluss (+ Zugänge pro Stall) komplett aus dem Eier-Log aufbauen.
+    Ein gruppierter Scan über das Log; bestätigte Zählungen bleiben erhalten.
+    Rückgabe: Anzahl Tage.
+    """
+    conn = db.session.connection()
+
+    bestaetigt = {
+        r.datum: r for r in conn.execute(
+            select(_tag_tbl.c.datum, _tag_tbl.c.ende_bestaetigt, _tag_tbl.c.bestaetigt_von, _tag_tbl.c.notiz)
+            .where((_tag_tbl.c.ende_bestaetigt.isnot(None)) | (_tag_tbl.c.notiz.isnot(None)))
+        )
+    }
+    stall_ids = {r.name: r.id for r in conn.execute(select(_stall_tbl.c.id, _stall_tbl.c.name))}
+
+    tage = {}
+    stall_tage = {}
+    gruppe = (_log_tbl.c.datum, _log_tbl.c.typ, _log_tbl.c.stall_id, _log_tbl.c.kategorie, _log_tbl.c.name)
+    rows = conn.execute(
+        select(*gruppe, func.sum(_log_tbl.c.menge).label("menge"))
+        .where(_log_tbl.c.typ.in_(["zugang", "abgang"]))
+        .group_by(*gruppe)
+    )
+    for r in rows:
+        t = tage.setdefault(r.datum, {"zugang": 0, **{k: 0 for k in ABGANG_KATEGORIEN}})
+        menge = int(r.menge or 0)
+        if r.typ == "zugang":
+            t["zugang"] += menge
+            sid = r.stall_id if r.stall_id is not None else stall_ids.get(stall_name_aus_text(r.name))
+            if sid is not None:
+                stall_tage[(r.datum, sid)] = stall_tage.get((r.datum, sid), 0) + menge
+        else:
+            t[_kategorie(r.kategorie, r.name)] += menge
+    for d in bestaetigt:
+        tage.setdefault(d, {"zugang": 0, **{k: 0 for k in ABGANG_KATEGORIEN}})
+
+    now = datetime.utcnow()
+    neu = []
+    laufend = 0
+    for d in sorted(tage):
+        t = tage[d]
+        start = laufend
+        laufend = start + t["zugang"] - sum(t[k] for k in ABGANG_KATEGORIEN)
+        b = bestaetigt.get(d)
+        neu.append({
+            "datum": d, "start": start, "zugang": t["zugang"], "ende": laufend,
+            **{f"abgang_{k}": t[k] for k in ABGANG_KATEGORIEN},
+            "ende_bestaetigt": b.ende_bestaetigt if b else None,
+            "bestaetigt_von": b.bestaetigt_von if b else None,
+            "notiz": b.notiz if b else None,
+            "updated_at": now,
+        })
+
+    conn.execute(delete(_tag_stall_tbl))
+    conn.execute(delete(_tag_tbl))
+    if neu:
+        conn.execute(insert(_tag_tbl), neu)
+    if stall_tage:
+        conn.execute(insert(_tag_stall_tbl), [
+            {"datum": d, "stall_id": sid, "menge": m} for (d, sid), m in stall_tage.items()
+        ])
+    if commit:
+        db.session.commit()
+    return len(neu)
+
+
+def tagesabschluss_uebernahme_noetig() -> bool:
+    """Bestehende DB mit Buchungen, aber leerem Tagesabschluss?"""
+    if db.session.query(Tagesabschluss.id).first() is not None:
+        return False
+    return db.session.query(LogEntry.id).first() is not None
+
+
+def log_struktur_backfill(batch_size: int = 1000) -> int:
+    """
+    Strukturierte Spalten (stall_id, kategorie, abo_id) für Alt-Buchungen aus dem
+    Buchungstext ableiten. Läuft in Batches über die id (Keyset), ein Commit pro Batch.
+    Rückgabe: Anzahl aktualisierter Buchungen.
+    """
+    from eiermanager.models import Abonnement
+
+    stall_ids = {s.name: s.id for s in Mobilstall.query.all()}
+    abo_ids = {}
+    for a in Abonnement.query.order_by(Abonnement.id.asc()).all():
+        abo_ids.setdefault(a.name, a.id)    # bei Namensgleichheit: ältestes Abo
+
+    upd = (update(_log_tbl)
+           .where(_log_tbl.c.id == bindparam("_id"))
+           .values(stall_id=bindparam("_stall_id"), kategorie=bindparam("_kategorie"),
+                   abo_id=bindparam("_abo_id")))
+
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(_log_tbl.c.id, _log_tbl.c.typ, _log_tbl.c.name,
+                   _log_tbl.c.stall_id, _log_tbl.c.kategorie, _log_tbl.c.abo_id)
+            .where(_log_tbl.c.id > last_id)
+            .order_by(_log_tbl.c.id.asc())
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        params = []
+        for r in rows:
+            stall_id, kategorie, abo_id = r.stall_id, r.kategorie, r.abo_id
+            if r.typ == "zugang" and stall_id is None:
+                stall_id = stall_ids.get(stall_name_aus_text(r.name))
+            elif r.typ == "abgang":
+                if kategorie is None:
+                    kategorie = abgang_kategorie(r.name)
+                if kategorie == "abo" and abo_id is None:
+                    abo_id = abo_ids.get((r.name or "").strip()[len("Abo "):].strip())
+            if (stall_id, kategorie, abo_id) != (r.stall_id, r.kategorie, r.abo_id):
+                params.append({"_id": r.id, "_stall_id": stall_id,
+                               "_kategorie": kategorie, "_abo_id": abo_id})
+        if params:
+            db.session.execute(upd, params)
+            ledger_version_erhoehen()
+        db.session.commit()
+        total += len(params)
+    return total
+
+
+def tagesabschluss_bestaetigen(datum, menge: int, benutzer=None, notiz=None) -> None:
+    """Gezählten Endbestand für `datum` hinterlegen (legt den Tag bei Bedarf an)."""
+    _ensure_tag(db.session.connection(), datum)
+    db.session.execute(
+        update(_tag_tbl).where(_tag_tbl.c.datum == datum)
+        .values(ende_bestaetigt=menge, bestaetigt_von=benutzer, notiz=notiz, updated_at=datetime.utcnow())
+    )
+    ledger_version_erhoehen()           # Übersicht zeigt den bestätigten Wert -> ETag muss wechseln
+    db.session.commit()
+
+
+# -----------------------------
+# CLI: flask bestand rebuild | verify
+# -----------------------------
+@click.group("bestand")
+def bestand_cli():
+    """Eierbestand (Bestandszeile + Tagesabschluss) verwalten."""
+
+
+@bestand_cli.command("rebuild")
+@with_appcontext
+def rebuild_cmd():
+    """Bestand und Tagesabschluss aus dem Eier-Log neu berechnen (Backfill)."""
+    menge = bestand_neu_berechnen(commit=False)
+    tage = tagesabschluss_neu_aufbauen(commit=False)
+    db.session.commit()
+    click.echo(f"Bestand neu berechnet: {menge} ({tage} Tage im Tagesabschluss)")
+
+
+@bestand_cli.command("backfill-struktur")
+@click.option("--batch", "batch_size", default=1000, show_default=True, help="Buchungen pro Transaktion")
+@with_appcontext
+def backfill_struktur_cmd(batch_size):
+    """stall_id/kategorie/abo_id für Alt-Buchungen aus dem Buchungstext ableiten."""
+    n = log_struktur_backfill(batch_size=batch_size)
+    click.echo(f"{n} Buchungen strukturiert nachgetragen.")
+
+
+@bestand_cli.command("verify")
+@with_appcontext
+def verify_cmd():
+    """Gespeicherten Bestand gegen das Eier-Log prüfen (Exit-Code 1 bei Abweichung)."""
+    gespeichert, berechnet = bestand_pruefen()
+    letzter_tag = db.session.execute(
+        select(_tag_tbl.c.ende).order_by(_tag_tbl.c.datum.desc()).limit(1)
+    ).scalar()
+    if gespeichert == berechnet and (letzter_tag is None or letzter_tag == berechnet):
+        click.echo(f"OK: Bestand {berechnet}")
+        return
+    click.echo(f"ABWEICHUNG: gespeichert={gespeichert} berechnet={berechnet} "
+               f"tagesabschluss={letzter_tag}", err=True)
+    raise SystemExit(1)
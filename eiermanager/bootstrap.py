@@ -1,48 +1,121 @@
 # eiermanager/bootstrap.py
+import logging
+from sqlalchemy.exc import IntegrityError
 from eiermanager.extensions import db
 from eiermanager.models import User, Mobilstall, Module
+from eiermanager.security import pin_setzen, pins_migrieren
+
+# Erhöhen, sobald sich Seeds oder einmalige Datenübernahmen ändern -> nächster Start seedet neu
+SEED_VERSION = 5
+
+# key, label, endpoint, admin_only
+BASIS_MODULE = [
+    ("eier",          "Eier",          "eier.index",          False),
+    ("huehner",       "Hühner",        "huehner.index",       False),
+    ("einstellungen", "Einstellungen", "einstellungen.index", True),
+    ("abonnenten",    "Abonnenten",    "abonnenten.index",    False),
+]
+
+
+def _module_sicherstellen(app) -> list:
+    """Basis-Module anlegen bzw. Endpoint/Rechte nachziehen (ein Query, kein Commit)."""
+    vorhanden = {m.key: m for m in Module.query.filter(Module.key.in_([k for k, *_ in BASIS_MODULE])).all()}
+    out = []
+    for key, label, endpoint, admin_only in BASIS_MODULE:
+        m = vorhanden.get(key)
+        if m is None:
+            m = Module(key=key, label=label, endpoint=endpoint, admin_only=admin_only, active=True)
+            db.session.add(m)
+            app.logger.info("[bootstrap] Modul '%s' -> %s", key, endpoint)
+        elif m.endpoint != endpoint or m.admin_only != admin_only:
+            # 'active' bleibt, wie der Admin es gesetzt hat
+            m.endpoint, m.admin_only = endpoint, admin_only
+            app.logger.info("[bootstrap] Modul '%s' aktualisiert.", key)
+        out.append(m)
+
+    # Plugins (SEED_MODULES) inaktiv vorbelegen – der Admin schaltet sie in den Einstellungen frei
+    from eiermanager.plugins import PLUGINS
+    bekannt = set(db.session.execute(db.select(Module.key).where(Module.key.in_(list(PLUGINS)))).scalars())
+    for key, (label, endpoint, admin_only) in PLUGINS.items():
+        if key not in bekannt:
+            db.session.add(Module(key=key, label=label, endpoint=endpoint, admin_only=admin_only, active=False))
+    return out
+
+
+def _stammdaten(app) -> None:
+    """Alle Upserts (Admin, Ställe, Module, Zuordnung, Bestandszeile, Versionen) – ohne Commit."""
+    if db.session.query(User.id).first() is None:
+        admin = User(username="admin", is_admin=True)
+        pin_setzen(admin, "0000")
+        db.session.add(admin)
+        app.logger.info("[bootstrap] Admin-User 'admin' (PIN 0000) angelegt.")
+
+    if db.session.query(Mobilstall.id).first() is None:
+        db.session.add_all([
+            Mobilstall(name="Mobil 1", aktiv=True, hens_start=0),
+            Mobilstall(name="Mobil 2", aktiv=True, hens_start=0),
+            Mobilstall(name="Mobil 3", aktiv=True, hens_start=0),
+        ])
+        app.logger.info("[bootstrap] 3 Mobilställe angelegt.")
+
+    module = _module_sicherstellen(app)
+    db.session.flush()
+
+    # Admin bekommt alle Basis-Module
+    admin = User.query.filter_by(is_admin=True).order_by(User.id.asc()).first()
+    if admin:
+        hat = {m.id for m in admin.modules}
+        admin.modules.extend(m for m in module if m.id not in hat)
+
+    # Bestandszeile vor der ersten Buchung anlegen: beim gebündelten Flush mehrerer
+    # Buchungen sind alle Zeilen schon geschrieben, bevor das erste Mapper-Event läuft
+    from eiermanager.models import EierBestand
+    from eiermanager.bestand import BESTAND_ID, bestand_neu_berechnen
+    if db.session.get(EierBestand, BESTAND_ID) is None:
+        bestand_neu_berechnen(commit=False)
+    from eiermanager.versionen import anlegen
+    anlegen("abos", "module", "herde", "staelle", "benutzer", commit=False)
+
+
+def _uebernahmen(app) -> None:
+    """Einmalige Datenübernahmen bestehender DBs (eigene Commits, ggf. in Batches)."""
+    # Klartext-PINs in Index + Hash überführen
+    r = pins_migrieren()
+    if r["migriert"]:
+        app.logger.info("[bootstrap] %s PINs gehasht.", r["migriert"])
+    if r["doppelt"]:
+        app.logger.warning("[bootstrap] Doppelte PIN – bitte neu vergeben für: %s", r["doppelt"])
+
+    # Tagesabschluss aus dem Eier-Log aufbauen (eier.uebersicht liest nur noch die Rollups)
+    from eiermanager.bestand import tagesabschluss_uebernahme_noetig, tagesabschluss_neu_aufbauen, \
+        ledger_version_erhoehen
+    if tagesabschluss_uebernahme_noetig():
+        tage = tagesabschluss_neu_aufbauen(commit=False)
+        ledger_version_erhoehen()       # gecachte Übersichten (ETag) zeigten noch die leeren Tage
+        db.session.commit()
+        app.logger.info("[bootstrap] Tagesabschluss: %s Tage aus dem Eier-Log übernommen.", tage)
+
+    # Startbestände/Verluste ins Hennen-Ledger übernehmen
+    from eiermanager.herde import herde_uebernahme_noetig, herde_neu_aufbauen
+    if herde_uebernahme_noetig():
+        r = herde_neu_aufbauen()
+        app.logger.info("[bootstrap] Hennen-Ledger: %s Bewegungen übernommen.", r["uebernommen"])
+
 
 def bootstrap_data(app):
     with app.app_context():
-        if User.query.count() == 0:
-            db.session.add(User(username="admin", pin="0000", is_admin=True))
-            app.logger.info("[bootstrap] Admin-User 'admin' (PIN 0000) angelegt.")
-
-        if Mobilstall.query.count() == 0:
-            db.session.add_all([
-                Mobilstall(name="Mobil 1", aktiv=True, hens_start=0),
-                Mobilstall(name="Mobil 2", aktiv=True, hens_start=0),
-                Mobilstall(name="Mobil 3", aktiv=True, hens_start=0),
-            ])
-            app.logger.info("[bootstrap] 3 Mobilställe angelegt.")
-
-        def ensure_module(key, label, endpoint, admin_only=False, active=True):
-            m = Module.query.filter_by(key=key).first()
-            if not m:
-                m = Module(key=key, label=label, endpoint=endpoint,
-                           admin_only=admin_only, active=active)
-                db.session.add(m)
-                app.logger.info(f"[bootstrap] Modul '{key}' -> {endpoint}")
-            else:
-                changed = False
-                if m.endpoint != endpoint:
-                    m.endpoint = endpoint; changed = True
-                if m.admin_only != admin_only:
-                    m.admin_only = admin_only; changed = True
-                if m.active != active:
-                    m.active = active; changed = True
-                if changed:
-                    app.logger.info(f"[bootstrap] Modul '{key}' aktualisiert.")
-            return m
-
-        ensure_module("eier", "Eier", "eier.index", admin_only=False, active=True)
-        ensure_module("huehner", "Hühner", "huehner.index", admin_only=False, active=True)
-        ensure_module("einstellungen", "Einstellungen", "einstellungen.index", admin_only=True, active=True)
-        # Schnellkachel für Tagesgeschäft:
-        ensure_module("abonnenten", "Abonnenten", "eier.abos_heute", admin_only=False, active=True)
+        try:
+            _stammdaten(app)
+            db.session.commit()
+        except IntegrityError:
+            # paralleler Worker hat gerade dasselbe geseedet
+            db.session.rollback()
+            app.logger.info("[bootstrap] Seeds bereits von anderem Prozess angelegt.")
 
-        db.session.commit()
+        _uebernahmen(app)
 
-        app.logger.info("[bootstrap] Users: %s", [u.username for u in User.query.all()])
-        app.logger.info("[bootstrap] Mobilställe: %s", [(s.id, s.name) for s in Mobilstall.query.all()])
-        app.logger.info("[bootstrap] Module: %s", [(m.key, m.endpoint) for m in Module.query.all()])
+        # Dumps nur, wenn sie auch ausgegeben werden
+        if app.logger.isEnabledFor(logging.DEBUG):
+            app.logger.debug("[bootstrap] Users: %s", [u.username for u in User.query.all()])
+            app.logger.debug("[bootstrap] Mobilställe: %s", [(s.id, s.name) for s in Mobilstall.query.all()])
+            app.logger.debug("[bootstrap] Module: %s", [(m.key, m.endpoint) for m in Module.query.all()])
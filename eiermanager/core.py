@@ -1,26 +1,20 @@
 # eiermanager/core.py
+import os
 from flask import Blueprint, render_template, redirect, url_for, jsonify, current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from flask_login import login_required, current_user
+from eiermanager import admin_required
+from eiermanager import perf
+from eiermanager.extensions import db
 from eiermanager.models import Module, User
+from eiermanager.modulregister import sichtbare_module
 
 core_bp = Blueprint("core", __name__)
 
-def _user_can_access(module: Module) -> bool:
-    if not getattr(module, "active", True):
-        return False
-    if module.endpoint not in current_app.view_functions:
-        return False
-    if getattr(current_user, "is_admin", False):
-        return True
-    if getattr(module, "admin_only", False):
-        return False
-    if hasattr(current_user, "modules") and current_user.modules:
-        return any(m.id == module.id for m in current_user.modules)
-    return True
-
 def _visible_modules():
-    mods = Module.query.order_by(Module.label.asc()).all()
-    return [m for m in mods if _user_can_access(m)]
+    # vorberechnete Kachel-Liste aus der Modul-Registry (kein DB-Zugriff)
+    return sichtbare_module(current_user)
 
 @core_bp.route("/")
 def index():
@@ -33,6 +27,30 @@ def index():
 def dashboard():
     return render_template("menu.html", modules=_visible_modules())
 
+# Health-Checks für Server/Load-Balancer (ohne Login, nicht in der Perf-Statistik)
+@core_bp.route("/_health")
+def health():
+    # Liveness: Prozess antwortet – kein DB-Zugriff
+    return jsonify({"status": "ok", "pid": os.getpid()}), 200
+
+@core_bp.route("/_health/ready")
+def ready():
+    # Readiness: App fertig gestartet und DB erreichbar; Plugin-Fehler machen nicht "unready"
+    try:
+        db.session.execute(text("SELECT 1"))
+        db_ok, fehler = True, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        db_ok, fehler = False, f"{type(e).__name__}: {e}"
+    data = {
+        "status": "ok" if db_ok else "fehler",
+        "pid": os.getpid(),
+        "db": fehler or "ok",
+        "startup_ms": current_app.config.get("STARTUP_MS"),
+        "plugin_fehler": current_app.extensions.get("plugins", {}).get("fehler", {}),
+    }
+    return jsonify(data), 200 if db_ok else 503
+
 @core_bp.route("/_debug/modules")
 @login_required
 def debug_modules():
@@ -48,5 +66,28 @@ def debug_modules():
             "is_admin": bool(u and u.is_admin),
             "modules": [m.key for m in (u.modules if u and hasattr(u, "modules") else [])],
         },
+        "plugins": current_app.extensions.get("plugins", {}),
     }
     return jsonify(data), 200
+
+
+@core_bp.route("/_debug/perf")
+@login_required
+@admin_required
+def debug_perf():
+    return render_template("debug_perf.html", daten=perf.auswertung(),
+                           aktiv=current_app.config.get("PERF_ENABLED"),
+                           slow_ms=current_app.config.get("PERF_SLOW_MS"))
+
+@core_bp.route("/_debug/perf.json")
+@login_required
+@admin_required
+def debug_perf_json():
+    return jsonify(perf.auswertung()), 200
+
+@core_bp.route("/_debug/perf/reset", methods=["POST"])
+@login_required
+@admin_required
+def debug_perf_reset():
+    perf.zuruecksetzen()
+    return redirect(url_for("core.debug_perf"))
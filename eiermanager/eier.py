@@ -1,10 +1,24 @@
 # eiermanager/eier.py
 from datetime import date, datetime, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, jsonify,
+                   abort, Response, stream_with_context)
 from flask_login import login_required, current_user
-from sqlalchemy import func, case
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from eiermanager import admin_required
 from eiermanager.extensions import db
-from eiermanager.models import LogEntry, Mobilstall, Abonnement, AboException  # <-- korrekt!
+from eiermanager.models import LogEntry, Mobilstall, Abonnement, AboException, Tagesabschluss, TagesabschlussStall
+from eiermanager.bestand import bestand_aktuell, tagesabschluss_bestaetigen, ABGANG_KATEGORIEN
+from eiermanager.paging import encode_cursor, decode_cursor, parse_date
+from eiermanager.zeitreihen import serie, anzahl_buckets, GRANULARITAETEN, AUFTEILUNGEN, MAX_BUCKETS
+from eiermanager.abholplan import tagesplan, gebuchte_abholungen, abholungen_buchen
+from eiermanager.prognose import prognose as bestandsprognose, MAX_WOCHEN
+from eiermanager.export import buchungen_rows, tage_rows, as_csv, as_ndjson, BUCHUNG_SPALTEN, TAG_SPALTEN
+from eiermanager.herde import BEREICH_STAELLE
+from eiermanager.etag import versioniert
+from eiermanager.sqlite_profil import mit_wiederholung
+from eiermanager.modulregister import BEREICH as MODULE
 
 # --- Blueprint: MUSS existieren, damit __init__.py es registrieren kann ---
 eier_bp = Blueprint("eier", __name__, url_prefix="/eier")
@@ -14,13 +28,8 @@ eier_bp = Blueprint("eier", __name__, url_prefix="/eier")
 # Hilfsfunktion: Eierbestand
 # -----------------------------
 def _bestand() -> int:
-    zugang = db.session.query(
-        func.coalesce(func.sum(case((LogEntry.typ == 'zugang', LogEntry.menge), else_=0)), 0)
-    ).scalar() or 0
-    abgang = db.session.query(
-        func.coalesce(func.sum(case((LogEntry.typ == 'abgang', LogEntry.menge), else_=0)), 0)
-    ).scalar() or 0
-    return int(zugang - abgang)
+    # Laufender Bestand (wird bei jeder LogEntry-Buchung mitgeführt, siehe bestand.py)
+    return bestand_aktuell()
 
 
 # -----------------------------
@@ -43,77 +52,224 @@ def menu():
 # -----------------------------
 @eier_bp.route("/uebersicht")
 @login_required
+@versioniert(BEREICH_STAELLE, MODULE, ledger=True, taeglich=True)
 def uebersicht():
     today = date.today()
-    start_7 = today - timedelta(days=6)      # 7 Tage inkl. heute
     start_14 = today - timedelta(days=13)    # 14 Tage inkl. heute
 
-    # Heutige Summen
-    zugang_heute = db.session.query(
-        func.coalesce(func.sum(case((LogEntry.typ == 'zugang', LogEntry.menge), else_=0)), 0)
-    ).filter(LogEntry.datum == today).scalar() or 0
+    # Tagesabschluss (Rollup) statt Aggregaten über das ganze Log
+    tage = {t.datum: t for t in (Tagesabschluss.query
+                                 .filter(Tagesabschluss.datum >= start_14, Tagesabschluss.datum <= today)
+                                 .all())}
+    vortag = (Tagesabschluss.query
+              .filter(Tagesabschluss.datum < start_14)
+              .order_by(Tagesabschluss.datum.desc())
+              .first())
+
+    zugang_stall = {}
+    for ts in (TagesabschlussStall.query
+               .options(joinedload(TagesabschlussStall.stall))
+               .filter(TagesabschlussStall.datum >= start_14, TagesabschlussStall.datum <= today)
+               .all()):
+        zugang_stall.setdefault(ts.datum, []).append({"stall": ts.stall, "qty": ts.menge})
+
+    # Tageswerte der letzten 14 Tage (lückenlos: fehlende Tage = ohne Bewegung)
+    rows = []
+    laufend = vortag.ende if vortag else 0
+    for i in range(14):
+        d = start_14 + timedelta(days=i)
+        t = tage.get(d)
+        if t:
+            out = {k: getattr(t, f"abgang_{k}") for k in ABGANG_KATEGORIEN}
+            row = {
+                "date": d, "start": t.start, "total_in": t.zugang,
+                "out": out, "total_out": sum(out.values()),
+                "end_calc": t.ende, "end_confirmed": t.ende_bestaetigt, "note": t.notiz,
+            }
+            laufend = t.ende
+        else:
+            row = {
+                "date": d, "start": laufend, "total_in": 0,
+                "out": {k: 0 for k in ABGANG_KATEGORIEN}, "total_out": 0,
+                "end_calc": laufend, "end_confirmed": None, "note": None,
+            }
+        row["zugang_stall"] = sorted(zugang_stall.get(d, []), key=lambda x: x["stall"].name)
+        rows.append(row)
+
+    heute = rows[-1]
+    kpis = {
+        "start_today": heute["start"],
+        "in_today": heute["total_in"],
+        "out_today": heute["total_out"],
+        "end_calc_today": heute["end_calc"],
+        "end_confirmed_today": heute["end_confirmed"],
+    }
 
-    abgang_heute = db.session.query(
-        func.coalesce(func.sum(case((LogEntry.typ == 'abgang', LogEntry.menge), else_=0)), 0)
-    ).filter(LogEntry.datum == today).scalar() or 0
+    return render_template(
+        "eier/uebersicht.html",
+        kpis=kpis,
+        rows=rows,
+        date_from=start_14,
+        date_to=today,
+    )
 
-    sum_heute = {
-        "zugang": int(zugang_heute),
-        "abgang": int(abgang_heute),
-        "netto": int(zugang_heute) - int(abgang_heute),
+
+# -----------------------------
+# Buchungshistorie (Keyset-Paging über (datum, created_at, id))
+# -----------------------------
+HISTORIE_LIMIT = 50
+
+
+def _historie_filter():
+    """Filter aus der Query-String lesen (HTML + JSON identisch)."""
+    stall_id = request.args.get("stall_id", type=int)
+    return {
+        "typ": (request.args.get("typ") or "").strip().lower() or None,
+        "benutzer": (request.args.get("benutzer") or "").strip() or None,
+        "stall_id": stall_id,
+        "von": parse_date(request.args.get("von")),
+        "bis": parse_date(request.args.get("bis")),
     }
 
-    # 7-Tage Summen (inkl. heute)
-    zugang_woche = db.session.query(
-        func.coalesce(func.sum(case((LogEntry.typ == 'zugang', LogEntry.menge), else_=0)), 0)
-    ).filter(LogEntry.datum >= start_7).scalar() or 0
 
-    abgang_woche = db.session.query(
-        func.coalesce(func.sum(case((LogEntry.typ == 'abgang', LogEntry.menge), else_=0)), 0)
-    ).filter(LogEntry.datum >= start_7).scalar() or 0
+def _historie_seite(filters: dict, cursor: str = None, limit: int = HISTORIE_LIMIT):
+    """Eine Seite Buchungen (neueste zuerst) + Cursor für die nächste Seite."""
+    q = LogEntry.query
+    if filters.get("typ") in ("zugang", "abgang"):
+        q = q.filter(LogEntry.typ == filters["typ"])
+    if filters.get("benutzer"):
+        q = q.filter(LogEntry.benutzer == filters["benutzer"])
+    if filters.get("stall_id"):
+        q = q.filter(LogEntry.stall_id == filters["stall_id"])
+    if filters.get("von"):
+        q = q.filter(LogEntry.datum >= filters["von"])
+    if filters.get("bis"):
+        q = q.filter(LogEntry.datum <= filters["bis"])
+
+    key = decode_cursor(cursor, (date, datetime, int))
+    if key:
+        q = q.filter(tuple_(LogEntry.datum, LogEntry.created_at, LogEntry.id) < key)
+
+    rows = (q.order_by(LogEntry.datum.desc(), LogEntry.created_at.desc(), LogEntry.id.desc())
+            .limit(limit + 1)
+            .all())
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor((last.datum, last.created_at, last.id))
+    return rows, next_cursor
+
+
+@eier_bp.route("/buchungen", endpoint="buchungen")
+@login_required
+def buchungen():
+    filters = _historie_filter()
+    rows, next_cursor = _historie_seite(filters, request.args.get("cursor"))
+    stalls = Mobilstall.query.order_by(Mobilstall.name.asc()).all()
+    return render_template("eier/buchungen.html", buchungen=rows, next_cursor=next_cursor,
+                           filters=filters, stalls=stalls)
 
-    sum_woche = {
-        "zugang": int(zugang_woche),
-        "abgang": int(abgang_woche),
-        "netto": int(zugang_woche) - int(abgang_woche),
-    }
 
-    # Tageswerte der letzten 14 Tage (lückenlos)
-    agg_rows = db.session.query(
-        LogEntry.datum.label("d"),
-        func.coalesce(func.sum(case((LogEntry.typ == 'zugang', LogEntry.menge), else_=0)), 0).label("zugang"),
-        func.coalesce(func.sum(case((LogEntry.typ == 'abgang', LogEntry.menge), else_=0)), 0).label("abgang"),
-    ).filter(
-        LogEntry.datum >= start_14
-    ).group_by(
-        LogEntry.datum
-    ).all()
+@eier_bp.route("/api/buchungen", endpoint="api_buchungen")
+@login_required
+def api_buchungen():
+    limit = min(max(request.args.get("limit", HISTORIE_LIMIT, type=int), 1), 500)
+    rows, next_cursor = _historie_seite(_historie_filter(), request.args.get("cursor"), limit)
+    return jsonify({
+        "items": [{
+            "id": e.id,
+            "datum": e.datum.isoformat(),
+            "zeitpunkt": e.zeitpunkt,
+            "typ": e.typ,
+            "menge": e.menge,
+            "benutzer": e.benutzer,
+            "name": e.name,
+            "stall_id": e.stall_id,
+            "kategorie": e.kategorie,
+            "abo_id": e.abo_id,
+            "created_at": e.created_at.isoformat(),
+        } for e in rows],
+        "next_cursor": next_cursor,
+    })
 
-    by_day = {row.d: {"zugang": int(row.zugang or 0), "abgang": int(row.abgang or 0)} for row in agg_rows}
 
-    daily = []
-    for i in range(14):
-        d = start_14 + timedelta(days=i)
-        z = by_day.get(d, {"zugang": 0, "abgang": 0})
-        daily.append({"datum": d, "zugang": z["zugang"], "abgang": z["abgang"]})
+# -----------------------------
+# Zeitreihen-API (Tag / Woche / Monat / Jahr)
+# -----------------------------
+_GRANULARITAET_ALIAS = {"day": "tag", "week": "woche", "month": "monat", "year": "jahr"}
+_AUFTEILUNG_ALIAS = {"category": "kategorie"}
 
-    bestand = _bestand()
 
-    # Letzte Buchungen (neueste zuerst)
-    buchungen = (LogEntry.query
-                 .filter(LogEntry.typ.in_(["zugang", "abgang"]))
-                 .order_by(LogEntry.datum.desc(), LogEntry.zeitpunkt.desc())
-                 .limit(25)
-                 .all())
+@eier_bp.route("/api/series", endpoint="api_series")
+@login_required
+def api_series():
+    bis = parse_date(request.args.get("bis")) or date.today()
+    von = parse_date(request.args.get("von")) or bis - timedelta(days=89)
+    gran = (request.args.get("granularitaet") or request.args.get("granularity") or "tag").lower()
+    gran = _GRANULARITAET_ALIAS.get(gran, gran)
+    auft = (request.args.get("aufteilung") or request.args.get("breakdown") or "").lower() or None
+    auft = _AUFTEILUNG_ALIAS.get(auft, auft)
+
+    if von > bis:
+        return jsonify({"error": "von liegt nach bis"}), 400
+    if gran not in GRANULARITAETEN:
+        return jsonify({"error": f"granularitaet muss eines von {', '.join(GRANULARITAETEN)} sein"}), 400
+    if auft is not None and auft not in AUFTEILUNGEN:
+        return jsonify({"error": f"aufteilung muss eines von {', '.join(AUFTEILUNGEN)} sein"}), 400
+    if anzahl_buckets(von, bis, gran) > MAX_BUCKETS:
+        return jsonify({"error": "Zeitraum zu groß für diese Granularität"}), 400
+
+    return jsonify(serie(von, bis, gran, auft))
 
-    return render_template(
-        "eier/uebersicht.html",
-        bestand=bestand,
-        sum_heute=sum_heute,
-        sum_woche=sum_woche,
-        daily=daily,
-        buchungen=buchungen,
+
+# -----------------------------
+# Export (CSV / NDJSON, gestreamt)
+# -----------------------------
+@eier_bp.route("/export", endpoint="export")
+@login_required
+@admin_required
+def export():
+    fmt = (request.args.get("format") or "csv").lower()
+    if fmt not in ("csv", "ndjson"):
+        abort(400)
+    von = parse_date(request.args.get("von"))
+    bis = parse_date(request.args.get("bis"))
+    pro_tag = request.args.get("aggregation") == "tag"
+
+    rows = tage_rows(von, bis) if pro_tag else buchungen_rows(von, bis)
+    spalten = TAG_SPALTEN if pro_tag else BUCHUNG_SPALTEN
+    body = as_csv(rows, spalten) if fmt == "csv" else as_ndjson(rows, spalten)
+
+    filename = "eier_{}_{}_{}.{}".format(
+        "tage" if pro_tag else "buchungen",
+        von.isoformat() if von else "anfang",
+        bis.isoformat() if bis else "heute",
+        fmt,
     )
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@eier_bp.route("/abschluss", methods=["POST"], endpoint="abschluss")
+@login_required
+@mit_wiederholung
+def abschluss():
+    """Gezählten Endbestand für heute bestätigen."""
+    try:
+        menge = int(request.form.get("menge", ""))
+    except ValueError:
+        menge = -1
+    if menge < 0:
+        flash("Bitte einen gültigen Zählbestand eingeben.", "warning")
+        return redirect(url_for("eier.uebersicht"))
+
+    notiz = (request.form.get("notiz") or "").strip()
+    tagesabschluss_bestaetigen(date.today(), menge,
+                               benutzer=current_user.username, notiz=notiz or None)
+    flash(f"Endbestand bestätigt ({menge}).", "success")
+    return redirect(url_for("eier.uebersicht"))
 
 
 # -----------------------------
@@ -121,6 +277,7 @@ def uebersicht():
 # -----------------------------
 @eier_bp.route("/zugang", methods=["GET", "POST"])
 @login_required
+@mit_wiederholung
 def zugang():
     stalls = Mobilstall.query.filter_by(aktiv=True).order_by(Mobilstall.name.asc()).all()
 
@@ -149,7 +306,8 @@ def zugang():
             typ="zugang",
             menge=menge,
             benutzer=current_user.username,
-            name=f"Produktion {stall.name}"
+            name=f"Produktion {stall.name}",
+            stall_id=stall.id,
         ))
         db.session.commit()
         flash(f"Zugang für {stall.name} gebucht (+{menge}).", "success")
@@ -163,6 +321,7 @@ def zugang():
 # -----------------------------
 @eier_bp.route("/abgang", methods=["GET", "POST"], endpoint="abgang_menu")
 @login_required
+@mit_wiederholung
 def abgang_menu():
     valid_types = {
         "verkauf": "Verkauf",
@@ -170,6 +329,13 @@ def abgang_menu():
         "restaurant": "Restaurant",
         "eigenbedarf": "Eigenbedarf",
     }
+    # Abgangsart -> Kategorie im Tagesabschluss
+    kategorien = {
+        "verkauf": "verkauf",
+        "verlust": "defekt",
+        "restaurant": "sonstiges",
+        "eigenbedarf": "eigenbedarf",
+    }
 
     if request.method == "POST":
         typ = (request.form.get("typ") or "").lower().strip()
@@ -194,7 +360,8 @@ def abgang_menu():
             typ="abgang",
             menge=menge,
             benutzer=current_user.username,
-            name=f"Abgang {valid_types[typ]}"
+            name=f"Abgang {valid_types[typ]}",
+            kategorie=kategorien[typ],
         ))
         db.session.commit()
         flash(f"Abgang „{valid_types[typ]}“ gebucht (-{menge}).", "success")
@@ -202,3 +369,82 @@ def abgang_menu():
 
     # GET
     return render_template("eier/abgang.html", valid_types=valid_types)
+
+
+# -----------------------------
+# Bestandsprognose (Produktionstrend vs. Abos + sonstige Abgänge)
+# -----------------------------
+@eier_bp.route("/prognose", endpoint="prognose")
+@login_required
+def prognose():
+    wochen = min(max(request.args.get("wochen", 4, type=int), 1), MAX_WOCHEN)
+    return render_template("eier/prognose.html", p=bestandsprognose(wochen))
+
+
+@eier_bp.route("/api/prognose", endpoint="api_prognose")
+@login_required
+def api_prognose():
+    wochen = request.args.get("wochen", 4, type=int)
+    if not 1 <= wochen <= MAX_WOCHEN:
+        return jsonify({"error": f"wochen muss zwischen 1 und {MAX_WOCHEN} liegen"}), 400
+    p = bestandsprognose(wochen)
+    return jsonify(dict(
+        p,
+        heute=p["heute"].isoformat(),
+        tage=[dict(t, datum=t["datum"].isoformat()) for t in p["tage"]],
+        engpass_tage=[d.isoformat() for d in p["engpass_tage"]],
+        abo_engpass_tage=[d.isoformat() for d in p["abo_engpass_tage"]],
+    ))
+
+
+# -----------------------------
+# Heutige Abos (Kachel): heute buchen / auf morgen verschieben / Woche aussetzen
+# -----------------------------
+@eier_bp.route("/abos/heute", methods=["GET", "POST"], endpoint="abos_heute")
+@login_required
+@mit_wiederholung
+def abos_heute():
+    today = date.today()
+    plan = tagesplan(today)
+    faellig = {x["abo_id"]: x for x in plan["abholungen"]}
+    ex_by_abo = {x["abo_id"]: x for x in plan["ausgesetzt"]}
+
+    if request.method == "POST":
+        action = request.form.get("action")
+        abo_id = request.form.get("abo_id", type=int)
+        a = db.session.get(Abonnement, abo_id) if abo_id else None
+        if a is None or not a.aktiv or (abo_id not in faellig and abo_id not in ex_by_abo):
+            flash("Abo ist heute nicht fällig.", "warning")
+            return redirect(url_for("eier.abos_heute"))
+        if abo_id in ex_by_abo or abo_id in gebuchte_abholungen(today, [abo_id]):
+            flash(f"Abo {a.name} ist heute bereits erledigt.", "info")
+            return redirect(url_for("eier.abos_heute"))
+
+        if action == "book_today":
+            try:
+                r = abholungen_buchen({a.id: ""}, today, current_user.username)
+            except IntegrityError:
+                db.session.rollback()
+                r = {"gebucht": 0}
+            if r["gebucht"]:
+                flash(f"Abo {a.name} gebucht (-{r['menge']}).", "success")
+            else:
+                flash(f"Abo {a.name} ist heute bereits gebucht.", "info")
+        elif action in ("book_tomorrow", "skip_week") and not faellig[abo_id]["verschoben_von"]:
+            shift = action == "book_tomorrow"
+            db.session.add(AboException(
+                abo_id=a.id, datum=today,
+                action="shift" if shift else "skip",
+                new_datum=today + timedelta(days=1) if shift else None,
+            ))
+            db.session.commit()
+            flash(f"Abo {a.name} " + ("auf morgen verschoben." if shift else "diese Woche ausgesetzt."), "success")
+        else:
+            flash("Ungültige Aktion.", "warning")
+        return redirect(url_for("eier.abos_heute"))
+
+    ids = list(faellig) + list(ex_by_abo)
+    abos = Abonnement.query.filter(Abonnement.id.in_(ids)).order_by(Abonnement.name.asc()).all() if ids else []
+    return render_template("eier/abos_heute.html", abos=abos, ex_by_abo=ex_by_abo, today=today,
+                           gebucht=gebuchte_abholungen(today, ids),
+                           verschoben={i: x["verschoben_von"] for i, x in faellig.items() if x["verschoben_von"]})
@@ -1,9 +1,11 @@
 # eiermanager/einstellungen.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flask_login import login_required
+import io
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask_login import login_required, current_user
 from eiermanager.extensions import db
-from eiermanager.models import Mobilstall, User, Module, Abonnement  # <-- Abonnement statt Abo
+from eiermanager.models import Mobilstall, User, Module, HerdenBewegung
 from eiermanager.__init__ import admin_required
+from eiermanager.security import pin_setzen, pin_vergeben
 
 einstellungen_bp = Blueprint("einstellungen", __name__, url_prefix="/einstellungen")
 
@@ -45,6 +47,11 @@ def stall_new():
 
         st = Mobilstall(name=name, aktiv=aktiv, hens_start=hens_start)
         db.session.add(st)
+        if hens_start > 0:
+            # Startbestand als Einstallung ins Hennen-Ledger
+            db.session.flush()
+            db.session.add(HerdenBewegung(stall_id=st.id, art="einstallung", menge=hens_start,
+                                          notiz="Startbestand", benutzer=current_user.username))
         db.session.commit()
         flash("Stall angelegt.", "success")
         return redirect(url_for("einstellungen.stalle_list"))
@@ -70,9 +77,14 @@ def stall_edit(stall_id: int):
             flash("Bitte einen Namen eingeben.", "warning")
             return redirect(url_for("einstellungen.stall_edit", stall_id=stall_id))
 
+        diff = hens_start - (st.hens_start or 0)
         st.name = name
         st.aktiv = aktiv
         st.hens_start = hens_start
+        if diff:
+            # geänderter Startbestand wirkt als Korrektur auf den laufenden Bestand
+            db.session.add(HerdenBewegung(stall_id=st.id, art="korrektur", menge=diff,
+                                          notiz="Startbestand geändert", benutzer=current_user.username))
         db.session.commit()
         flash("Stall gespeichert.", "success")
         return redirect(url_for("einstellungen.stalle_list"))
@@ -107,7 +119,13 @@ def benutzer_new():
             flash("Benutzername existiert bereits.", "warning")
             return redirect(url_for("einstellungen.benutzer_new"))
 
-        u = User(username=username, pin=pin, is_admin=is_admin)
+        # PIN muss eindeutig sein (Login nur über die PIN)
+        if pin_vergeben(pin):
+            flash("PIN ist bereits vergeben.", "warning")
+            return redirect(url_for("einstellungen.benutzer_new"))
+
+        u = User(username=username, is_admin=is_admin)
+        pin_setzen(u, pin)
         db.session.add(u)
         db.session.commit()
         flash("Benutzer angelegt.", "success")
@@ -116,6 +134,23 @@ def benutzer_new():
     return render_template("einstellungen/benutzer_edit.html")
 
 
+@einstellungen_bp.route("/benutzer/<int:user_id>/pin", methods=["POST"], endpoint="benutzer_pin")
+@login_required
+@admin_required
+def benutzer_pin(user_id: int):
+    u = User.query.get_or_404(user_id)
+    pin = (request.form.get("pin") or "").strip()
+    if len(pin) != 4 or not pin.isdigit():
+        flash("Bitte 4-stellige PIN angeben.", "warning")
+    elif pin_vergeben(pin, ausser_user_id=u.id):
+        flash("PIN ist bereits vergeben.", "warning")
+    else:
+        pin_setzen(u, pin)
+        db.session.commit()
+        flash(f"PIN für {u.username} geändert.", "success")
+    return redirect(url_for("einstellungen.benutzer_list"))
+
+
 @einstellungen_bp.route("/benutzer/<int:user_id>/delete", methods=["POST"], endpoint="benutzer_delete")
 @login_required
 @admin_required
@@ -127,11 +162,59 @@ def benutzer_delete(user_id: int):
     return redirect(url_for("einstellungen.benutzer_list"))
 
 
-# ----------------- Module-Matrix (Platzhalter – verhindert BuildError) -----------------
+# ----------------- Module-Matrix -----------------
 @einstellungen_bp.route("/module", endpoint="module_matrix")
 @login_required
 @admin_required
 def module_matrix():
     # Hier könntest du später Module pro User aktivieren/deaktivieren.
+    from eiermanager.plugins import PLUGINS
     modules = Module.query.order_by(Module.label.asc()).all()
-    return render_template("einstellungen/module_matrix.html", modules=modules)
+    return render_template("einstellungen/module_matrix.html", modules=modules, plugins=PLUGINS,
+                           plugin_status=current_app.extensions.get("plugins", {}))
+
+
+@einstellungen_bp.route("/module/<int:module_id>/aktiv", methods=["POST"], endpoint="module_aktiv")
+@login_required
+@admin_required
+def module_aktiv(module_id: int):
+    from eiermanager.plugins import PLUGINS
+    m = Module.query.get_or_404(module_id)
+    m.active = not m.active
+    db.session.commit()
+    hinweis = " – Plugin wird beim nächsten Neustart geladen/entladen." if m.key in PLUGINS else ""
+    flash(f"Modul '{m.label}' {'aktiviert' if m.active else 'deaktiviert'}{hinweis}", "success")
+    return redirect(url_for("einstellungen.module_matrix"))
+
+
+# ----------------- Historischer Import (CSV-Upload) -----------------
+@einstellungen_bp.route("/import", methods=["GET", "POST"], endpoint="daten_import")
+@login_required
+@admin_required
+def daten_import():
+    from eiermanager.importer import import_buchungen, import_ereignisse, report_text
+
+    report = None
+    if request.method == "POST":
+        datei = request.files.get("datei")
+        art = request.form.get("art")
+        dry_run = request.form.get("dry_run") == "on"
+        if not datei or not datei.filename:
+            flash("Bitte eine CSV-Datei wählen.", "warning")
+            return redirect(url_for("einstellungen.daten_import"))
+        if art not in ("buchungen", "ereignisse"):
+            flash("Bitte die Art der Daten wählen.", "warning")
+            return redirect(url_for("einstellungen.daten_import"))
+
+        fn = import_buchungen if art == "buchungen" else import_ereignisse
+        # Upload zeilenweise lesen (kein komplettes Einlesen in den Speicher)
+        fh = io.TextIOWrapper(datei.stream, encoding="utf-8-sig", newline="")
+        try:
+            report = fn(fh, dry_run=dry_run, benutzer=current_user.username)
+        except UnicodeDecodeError:
+            flash("Datei ist nicht UTF-8-kodiert.", "danger")
+            return redirect(url_for("einstellungen.daten_import"))
+        current_app.logger.info("[import] %s: %s", art, report_text(report))
+        flash(report_text(report), "success" if not report["fehler_anzahl"] else "warning")
+
+    return render_template("einstellungen/import.html", report=report)
@@ -0,0 +1,70 @@
+# eiermanager/etag.py
+"""
+Conditional GET für Übersichten: ETag/Last-Modified aus den Datenversionen.
+
+Der Stand (Versionen der Bereiche + Eier-Log) kostet zwei Primärschlüssel-Lookups.
+Stimmt er mit dem ETag des Clients überein, antwortet der View mit 304 – ohne
+Aggregate und ohne Template. Auth-Decorators laufen vorher wie gewohnt.
+"""
+import hashlib
+from datetime import date, datetime, time
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+from eiermanager import versionen
+
+
+def _stand(bereiche: tuple, ledger: bool, taeglich: bool) -> tuple:
+    """(etag, last_modified) für den aktuellen Request."""
+    teile = [request.endpoint, request.full_path, str(current_user.get_id())]
+    zeiten = []
+    if taeglich:
+        heute = date.today()
+        teile.append(heute.isoformat())
+        zeiten.append(datetime.combine(heute, time.min))
+    for b, (v, geaendert) in sorted(versionen.stand(*bereiche).items()):
+        teile.append(f"{b}={v}")
+        zeiten.append(geaendert)
+    if ledger:
+        from eiermanager.bestand import ledger_stand
+        v, geaendert = ledger_stand()
+        teile.append(f"ledger={v}")
+        zeiten.append(geaendert)
+    etag = hashlib.sha1("|".join(teile).encode("utf-8")).hexdigest()[:20]
+    zeiten = [z for z in zeiten if z is not None]
+    return etag, max(zeiten) if zeiten else None
+
+
+def versioniert(*bereiche, ledger: bool = False, taeglich: bool = False):
+    """
+    GET-View nur rendern, wenn sich seit dem ETag des Clients etwas geändert hat.
+    bereiche: DatenVersion-Bereiche, ledger: Eier-Log (EierBestand.version),
+    taeglich: Seite hängt vom heutigen Datum ab (neuer ETag um Mitternacht).
+    """
+    def deco(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or not current_app.config.get("ETAG_ENABLED", True):
+                return view(*args, **kwargs)
+            # Offene Flash-Meldungen: normal rendern, ohne ETag (sonst käme die Meldung aus dem Browser-Cache wieder)
+            if session.get("_flashes"):
+                response = make_response(view(*args, **kwargs))
+                response.cache_control.no_store = True
+                return response
+            etag, geaendert = _stand(bereiche, ledger, taeglich)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=geaendert):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if geaendert is not None:
+                response.last_modified = geaendert
+            # Browser darf speichern, muss aber jedes Mal nachfragen; nie in geteilten Caches
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return deco
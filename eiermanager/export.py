@@ -0,0 +1,67 @@
+# eiermanager/export.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import select, func, case
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry
+
+# Zeilen pro DB-Fetch (Server-Side-Cursor bei Postgres, bei SQLite ein Batch)
+YIELD_PER = 1000
+
+BUCHUNG_SPALTEN = ("id", "datum", "zeitpunkt", "typ", "menge", "benutzer", "name",
+                   "stall_id", "kategorie", "abo_id", "created_at")
+TAG_SPALTEN = ("datum", "zugang", "abgang", "netto")
+
+
+def _range(stmt, von, bis):
+    if von:
+        stmt = stmt.where(LogEntry.datum >= von)
+    if bis:
+        stmt = stmt.where(LogEntry.datum <= bis)
+    return stmt
+
+
+def buchungen_rows(von=None, bis=None):
+    """Einzelbuchungen im Zeitraum (chronologisch), als Dicts."""
+    cols = [getattr(LogEntry, c) for c in BUCHUNG_SPALTEN]
+    stmt = _range(select(*cols), von, bis).order_by(LogEntry.datum, LogEntry.created_at, LogEntry.id)
+    result = db.session.execute(stmt.execution_options(yield_per=YIELD_PER))
+    for row in result:
+        yield dict(zip(BUCHUNG_SPALTEN, row))
+
+
+def tage_rows(von=None, bis=None):
+    """Tagessummen im Zeitraum (GROUP BY datum), als Dicts."""
+    zugang = func.coalesce(func.sum(case((LogEntry.typ == "zugang", LogEntry.menge), else_=0)), 0)
+    abgang = func.coalesce(func.sum(case((LogEntry.typ == "abgang", LogEntry.menge), else_=0)), 0)
+    stmt = _range(select(LogEntry.datum, zugang, abgang), von, bis).group_by(LogEntry.datum).order_by(LogEntry.datum)
+    result = db.session.execute(stmt.execution_options(yield_per=YIELD_PER))
+    for d, z, a in result:
+        yield {"datum": d, "zugang": int(z), "abgang": int(a), "netto": int(z) - int(a)}
+
+
+def _plain(v):
+    return v.isoformat() if isinstance(v, (date, datetime)) else v
+
+
+def as_csv(rows, spalten):
+    """CSV (Semikolon, wie von Excel mit deutscher Ländereinstellung erwartet) – zeilenweise."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    writer.writerow(spalten)
+    for row in rows:
+        writer.writerow([_plain(row[c]) for c in spalten])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    # Kopfzeile auch bei leerem Ergebnis
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def as_ndjson(rows, spalten):
+    """Newline-delimited JSON – ein Objekt pro Zeile."""
+    for row in rows:
+        yield json.dumps({c: _plain(row[c]) for c in spalten}, ensure_ascii=False) + "\n"
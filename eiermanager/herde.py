@@ -0,0 +1,283 @@
+# eiermanager/herde.py
+from datetime import date, datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, case, select, insert, update, delete, exists, literal, inspect, or_
+from eiermanager.extensions import db
+from eiermanager.models import HerdenBewegung, HennenBestand, HuehnerEvent, LogEntry, Mobilstall
+from eiermanager import versionen
+
+# Bewegungsarten und ihre Wirkung auf den Bestand des Stalls (stall_id).
+# 'umsetzung' bucht zusätzlich +menge im ziel_stall; 'korrektur' trägt das Vorzeichen in menge.
+ARTEN = {
+    "einstallung": 1,
+    "verlust": -1,
+    "keulung": -1,
+    "verkauf": -1,
+    "umsetzung": -1,
+    "korrektur": 1,
+}
+ARTEN_LABEL = {
+    "einstallung": "Einstallung",
+    "verlust": "Verlust",
+    "keulung": "Keulung",
+    "verkauf": "Verkauf",
+    "umsetzung": "Umsetzung",
+    "korrektur": "Korrektur",
+}
+
+_bew_tbl = HerdenBewegung.__table__
+_snap_tbl = HennenBestand.__table__
+_stall_tbl = Mobilstall.__table__
+_event_tbl = HuehnerEvent.__table__
+_log_tbl = LogEntry.__table__
+
+# Versionszähler: Ereignisse + Herdenbewegungen (inkl. laufendem Bestand) bzw. Stall-Stammdaten
+BEREICH = "herde"
+BEREICH_STAELLE = "staelle"
+versionen.beobachten(HuehnerEvent, BEREICH)
+versionen.beobachten(HerdenBewegung, BEREICH)
+versionen.beobachten(Mobilstall, BEREICH_STAELLE)
+
+
+# -----------------------------
+# Wirkung einer Bewegung
+# -----------------------------
+def _wirkungen(b: dict) -> list:
+    """[(stall_id, delta), ...] einer Bewegung."""
+    menge = int(b["menge"] or 0)
+    out = [(b["stall_id"], ARTEN.get(b["art"], 0) * menge)]
+    if b["art"] == "umsetzung" and b["ziel_stall_id"] is not None:
+        out.append((b["ziel_stall_id"], menge))
+    return [(sid, d) for sid, d in out if sid is not None and d]
+
+
+def _apply(connection, stall_id: int, datum, delta: int) -> None:
+    """Laufenden Bestand + Tages-Snapshot (und alle späteren Snapshots) nachführen."""
+    connection.execute(
+        update(_stall_tbl).where(_stall_tbl.c.id == stall_id)
+        .values(hens_current=_stall_tbl.c.hens_current + delta)
+    )
+    vorhanden = connection.execute(
+        select(_snap_tbl.c.id).where(_snap_tbl.c.stall_id == stall_id, _snap_tbl.c.datum == datum)
+    ).scalar()
+    if vorhanden is None:
+        vortag = connection.execute(
+            select(_snap_tbl.c.bestand)
+            .where(_snap_tbl.c.stall_id == stall_id, _snap_tbl.c.datum < datum)
+            .order_by(_snap_tbl.c.datum.desc())
+            .limit(1)
+        ).scalar()
+        connection.execute(insert(_snap_tbl).values(stall_id=stall_id, datum=datum, bestand=int(vortag or 0)))
+    # Rückwirkende Bewegung: Snapshot des Tages und alle späteren verschieben
+    connection.execute(
+        update(_snap_tbl)
+        .where(_snap_tbl.c.stall_id == stall_id, _snap_tbl.c.datum >= datum)
+        .values(bestand=_snap_tbl.c.bestand + delta)
+    )
+
+
+_BEWEGUNG_FELDER = ("stall_id", "ziel_stall_id", "datum", "art", "menge")
+
+
+def _bewegung(target) -> dict:
+    return {f: getattr(target, f) for f in _BEWEGUNG_FELDER}
+
+
+def _buchen(connection, b: dict, sign: int = 1) -> None:
+    for stall_id, delta in _wirkungen(b):
+        _apply(connection, stall_id, b["datum"], sign * delta)
+
+
+# -----------------------------
+# Mapper-Events: Hennenbestand in derselben Transaktion wie HerdenBewegung
+# -----------------------------
+@event.listens_for(HerdenBewegung, "after_insert")
+def _bewegung_after_insert(mapper, connection, target):
+    _buchen(connection, _bewegung(target))
+
+
+@event.listens_for(HerdenBewegung, "after_delete")
+def _bewegung_after_delete(mapper, connection, target):
+    _buchen(connection, _bewegung(target), sign=-1)
+
+
+@event.listens_for(HerdenBewegung, "after_update")
+def _bewegung_after_update(mapper, connection, target):
+    state = inspect(target)
+    old = {}
+    for attr in _BEWEGUNG_FELDER:
+        hist = state.attrs[attr].history
+        old[attr] = hist.deleted[0] if hist.deleted else getattr(target, attr)
+    neu = _bewegung(target)
+    if old == neu:
+        return
+    _buchen(connection, old, sign=-1)
+    _buchen(connection, neu)
+
+
+# -----------------------------
+# Lesen
+# -----------------------------
+def hennen_am(stall_id: int, datum: date) -> int:
+    """Hennenbestand eines Stalls am Ende von `datum` (letzter Snapshot <= datum, Index-Lookup)."""
+    bestand = (
+        db.session.query(HennenBestand.bestand)
+        .filter(HennenBestand.stall_id == stall_id, HennenBestand.datum <= datum)
+        .order_by(HennenBestand.datum.desc())
+        .limit(1)
+        .scalar()
+    )
+    return int(bestand or 0)
+
+
+def snapshots(stall_ids, bis: date) -> list:
+    """Alle Snapshots (stall_id, datum, bestand) bis `bis` – für Zeitreihen."""
+    return (
+        db.session.query(HennenBestand.stall_id, HennenBestand.datum, HennenBestand.bestand)
+        .filter(HennenBestand.stall_id.in_(stall_ids), HennenBestand.datum <= bis)
+        .order_by(HennenBestand.stall_id, HennenBestand.datum)
+        .all()
+    )
+
+
+# -----------------------------
+# Übernahme / Neu berechnen / Prüfen
+# -----------------------------
+def _alt_bestand_uebernehmen(conn) -> int:
+    """
+    Bestehende Daten ins Hennen-Ledger übernehmen (idempotent):
+      - hens_start von Ställen ohne Bewegung als 'einstallung' (am ersten bekannten Tag)
+      - Verlust-Ereignisse ohne verknüpfte Bewegung als 'verlust'
+    Rückgabe: Anzahl neuer Bewegungen.
+    """
+    now = datetime.utcnow()
+    hat_bewegung = exists().where(or_(_bew_tbl.c.stall_id == _stall_tbl.c.id,
+                                      _bew_tbl.c.ziel_stall_id == _stall_tbl.c.id))
+    ohne = conn.execute(
+        select(_stall_tbl.c.id, _stall_tbl.c.hens_start)
+        .where(_stall_tbl.c.hens_start > 0, ~hat_bewegung)
+    ).all()
+
+    neu = []
+    if ohne:
+        ids = [r.id for r in ohne]
+        erster = {}
+        for tbl, extra in ((_log_tbl, _log_tbl.c.typ == "zugang"), (_event_tbl, literal(True))):
+            for sid, d in conn.execute(
+                select(tbl.c.stall_id, func.min(tbl.c.datum))
+                .where(tbl.c.stall_id.in_(ids), extra)
+                .group_by(tbl.c.stall_id)
+            ):
+                if d is not None and (sid not in erster or d < erster[sid]):
+                    erster[sid] = d
+        neu = [{
+            "stall_id": r.id, "ziel_stall_id": None, "datum": erster.get(r.id, date.today()),
+            "art": "einstallung", "menge": int(r.hens_start), "notiz": "Startbestand (Übernahme)",
+            "benutzer": None, "huehner_event_id": None, "created_at": now,
+        } for r in ohne]
+        conn.execute(insert(_bew_tbl), neu)
+
+    verknuepft = exists().where(_bew_tbl.c.huehner_event_id == _event_tbl.c.id)
+    res = conn.execute(insert(_bew_tbl).from_select(
+        ["stall_id", "datum", "art", "menge", "notiz", "huehner_event_id", "created_at"],
+        select(_event_tbl.c.stall_id, _event_tbl.c.datum, literal("verlust"), _event_tbl.c.menge,
+               _event_tbl.c.notiz, _event_tbl.c.id, literal(now))
+        .where(_event_tbl.c.typ == "verlust", _event_tbl.c.menge > 0, ~verknuepft)
+    ))
+    return len(neu) + max(res.rowcount or 0, 0)
+
+
+def _bestand_aus_bewegungen(conn) -> dict:
+    """{stall_id: {datum: delta}} aus zwei gruppierten Queries über das Ledger."""
+    vorzeichen = case(*((_bew_tbl.c.art == art, s) for art, s in ARTEN.items()), else_=0)
+    tage = {}
+    for sid, d, delta in conn.execute(
+        select(_bew_tbl.c.stall_id, _bew_tbl.c.datum, func.sum(vorzeichen * _bew_tbl.c.menge))
+        .group_by(_bew_tbl.c.stall_id, _bew_tbl.c.datum)
+    ):
+        t = tage.setdefault(sid, {})
+        t[d] = t.get(d, 0) + int(delta or 0)
+    for sid, d, menge in conn.execute(
+        select(_bew_tbl.c.ziel_stall_id, _bew_tbl.c.datum, func.sum(_bew_tbl.c.menge))
+        .where(_bew_tbl.c.art == "umsetzung", _bew_tbl.c.ziel_stall_id.isnot(None))
+        .group_by(_bew_tbl.c.ziel_stall_id, _bew_tbl.c.datum)
+    ):
+        t = tage.setdefault(sid, {})
+        t[d] = t.get(d, 0) + int(menge or 0)
+    return tage
+
+
+def herde_neu_aufbauen(commit: bool = True) -> dict:
+    """
+    Backfill: Altdaten übernehmen, dann laufenden Bestand und Tages-Snapshots
+    aller Ställe komplett aus dem Ledger neu aufbauen.
+    Rückgabe: {"uebernommen", "staelle", "snapshots"}.
+    """
+    conn = db.session.connection()
+    uebernommen = _alt_bestand_uebernehmen(conn)
+
+    aktuell = {}
+    neu = []
+    for sid, tage in _bestand_aus_bewegungen(conn).items():
+        laufend = 0
+        for d in sorted(tage):
+            laufend += tage[d]
+            neu.append({"stall_id": sid, "datum": d, "bestand": laufend})
+        aktuell[sid] = laufend
+
+    conn.execute(delete(_snap_tbl))
+    if neu:
+        conn.execute(insert(_snap_tbl), neu)
+    conn.execute(update(_stall_tbl).values(hens_current=0))
+    for sid, menge in aktuell.items():
+        conn.execute(update(_stall_tbl).where(_stall_tbl.c.id == sid).values(hens_current=menge))
+    versionen.erhoehen(conn, BEREICH)       # Core-Updates laufen an den Mapper-Events vorbei
+    if commit:
+        db.session.commit()
+    return {"uebernommen": uebernommen, "staelle": len(aktuell), "snapshots": len(neu)}
+
+
+def herde_pruefen() -> list:
+    """[(stall, gespeichert, berechnet), ...] für Ställe mit Abweichung."""
+    berechnet = {sid: sum(t.values()) for sid, t in _bestand_aus_bewegungen(db.session.connection()).items()}
+    return [(s, s.hens_current, berechnet.get(s.id, 0))
+            for s in Mobilstall.query.order_by(Mobilstall.name.asc()).all()
+            if (s.hens_current or 0) != berechnet.get(s.id, 0)]
+
+
+def herde_uebernahme_noetig() -> bool:
+    """Bestehende DB ohne Hennen-Ledger, aber mit Startbeständen/Verlusten?"""
+    if db.session.query(HerdenBewegung.id).first() is not None:
+        return False
+    return (db.session.query(Mobilstall.id).filter(Mobilstall.hens_start > 0).first() is not None
+            or db.session.query(HuehnerEvent.id).filter(HuehnerEvent.typ == "verlust").first() is not None)
+
+
+# -----------------------------
+# CLI: flask herde rebuild | verify
+# -----------------------------
+@click.group("herde")
+def herde_cli():
+    """Hennenbestand (Herden-Ledger + Tages-Snapshots) verwalten."""
+
+
+@herde_cli.command("rebuild")
+@with_appcontext
+def rebuild_cmd():
+    """Altdaten übernehmen und Hennenbestand aus dem Ledger neu berechnen."""
+    r = herde_neu_aufbauen()
+    click.echo(f"{r['uebernommen']} Bewegungen übernommen, {r['staelle']} Ställe, {r['snapshots']} Snapshots.")
+
+
+@herde_cli.command("verify")
+@with_appcontext
+def verify_cmd():
+    """Gespeicherten Hennenbestand gegen das Ledger prüfen (Exit-Code 1 bei Abweichung)."""
+    abweichungen = herde_pruefen()
+    if not abweichungen:
+        click.echo("OK: Hennenbestand konsistent.")
+        return
+    for s, gespeichert, berechnet in abweichungen:
+        click.echo(f"ABWEICHUNG {s.name}: gespeichert={gespeichert} berechnet={berechnet}", err=True)
+    raise SystemExit(1)
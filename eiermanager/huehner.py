@@ -1,13 +1,24 @@
 # eiermanager/huehner.py
 from datetime import date, datetime, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import func
+from sqlalchemy import func, tuple_, insert
 from eiermanager.extensions import db
-from eiermanager.models import Mobilstall, HuehnerEvent, LogEntry
+from eiermanager.models import Mobilstall, HuehnerEvent, LogEntry, HerdenBewegung, EVENT_TYPEN
+from eiermanager.legeleistung import auswerten
+from eiermanager.herde import ARTEN_LABEL, BEREICH as HERDE, BEREICH_STAELLE
+from eiermanager.etag import versioniert
+from eiermanager.sqlite_profil import mit_wiederholung
+from eiermanager import versionen
+from eiermanager.modulregister import BEREICH as MODULE
+from eiermanager.paging import parse_date, encode_cursor, decode_cursor
 
 huehner_bp = Blueprint("huehner", __name__, url_prefix="/huehner")
 
+# Herdenbewegungen über das Stall-Formular (Verluste laufen über das Ereignis 'verlust',
+# Korrekturen über die Stall-Einstellungen)
+BEWEGUNG_ARTEN = ("einstallung", "keulung", "verkauf", "umsetzung")
+
 
 @huehner_bp.route("/", endpoint="index")
 @login_required
@@ -24,62 +35,45 @@ def menu():
 
 # ===== Helpers =====
 
-def _stall_losses(stall_id: int, days: int = None) -> int:
-    """Summe aller Verluste für einen Stall (optional begrenzt auf X Tage)."""
-    q = HuehnerEvent.query.filter_by(stall_id=stall_id, typ="verlust")
-    if days:
-        since = date.today() - timedelta(days=days - 1)
-        q = q.filter(HuehnerEvent.datum >= since)
-    return int(sum(e.menge or 0 for e in q.all()))
-
-
 def _hens_current(stall: Mobilstall) -> int:
-    """Aktueller Hühnerbestand: Startbestand minus gebuchte Verluste.
-    (Kein hens_adjust im Model – also ggf. 0 als Fallback.)"""
-    adjust = getattr(stall, "hens_adjust", 0) or 0  # falls später ergänzt, sonst 0
-    return int((stall.hens_start or 0) + adjust - _stall_losses(stall.id))
-
-
-def _last_event(stall_id: int, typ: str):
-    """Letztes Ereignis (Datum als 'dd.mm.'). HuehnerEvent hat keine zeitpunkt-Spalte."""
-    e = (
-        HuehnerEvent.query
-        .filter_by(stall_id=stall_id, typ=typ)
-        .order_by(HuehnerEvent.datum.desc(), HuehnerEvent.id.desc())
-        .first()
-    )
-    if not e:
-        return (None, None)
-    # Zeit gibt es im Model nicht -> leer
-    return (e.datum.strftime("%d.%m."), "")
-
-
-def _eggs_last7_for_stall(stall: Mobilstall) -> int:
-    """Heuristik: Eier-Zugänge der letzten 7 Tage, gefiltert über den Stallnamen in LogEntry.name."""
+    """Aktueller Hühnerbestand (laufend aus den Herdenbewegungen nachgeführt, siehe herde.py)."""
+    return int(stall.hens_current or 0)
+
+
+def _uebersicht_cards(stalls) -> list:
+    """
+    Kartendaten für alle Ställe mit konstant 2 gruppierten Queries
+    (Eier 7 Tage, letztes Ereignis je (Stall, Typ)) statt ~6 Queries pro Stall.
+    Der Hennenbestand steht direkt am Stall.
+    """
+    ids = [s.id for s in stalls]
+    if not ids:
+        return []
     since = date.today() - timedelta(days=6)
-    like_name = f"%{stall.name}%"
-    total = (
-            db.session.query(func.coalesce(func.sum(LogEntry.menge), 0))
-            .filter(
-                LogEntry.typ == "zugang",
-                LogEntry.datum >= since,
-                LogEntry.name.ilike(like_name),
-                )
-            .scalar()
-            or 0
+
+    eggs = dict(
+        db.session.query(LogEntry.stall_id, func.coalesce(func.sum(LogEntry.menge), 0))
+        .filter(LogEntry.stall_id.in_(ids), LogEntry.datum >= since, LogEntry.typ == "zugang")
+        .group_by(LogEntry.stall_id)
+        .all()
     )
-    return int(total)
+    last = {
+        (sid, typ): d for sid, typ, d in
+        db.session.query(HuehnerEvent.stall_id, HuehnerEvent.typ, func.max(HuehnerEvent.datum))
+        .filter(HuehnerEvent.stall_id.in_(ids),
+                HuehnerEvent.typ.in_(["fuetterung", "wasser", "ausmisten", "umstallung"]))
+        .group_by(HuehnerEvent.stall_id, HuehnerEvent.typ)
+        .all()
+    }
 
-
-@huehner_bp.route("/uebersicht")
-@login_required
-def uebersicht():
-    stalls = Mobilstall.query.filter_by(aktiv=True).order_by(Mobilstall.name.asc()).all()
+    def fmt(sid, typ):
+        d = last.get((sid, typ))
+        return (d.strftime("%d.%m."), "") if d else (None, None)
 
     cards = []
     for s in stalls:
         hens = _hens_current(s)
-        eggs7 = _eggs_last7_for_stall(s)
+        eggs7 = int(eggs.get(s.id, 0) or 0)
         rate = None
         if hens > 0:
             # grobe Legeleistung (Eier der letzten 7 Tage / (Hennen * 7) * 100)
@@ -90,13 +84,32 @@ def uebersicht():
             "hens": hens,
             "eggs7": eggs7,
             "rate": rate,
-            "last_feed": _last_event(s.id, "fuetterung"),
-            "last_water": _last_event(s.id, "wasser"),
-            "last_clean": _last_event(s.id, "ausmisten"),
-            "last_move": _last_event(s.id, "umstallung"),
+            "last_feed": fmt(s.id, "fuetterung"),
+            "last_water": fmt(s.id, "wasser"),
+            "last_clean": fmt(s.id, "ausmisten"),
+            "last_move": fmt(s.id, "umstallung"),
         })
+    return cards
+
 
-    return render_template("huehner/uebersicht.html", cards=cards)
+@huehner_bp.route("/uebersicht")
+@login_required
+@versioniert(HERDE, BEREICH_STAELLE, MODULE, ledger=True, taeglich=True)
+def uebersicht():
+    stalls = Mobilstall.query.filter_by(aktiv=True).order_by(Mobilstall.name.asc()).all()
+    return render_template("huehner/uebersicht.html", cards=_uebersicht_cards(stalls))
+
+
+@huehner_bp.route("/statistik")
+@login_required
+def statistik():
+    bis = parse_date(request.args.get("bis")) or date.today()
+    von = parse_date(request.args.get("von")) or bis - timedelta(days=27)
+    if von > bis:
+        von, bis = bis, von
+    stalls = Mobilstall.query.filter_by(aktiv=True).order_by(Mobilstall.name.asc()).all()
+    daten = auswerten(stalls, von, bis)
+    return render_template("huehner/statistik.html", stalls=stalls, von=von, bis=bis, **daten)
 
 
 @huehner_bp.route("/stall/<int:stall_id>")
@@ -112,12 +125,125 @@ def stall(stall_id: int):
         .limit(10)
         .all()
     )
+    # letzte 10 Herdenbewegungen (auch Umsetzungen in diesen Stall)
+    bewegungen = (
+        HerdenBewegung.query
+        .filter((HerdenBewegung.stall_id == stall_id) | (HerdenBewegung.ziel_stall_id == stall_id))
+        .order_by(HerdenBewegung.datum.desc(), HerdenBewegung.id.desc())
+        .limit(10)
+        .all()
+    )
+    andere = (Mobilstall.query.filter(Mobilstall.aktiv.is_(True), Mobilstall.id != stall_id)
+              .order_by(Mobilstall.name.asc()).all())
+
+    return render_template("huehner/stall.html", stall=stall, recent=recent,
+                           bewegungen=bewegungen, andere_staelle=andere,
+                           bewegung_arten=BEWEGUNG_ARTEN, arten_label=ARTEN_LABEL)
+
+
+# -----------------------------
+# Stall-Verlauf: Ereignisse + Produktion gemischt, Keyset-Paging über (stall_id, datum, id)
+# -----------------------------
+VERLAUF_LIMIT = 50
+
+# Reihenfolge innerhalb eines Tages (absteigend): Produktion vor Ereignissen
+_QUELLE_RANG = {"ereignis": 0, "produktion": 1}
+
+
+def _verlauf_filter():
+    """Filter aus der Query-String lesen (HTML + JSON identisch)."""
+    typ = (request.args.get("typ") or "").strip().lower() or None
+    return {
+        "typ": typ if typ in EVENT_TYPEN or typ == "produktion" else None,
+        "von": parse_date(request.args.get("von")),
+        "bis": parse_date(request.args.get("bis")),
+    }
+
+
+def _verlauf_quellen(stall_id: int, filters: dict) -> list:
+    """[(rang, model, query), ...] – je Quelle ein Query auf dem (stall_id, datum, id)-Index."""
+    typ = filters.get("typ")
+    quellen = []
+    if typ in (None, "produktion"):
+        q = LogEntry.query.filter(LogEntry.stall_id == stall_id, LogEntry.typ == "zugang")
+        quellen.append((_QUELLE_RANG["produktion"], LogEntry, q))
+    if typ != "produktion":
+        q = HuehnerEvent.query.filter(HuehnerEvent.stall_id == stall_id)
+        if typ:
+            q = q.filter(HuehnerEvent.typ == typ)
+        quellen.append((_QUELLE_RANG["ereignis"], HuehnerEvent, q))
+
+    out = []
+    for rang, model, q in quellen:
+        if filters.get("von"):
+            q = q.filter(model.datum >= filters["von"])
+        if filters.get("bis"):
+            q = q.filter(model.datum <= filters["bis"])
+        out.append((rang, model, q))
+    return out
+
+
+def _verlauf_item(rang: int, e) -> dict:
+    if rang == _QUELLE_RANG["produktion"]:
+        return {"quelle": "produktion", "id": e.id, "datum": e.datum, "typ": "produktion",
+                "menge": e.menge, "text": e.name, "zeitpunkt": e.zeitpunkt, "benutzer": e.benutzer}
+    return {"quelle": "ereignis", "id": e.id, "datum": e.datum, "typ": e.typ,
+            "menge": e.menge, "text": e.notiz, "zeitpunkt": None, "benutzer": None}
+
+
+def _verlauf_seite(stall_id: int, filters: dict, cursor: str = None, limit: int = VERLAUF_LIMIT):
+    """
+    Eine Seite Stall-Verlauf (neueste zuerst) + Cursor (datum, rang, id) für die nächste Seite.
+    Jede Quelle liefert höchstens limit+1 Zeilen ab dem Cursor; gemischt wird in Python.
+    """
+    key = decode_cursor(cursor, (date, int, int))
+    kandidaten = []
+    for rang, model, q in _verlauf_quellen(stall_id, filters):
+        if key:
+            d, r, i = key
+            if rang < r:
+                q = q.filter(model.datum <= d)
+            elif rang == r:
+                q = q.filter(tuple_(model.datum, model.id) < (d, i))
+            else:
+                q = q.filter(model.datum < d)
+        for e in q.order_by(model.datum.desc(), model.id.desc()).limit(limit + 1):
+            kandidaten.append((e.datum, rang, e.id, e))
+
+    kandidaten.sort(key=lambda k: k[:3], reverse=True)
+    next_cursor = None
+    if len(kandidaten) > limit:
+        kandidaten = kandidaten[:limit]
+        next_cursor = encode_cursor(kandidaten[-1][:3])
+    return [_verlauf_item(rang, e) for _, rang, _, e in kandidaten], next_cursor
+
+
+@huehner_bp.route("/stall/<int:stall_id>/verlauf", endpoint="stall_verlauf")
+@login_required
+def stall_verlauf(stall_id: int):
+    stall = Mobilstall.query.get_or_404(stall_id)
+    filters = _verlauf_filter()
+    items, next_cursor = _verlauf_seite(stall.id, filters, request.args.get("cursor"))
+    return render_template("huehner/verlauf.html", stall=stall, items=items, next_cursor=next_cursor,
+                           filters=filters, event_typen=sorted(EVENT_TYPEN))
 
-    return render_template("huehner/stall.html", stall=stall, recent=recent)
+
+@huehner_bp.route("/api/stall/<int:stall_id>/verlauf", endpoint="api_stall_verlauf")
+@login_required
+def api_stall_verlauf(stall_id: int):
+    stall = Mobilstall.query.get_or_404(stall_id)
+    limit = min(max(request.args.get("limit", VERLAUF_LIMIT, type=int), 1), 500)
+    items, next_cursor = _verlauf_seite(stall.id, _verlauf_filter(), request.args.get("cursor"), limit)
+    return jsonify({
+        "stall": {"id": stall.id, "name": stall.name},
+        "items": [dict(i, datum=i["datum"].isoformat()) for i in items],
+        "next_cursor": next_cursor,
+    })
 
 
 @huehner_bp.route("/stall/<int:stall_id>/quick_production", methods=["POST"])
 @login_required
+@mit_wiederholung
 def quick_production(stall_id: int):
     stall = Mobilstall.query.get_or_404(stall_id)
     try:
@@ -135,7 +261,8 @@ def quick_production(stall_id: int):
         typ="zugang",
         menge=menge,
         benutzer=current_user.username,
-        name=f"Produktion {stall.name}"
+        name=f"Produktion {stall.name}",
+        stall_id=stall.id,
     ))
     db.session.commit()
     flash(f"Produktion für {stall.name} gebucht (+{menge}).", "success")
@@ -144,6 +271,7 @@ def quick_production(stall_id: int):
 
 @huehner_bp.route("/stall/<int:stall_id>/event", methods=["POST"])
 @login_required
+@mit_wiederholung
 def event(stall_id: int):
     stall = Mobilstall.query.get_or_404(stall_id)
     typ = (request.form.get("typ") or "").strip().lower()
@@ -155,8 +283,7 @@ def event(stall_id: int):
 
     note = (request.form.get("note") or "").strip()
 
-    # erlaubte Typen – konsistent mit _last_event und vorhandenen Templates
-    if typ not in {"fuetterung", "wasser", "ausmisten", "umstallung", "verlust", "notiz"}:
+    if typ not in EVENT_TYPEN:
         flash("Ungültiger Ereignistyp.", "danger")
         return redirect(url_for("huehner.stall", stall_id=stall_id))
 
@@ -164,13 +291,21 @@ def event(stall_id: int):
         flash("Bitte Verlust-Menge > 0 eingeben.", "warning")
         return redirect(url_for("huehner.stall", stall_id=stall_id))
 
-    db.session.add(HuehnerEvent(
+    ev = HuehnerEvent(
         stall_id=stall.id,
         typ=typ,
         menge=menge if typ == "verlust" else None,
         notiz=note if note else None,
         datum=date.today(),
-    ))
+    )
+    db.session.add(ev)
+    if typ == "verlust":
+        # Verlust ins Hennen-Ledger (gleiche Transaktion)
+        db.session.flush()
+        db.session.add(HerdenBewegung(
+            stall_id=stall.id, datum=ev.datum, art="verlust", menge=menge,
+            notiz=ev.notiz, benutzer=current_user.username, huehner_event_id=ev.id,
+        ))
     db.session.commit()
 
     label = {
@@ -188,3 +323,238 @@ def event(stall_id: int):
         flash(f"{label} gebucht.", "success")
 
     return redirect(url_for("huehner.stall", stall_id=stall_id))
+
+
+@huehner_bp.route("/stall/<int:stall_id>/bewegung", methods=["POST"])
+@login_required
+@mit_wiederholung
+def bewegung(stall_id: int):
+    stall = Mobilstall.query.get_or_404(stall_id)
+    art = (request.form.get("art") or "").strip().lower()
+    try:
+        menge = int(request.form.get("menge", "0"))
+    except ValueError:
+        menge = 0
+    datum = parse_date(request.form.get("datum")) or date.today()
+    note = (request.form.get("note") or "").strip()
+
+    if art not in BEWEGUNG_ARTEN:
+        flash("Ungültige Bewegungsart.", "danger")
+        return redirect(url_for("huehner.stall", stall_id=stall_id))
+    if menge <= 0:
+        flash("Bitte eine Anzahl > 0 eingeben.", "warning")
+        return redirect(url_for("huehner.stall", stall_id=stall_id))
+    if datum > date.today():
+        flash("Datum liegt in der Zukunft.", "warning")
+        return redirect(url_for("huehner.stall", stall_id=stall_id))
+
+    ziel = None
+    if art == "umsetzung":
+        try:
+            ziel = db.session.get(Mobilstall, int(request.form.get("ziel_stall_id") or 0))
+        except ValueError:
+            ziel = None
+        if ziel is None or ziel.id == stall.id:
+            flash("Bitte einen Ziel-Stall wählen.", "warning")
+            return redirect(url_for("huehner.stall", stall_id=stall_id))
+    if art != "einstallung" and menge > (stall.hens_current or 0):
+        flash(f"Nur {stall.hens_current or 0} Hennen im Stall.", "warning")
+        return redirect(url_for("huehner.stall", stall_id=stall_id))
+
+    db.session.add(HerdenBewegung(
+        stall_id=stall.id,
+        ziel_stall_id=ziel.id if ziel else None,
+        datum=datum,
+        art=art,
+        menge=menge,
+        notiz=note or None,
+        benutzer=current_user.username,
+    ))
+    db.session.commit()
+
+    ziel_txt = f" nach {ziel.name}" if ziel else ""
+    sign = "+" if art == "einstallung" else "-"
+    flash(f"{ARTEN_LABEL[art]}{ziel_txt} gebucht ({sign}{menge}).", "success")
+    return redirect(url_for("huehner.stall", stall_id=stall_id))
+
+
+# -----------------------------
+# Rundgang: Ereignisse + Produktion aller Ställe in einem Request / einer Transaktion
+# -----------------------------
+# Häkchen-Ereignisse im Rundgang (Verlust hat ein eigenes Mengenfeld, Notiz ein Textfeld)
+RUNDGANG_EREIGNISSE = ("fuetterung", "wasser", "ausmisten", "umstallung")
+NOTIZ_MAX = HuehnerEvent.__table__.c.notiz.type.length
+
+
+def _int_oder_fehler(value, feld: str, fehler: list, stall_name: str) -> int:
+    if value is None or value == "":
+        return 0
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(value)             # JSON: true/12.5 nicht stillschweigend zu 1/12 machen
+        v = int(value)
+    except (TypeError, ValueError):
+        fehler.append(f"{stall_name}: {feld} keine Zahl '{value}'")
+        return 0
+    if v < 0:
+        fehler.append(f"{stall_name}: {feld} darf nicht negativ sein")
+        return 0
+    return v
+
+
+def _rundgang_pruefen(eintraege, stalls: dict, datum: date) -> tuple:
+    """
+    Alle Einträge gemeinsam validieren.
+    eintraege: [{"stall_id", "produktion", "ereignisse": [...], "verlust", "notiz"}, ...]
+    Rückgabe: (gueltige Einträge, Fehlerliste) – bei Fehlern wird nichts gebucht.
+    """
+    fehler = []
+    if datum > date.today():
+        fehler.append("Datum liegt in der Zukunft.")
+    gueltig = []
+    gesehen = set()
+    for nr, e in enumerate(eintraege, start=1):
+        if not isinstance(e, dict):
+            fehler.append(f"Eintrag {nr}: kein Objekt")
+            continue
+        try:
+            stall = stalls.get(int(e.get("stall_id")))
+        except (TypeError, ValueError):
+            stall = None
+        if stall is None:
+            fehler.append(f"Unbekannter Stall '{e.get('stall_id')}'")
+            continue
+        if stall.id in gesehen:
+            fehler.append(f"{stall.name}: doppelt im Rundgang")
+            continue
+        gesehen.add(stall.id)
+
+        produktion = _int_oder_fehler(e.get("produktion"), "Produktion", fehler, stall.name)
+        verlust = _int_oder_fehler(e.get("verlust"), "Verlust", fehler, stall.name)
+        if verlust > (stall.hens_current or 0):
+            fehler.append(f"{stall.name}: Verlust {verlust} > Bestand {stall.hens_current or 0}")
+        ereignisse = e.get("ereignisse") or []
+        if not isinstance(ereignisse, list) or not all(isinstance(t, str) for t in ereignisse):
+            fehler.append(f"{stall.name}: Ereignisse müssen eine Liste von Texten sein")
+            ereignisse = []
+        ereignisse = [t.strip().lower() for t in ereignisse]
+        unbekannt = [t for t in ereignisse if t not in RUNDGANG_EREIGNISSE]
+        if unbekannt:
+            fehler.append(f"{stall.name}: unbekannte Ereignisse {', '.join(unbekannt)}")
+        notiz = e.get("notiz")
+        if notiz is not None and not isinstance(notiz, str):
+            fehler.append(f"{stall.name}: Notiz muss ein Text sein")
+            notiz = None
+        notiz = (notiz or "").strip() or None
+        if notiz and len(notiz) > NOTIZ_MAX:
+            fehler.append(f"{stall.name}: Notiz länger als {NOTIZ_MAX} Zeichen")
+
+        if produktion or verlust or ereignisse or notiz:
+            gueltig.append({"stall": stall, "produktion": produktion, "verlust": verlust,
+                            "ereignisse": list(dict.fromkeys(ereignisse)), "notiz": notiz})
+    return gueltig, fehler
+
+
+def _rundgang_buchen(eintraege, datum: date, benutzer: str) -> dict:
+    """
+    Geprüfte Einträge in einer Transaktion schreiben:
+      - reine Ereignisse (Fütterung/Wasser/...) per executemany ohne ORM
+      - Produktion und Verluste als ORM-Objekte in einem Flush (gebündelte INSERTs),
+        damit Bestand, Tagesabschluss und Hennen-Ledger über die Mapper-Events mitlaufen
+    """
+    zeitpunkt = datetime.now().strftime("%H:%M")
+    ereignisse = []
+    objekte = []
+    for e in eintraege:
+        stall, notiz = e["stall"], e["notiz"]
+        typen = e["ereignisse"] or (["notiz"] if notiz and not e["verlust"] else [])
+        for typ in typen:
+            ereignisse.append({"stall_id": stall.id, "datum": datum, "typ": typ, "menge": None, "notiz": notiz})
+        if e["produktion"]:
+            objekte.append(LogEntry(
+                datum=datum, zeitpunkt=zeitpunkt, typ="zugang", menge=e["produktion"],
+                benutzer=benutzer, name=f"Produktion {stall.name}", stall_id=stall.id,
+            ))
+        if e["verlust"]:
+            ev = HuehnerEvent(stall_id=stall.id, datum=datum, typ="verlust", menge=e["verlust"], notiz=notiz)
+            objekte.append(HerdenBewegung(
+                stall_id=stall.id, datum=datum, art="verlust", menge=e["verlust"],
+                notiz=notiz, benutzer=benutzer, huehner_event=ev,
+            ))
+
+    if ereignisse:
+        db.session.execute(insert(HuehnerEvent.__table__), ereignisse)
+        # Core-Insert läuft an versionen.beobachten vorbei -> Herde-Version selbst erhöhen (ETag der Übersicht)
+        versionen.erhoehen(db.session.connection(), HERDE)
+    db.session.add_all(objekte)
+    db.session.commit()
+    return {
+        "staelle": len(eintraege),
+        "ereignisse": len(ereignisse) + sum(1 for e in eintraege if e["verlust"]),
+        "produktion": sum(e["produktion"] for e in eintraege),
+        "verlust": sum(e["verlust"] for e in eintraege),
+    }
+
+
+def _rundgang_aus_formular(form, stalls) -> list:
+    """Formularfelder <feld>_<stall_id> in Einträge umwandeln."""
+    return [{
+        "stall_id": s.id,
+        "produktion": (form.get(f"produktion_{s.id}") or "").strip(),
+        "verlust": (form.get(f"verlust_{s.id}") or "").strip(),
+        "ereignisse": [t for t in RUNDGANG_EREIGNISSE if form.get(f"{t}_{s.id}")],
+        "notiz": form.get(f"notiz_{s.id}"),
+    } for s in stalls]
+
+
+@huehner_bp.route("/rundgang", methods=["GET", "POST"], endpoint="rundgang")
+@login_required
+@mit_wiederholung
+def rundgang():
+    stalls = Mobilstall.query.filter_by(aktiv=True).order_by(Mobilstall.name.asc()).all()
+    if request.method == "POST":
+        datum = parse_date(request.form.get("datum")) or date.today()
+        eintraege, fehler = _rundgang_pruefen(_rundgang_aus_formular(request.form, stalls),
+                                              {s.id: s for s in stalls}, datum)
+        if fehler:
+            for f in fehler:
+                flash(f, "danger")
+            return render_template("huehner/rundgang.html", stalls=stalls, werte=request.form,
+                                   datum=datum, ereignis_typen=RUNDGANG_EREIGNISSE)
+        if not eintraege:
+            flash("Nichts zu buchen.", "warning")
+            return redirect(url_for("huehner.rundgang"))
+        r = _rundgang_buchen(eintraege, datum, current_user.username)
+        flash(f"Rundgang gebucht: {r['staelle']} Ställe, {r['ereignisse']} Ereignisse, "
+              f"+{r['produktion']} Eier.", "success")
+        return redirect(url_for("huehner.uebersicht"))
+
+    return render_template("huehner/rundgang.html", stalls=stalls, werte={},
+                           datum=date.today(), ereignis_typen=RUNDGANG_EREIGNISSE)
+
+
+@huehner_bp.route("/api/rundgang", methods=["POST"], endpoint="api_rundgang")
+@login_required
+@mit_wiederholung
+def api_rundgang():
+    """
+    JSON: {"datum": "YYYY-MM-DD" (optional), "staelle": [{"stall_id": 1, "produktion": 120,
+           "ereignisse": ["fuetterung", "wasser"], "verlust": 0, "notiz": "..."}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    eintraege = data.get("staelle")
+    if not isinstance(eintraege, list):
+        return jsonify({"error": "staelle muss eine Liste von Objekten sein"}), 400
+    if data.get("datum") and not isinstance(data["datum"], str):
+        return jsonify({"error": "ungültiges Datum"}), 400
+    datum = parse_date(data.get("datum")) if data.get("datum") else date.today()
+    if datum is None:
+        return jsonify({"error": "ungültiges Datum"}), 400
+
+    stalls = {s.id: s for s in Mobilstall.query.filter_by(aktiv=True).all()}
+    gueltig, fehler = _rundgang_pruefen(eintraege, stalls, datum)
+    if fehler:
+        return jsonify({"error": "Validierung fehlgeschlagen", "fehler": fehler}), 400
+    if not gueltig:
+        return jsonify({"staelle": 0, "ereignisse": 0, "produktion": 0, "verlust": 0})
+    return jsonify(_rundgang_buchen(gueltig, datum, current_user.username))
@@ -0,0 +1,268 @@
+# eiermanager/importer.py
+import csv
+from datetime import date, datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry, HuehnerEvent, Mobilstall, EVENT_TYPEN
+from eiermanager.bestand import ABGANG_KATEGORIEN, abgang_kategorie, bestand_neu_berechnen, tagesabschluss_neu_aufbauen
+from eiermanager.herde import herde_neu_aufbauen
+
+BATCH_SIZE = 1000
+MAX_FEHLER_LISTE = 200      # Fehlerliste im Report begrenzen (Zählung läuft weiter)
+
+
+# -----------------------------
+# Parsing-Helfer
+# -----------------------------
+def _parse_datum(value) -> date:
+    v = (value or "").strip()
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y"):
+        try:
+            return datetime.strptime(v, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"ungültiges Datum '{v}'")
+
+
+def _parse_int(value, feld: str, required: bool = True):
+    v = (value or "").strip()
+    if not v:
+        if required:
+            raise ValueError(f"{feld} fehlt")
+        return None
+    try:
+        return int(v)
+    except ValueError:
+        raise ValueError(f"{feld} keine Zahl '{v}'")
+
+
+def _reader(fh):
+    """DictReader mit automatisch erkanntem Trennzeichen (';' oder ',')."""
+    first = fh.readline()
+    delimiter = ";" if first.count(";") >= first.count(",") else ","
+    header = [h.strip().lower() for h in next(csv.reader([first], delimiter=delimiter))]
+    return csv.DictReader(fh, fieldnames=header, delimiter=delimiter)
+
+
+def _chunks(reader, size: int):
+    chunk = []
+    for zeile, row in enumerate(reader, start=2):     # Zeile 1 = Kopfzeile
+        chunk.append((zeile, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _stall_lookup() -> dict:
+    """Stall per Name (ohne Groß/Klein) oder id auflösen; 'namen' für Buchungstexte."""
+    ids, namen = {}, {}
+    for s in Mobilstall.query.all():
+        ids[s.name.strip().lower()] = s.id
+        ids[str(s.id)] = s.id
+        namen[s.id] = s.name
+    return {"ids": ids, "namen": namen}
+
+
+def _stall_id(row, stalls: dict, required: bool):
+    v = (row.get("stall") or row.get("stall_id") or "").strip()
+    if not v:
+        if required:
+            raise ValueError("Stall fehlt")
+        return None
+    sid = stalls["ids"].get(v.lower())
+    if sid is None:
+        raise ValueError(f"unbekannter Stall '{v}'")
+    return sid
+
+
+# -----------------------------
+# Zeilen-Validierung
+# -----------------------------
+def _buchung_aus_zeile(row, stalls, benutzer, now) -> dict:
+    typ = (row.get("typ") or "").strip().lower()
+    if typ not in ("zugang", "abgang"):
+        raise ValueError(f"typ muss 'zugang' oder 'abgang' sein ('{typ}')")
+    menge = _parse_int(row.get("menge"), "menge")
+    if menge <= 0:
+        raise ValueError("menge muss > 0 sein")
+
+    stall_id = _stall_id(row, stalls, required=False) if typ == "zugang" else None
+    name = (row.get("name") or "").strip() or None
+    kategorie = None
+    if typ == "zugang" and not name:
+        name = f"Produktion {stalls['namen'][stall_id]}" if stall_id else "Produktion (Import)"
+    if typ == "abgang":
+        kategorie = (row.get("kategorie") or "").strip().lower() or abgang_kategorie(name)
+        if kategorie not in ABGANG_KATEGORIEN:
+            raise ValueError(f"unbekannte kategorie '{kategorie}'")
+        name = name or f"Abgang {kategorie.capitalize()}"
+
+    return {
+        "datum": _parse_datum(row.get("datum")),
+        "zeitpunkt": (row.get("zeitpunkt") or "").strip() or None,
+        "typ": typ,
+        "menge": menge,
+        "benutzer": (row.get("benutzer") or "").strip() or benutzer,
+        "name": name,
+        "stall_id": stall_id,
+        "kategorie": kategorie,
+        "abo_id": None,
+        "created_at": now,
+    }
+
+
+# Felder, über die Duplikate erkannt werden
+BUCHUNG_KEY = ("datum", "typ", "menge", "name", "zeitpunkt", "stall_id")
+
+
+def _ereignis_aus_zeile(row, stalls, benutzer, now) -> dict:
+    typ = (row.get("typ") or "").strip().lower()
+    if typ not in EVENT_TYPEN:
+        raise ValueError(f"unbekannter Ereignistyp '{typ}'")
+    menge = _parse_int(row.get("menge"), "menge", required=(typ == "verlust"))
+    if typ == "verlust" and menge <= 0:
+        raise ValueError("Verlust-Menge muss > 0 sein")
+    return {
+        "stall_id": _stall_id(row, stalls, required=True),
+        "datum": _parse_datum(row.get("datum")),
+        "typ": typ,
+        "menge": menge if typ == "verlust" else None,
+        "notiz": (row.get("notiz") or "").strip() or None,
+    }
+
+
+EREIGNIS_KEY = ("stall_id", "datum", "typ", "menge", "notiz")
+
+
+# -----------------------------
+# Import-Kern (chunkweise validieren, Duplikate erkennen, executemany)
+# -----------------------------
+def _import(fh, model, aus_zeile, key_felder, dry_run: bool, batch_size: int, benutzer,
+            nachher=None) -> dict:
+    """
+    Alles oder nichts: Chunks werden per executemany in einer einzigen Transaktion geschrieben,
+    `nachher` (Neuaufbau von Bestand/Rollups, ohne Commit) läuft davor, dann ein Commit.
+    Scheitert ein Chunk, wird komplett zurückgerollt – es bleibt kein halber Import stehen.
+    """
+    tbl = model.__table__
+    key_cols = [tbl.c[f] for f in key_felder]
+
+    report = {"gelesen": 0, "gueltig": 0, "importiert": 0, "duplikate": 0,
+              "fehler_anzahl": 0, "fehler": [], "dry_run": dry_run}
+    stalls = _stall_lookup()
+    gesehen = set()
+    now = datetime.utcnow()
+
+    try:
+        for chunk in _chunks(_reader(fh), batch_size):
+            report["gelesen"] += len(chunk)
+            gueltig = []
+            for zeile, row in chunk:
+                try:
+                    gueltig.append(aus_zeile(row, stalls, benutzer, now))
+                except ValueError as e:
+                    report["fehler_anzahl"] += 1
+                    if len(report["fehler"]) < MAX_FEHLER_LISTE:
+                        report["fehler"].append((zeile, str(e)))
+            report["gueltig"] += len(gueltig)
+            if not gueltig:
+                continue
+
+            # Duplikate: gegen DB (nur Tage dieses Chunks) und innerhalb der Datei
+            tage = {g["datum"] for g in gueltig}
+            vorhanden = set(tuple(r) for r in db.session.execute(
+                select(*key_cols).where(tbl.c.datum.in_(tage))
+            ))
+            neu = []
+            for g in gueltig:
+                k = tuple(g[f] for f in key_felder)
+                if k in vorhanden or k in gesehen:
+                    report["duplikate"] += 1
+                    continue
+                gesehen.add(k)
+                neu.append(g)
+
+            if neu and not dry_run:
+                # Core-executemany: keine ORM-Objekte, keine Mapper-Events pro Zeile
+                db.session.execute(insert(tbl), neu)
+            report["importiert"] += len(neu)
+
+        if report["importiert"] and not dry_run:
+            if nachher is not None:
+                nachher()
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return report
+
+
+def import_buchungen(fh, dry_run: bool = False, batch_size: int = BATCH_SIZE, benutzer: str = "import") -> dict:
+    """
+    Eier-Buchungen aus CSV importieren.
+    Spalten: datum;typ;menge[;name;stall;kategorie;zeitpunkt;benutzer]
+    Bestand und Tagesabschluss werden am Ende einmalig neu aufgebaut (im selben Commit).
+    """
+    def neu_aufbauen():
+        bestand_neu_berechnen(commit=False)
+        tagesabschluss_neu_aufbauen(commit=False)
+
+    return _import(fh, LogEntry, _buchung_aus_zeile, BUCHUNG_KEY, dry_run, batch_size, benutzer,
+                   nachher=neu_aufbauen)
+
+
+def import_ereignisse(fh, dry_run: bool = False, batch_size: int = BATCH_SIZE, benutzer: str = "import") -> dict:
+    """
+    Hühner-Ereignisse aus CSV importieren.
+    Spalten: datum;stall;typ[;menge;notiz]
+    Verluste werden am Ende einmalig ins Hennen-Ledger übernommen (im selben Commit).
+    """
+    return _import(fh, HuehnerEvent, _ereignis_aus_zeile, EREIGNIS_KEY, dry_run, batch_size, benutzer,
+                   nachher=lambda: herde_neu_aufbauen(commit=False))
+
+
+def report_text(report: dict) -> str:
+    prefix = "[Probelauf] " if report["dry_run"] else ""
+    verb = "würden importiert" if report["dry_run"] else "importiert"
+    return (f"{prefix}{report['gelesen']} Zeilen gelesen, {report['importiert']} {verb}, "
+            f"{report['duplikate']} Duplikate, {report['fehler_anzahl']} Fehler.")
+
+
+# -----------------------------
+# CLI: flask import buchungen|ereignisse DATEI [--dry-run]
+# -----------------------------
+@click.group("import")
+def import_cli():
+    """Historische Daten aus CSV importieren."""
+
+
+def _run(fn, datei, dry_run, batch_size):
+    with open(datei, encoding="utf-8-sig", newline="") as fh:
+        report = fn(fh, dry_run=dry_run, batch_size=batch_size)
+    for zeile, msg in report["fehler"]:
+        click.echo(f"Zeile {zeile}: {msg}", err=True)
+    click.echo(report_text(report))
+
+
+@import_cli.command("buchungen")
+@click.argument("datei", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dry-run", is_flag=True, help="Nur prüfen, nichts schreiben")
+@click.option("--batch", "batch_size", default=BATCH_SIZE, show_default=True, help="Zeilen pro Insert (executemany)")
+@with_appcontext
+def import_buchungen_cmd(datei, dry_run, batch_size):
+    """Eier-Buchungen (LogEntry) importieren."""
+    _run(import_buchungen, datei, dry_run, batch_size)
+
+
+@import_cli.command("ereignisse")
+@click.argument("datei", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dry-run", is_flag=True, help="Nur prüfen, nichts schreiben")
+@click.option("--batch", "batch_size", default=BATCH_SIZE, show_default=True, help="Zeilen pro Insert (executemany)")
+@with_appcontext
+def import_ereignisse_cmd(datei, dry_run, batch_size):
+    """Hühner-Ereignisse (HuehnerEvent) importieren."""
+    _run(import_ereignisse, datei, dry_run, batch_size)
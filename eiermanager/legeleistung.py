@@ -0,0 +1,155 @@
+# eiermanager/legeleistung.py
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import func, true
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry, HuehnerEvent, HennenBestand
+from eiermanager.herde import snapshots
+
+ROLLING_TAGE = 7
+
+
+# -----------------------------
+# Laden: Produktion / Hennenbestand als Matrix [Stall x Tag]
+# -----------------------------
+def _einstalldaten(stall_ids) -> dict:
+    """Erster bekannter Tag je Stall (früheste Herdenbewegung, Produktion oder Ereignis)."""
+    first = {}
+    for model, extra in ((HennenBestand, true()), (LogEntry, LogEntry.typ == "zugang"), (HuehnerEvent, true())):
+        rows = (db.session.query(model.stall_id, func.min(model.datum))
+                .filter(model.stall_id.in_(stall_ids), extra)
+                .group_by(model.stall_id)
+                .all())
+        for sid, d in rows:
+            if d is not None and (sid not in first or d < first[sid]):
+                first[sid] = d
+    return first
+
+
+def _matrix(rows, idx: dict, start: date, shape) -> np.ndarray:
+    """(stall_id, datum, menge)-Zeilen eines GROUP BY in eine Matrix schreiben."""
+    m = np.zeros(shape, dtype=np.float64)
+    if rows:
+        s = np.fromiter((idx[r[0]] for r in rows), dtype=np.intp, count=len(rows))
+        d = np.fromiter(((r[1] - start).days for r in rows), dtype=np.intp, count=len(rows))
+        v = np.fromiter((r[2] or 0 for r in rows), dtype=np.float64, count=len(rows))
+        np.add.at(m, (s, d), v)
+    return m
+
+
+def _hennen_matrix(snaps, idx: dict, start: date, shape) -> np.ndarray:
+    """
+    Tages-Snapshots (stall_id, datum, bestand) auf jeden Tag fortschreiben:
+    Wert des letzten Snapshots <= Tag, vor dem ersten Snapshot 0.
+    """
+    v = np.full(shape, np.nan)
+    for sid, d, bestand in snaps:
+        v[idx[sid], max((d - start).days, 0)] = bestand    # ältere Snapshots landen auf Tag 0
+    tage = np.arange(shape[1])[None, :]
+    letzte = np.maximum.accumulate(np.where(np.isnan(v), -1, tage), axis=1)
+    H = np.where(letzte >= 0, v[np.arange(shape[0])[:, None], np.maximum(letzte, 0)], 0.0)
+    return np.clip(H, 0, None)
+
+
+def lade_daten(stalls, bis: date):
+    """
+    Tageswerte aller Ställe seit dem frühesten Einstalltag in je einem Query laden.
+    Rückgabe: (start, P=Eier, H=Hennen, einstall_idx) – Matrizen [Stall x Tag].
+    """
+    ids = [s.id for s in stalls]
+    idx = {sid: i for i, sid in enumerate(ids)}
+    einstall = _einstalldaten(ids)
+    start = min(einstall.values(), default=bis)
+    start = min(start, bis)
+    shape = (len(ids), (bis - start).days + 1)
+
+    prod = (db.session.query(LogEntry.stall_id, LogEntry.datum, func.sum(LogEntry.menge))
+            .filter(LogEntry.typ == "zugang", LogEntry.stall_id.in_(ids),
+                    LogEntry.datum >= start, LogEntry.datum <= bis)
+            .group_by(LogEntry.stall_id, LogEntry.datum)
+            .all())
+
+    P = _matrix(prod, idx, start, shape)
+    # Hennen je Tag aus den Tages-Snapshots des Herden-Ledgers (inkl. Zukauf/Umsetzung)
+    H = _hennen_matrix(snapshots(ids, bis), idx, start, shape)
+    einstall_idx = np.array([(einstall.get(sid, bis) - start).days for sid in ids], dtype=np.intp)
+    return start, P, H, einstall_idx
+
+
+# -----------------------------
+# Kennzahlen (vektorisiert)
+# -----------------------------
+def _rolling_sum(a: np.ndarray, w: int) -> np.ndarray:
+    cs = np.cumsum(a, axis=1)
+    out = cs.copy()
+    out[:, w:] = cs[:, w:] - cs[:, :-w]
+    return out
+
+
+def _quote(eier, hennentage):
+    """Legeleistung in % (Eier je Hennentag), NaN ohne Hennen."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(hennentage > 0, 100.0 * eier / hennentage, np.nan)
+
+
+def _r(x):
+    return None if x is None or np.isnan(x) else round(float(x), 1)
+
+
+def auswerten(stalls, von: date, bis: date) -> dict:
+    """
+    Legeleistung aller Ställe: rollierende 7-Tage-Quote, Veränderung zur Vorwoche,
+    Alterskurve (Quote je Lebenswoche seit Einstallung) und Stallvergleich für [von, bis].
+    """
+    if not stalls:
+        return {"vergleich": [], "verlauf": [], "alterskurve": []}
+
+    start, P, H, einstall_idx = lade_daten(stalls, bis)
+    n_stalls, n_tage = P.shape
+
+    rate7 = _quote(_rolling_sum(P, ROLLING_TAGE), _rolling_sum(H, ROLLING_TAGE))
+    vorwoche = np.full_like(rate7, np.nan)
+    vorwoche[:, ROLLING_TAGE:] = rate7[:, :-ROLLING_TAGE]
+    delta = rate7 - vorwoche
+
+    # Fenster [von, bis] (auf vorhandene Daten begrenzt)
+    a = max((von - start).days, 0)
+    sl = slice(a, n_tage)
+
+    # Stallvergleich im Fenster
+    eier_fenster = P[:, sl].sum(axis=1)
+    quote_fenster = _quote(eier_fenster, H[:, sl].sum(axis=1))
+    vergleich = []
+    for i, s in enumerate(stalls):
+        vergleich.append({
+            "stall": s,
+            "eier": int(eier_fenster[i]),
+            "hennen": int(H[i, -1]),
+            "quote": _r(quote_fenster[i]),
+            "rate7": _r(rate7[i, -1]),
+            "delta": _r(delta[i, -1]),
+            "alter_wochen": max(int((n_tage - 1 - einstall_idx[i]) // 7), 0),
+        })
+
+    # Verlauf (rollierende Quote je Tag im Fenster)
+    verlauf = []
+    for d in range(a, n_tage):
+        verlauf.append({
+            "datum": start + timedelta(days=d),
+            "werte": [_r(rate7[i, d]) for i in range(n_stalls)],
+        })
+
+    # Alterskurve: Quote je Lebenswoche (hennentag-gewichtet), alle Ställe in einem bincount
+    woche = (np.arange(n_tage)[None, :] - einstall_idx[:, None]) // 7
+    gueltig = (woche >= 0) & (H > 0)
+    n_wochen = int(woche[gueltig].max()) + 1 if gueltig.any() else 0
+    alterskurve = []
+    if n_wochen:
+        flat = (np.arange(n_stalls)[:, None] * n_wochen + woche)[gueltig]
+        eier_w = np.bincount(flat, weights=P[gueltig], minlength=n_stalls * n_wochen).reshape(n_stalls, n_wochen)
+        hennen_w = np.bincount(flat, weights=H[gueltig], minlength=n_stalls * n_wochen).reshape(n_stalls, n_wochen)
+        kurve = _quote(eier_w, hennen_w)
+        for w in range(n_wochen):
+            alterskurve.append({"woche": w + 1, "werte": [_r(kurve[i, w]) for i in range(n_stalls)]})
+
+    return {"vergleich": vergleich, "verlauf": verlauf, "alterskurve": alterskurve}
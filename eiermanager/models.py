@@ -19,7 +19,9 @@ user_modules = db.Table(
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(120), unique=True, nullable=False)
-    pin = db.Column(db.String(10), nullable=False)      # 4-stellig (als Text)
+    pin = db.Column(db.String(10), nullable=False, default="")  # Altbestand (Klartext) – nach Migration leer
+    pin_index = db.Column(db.String(64), unique=True, index=True)   # sha256(Pepper + PIN) für den Lookup
+    pin_hash = db.Column(db.String(255))                            # langsamer Hash (werkzeug/scrypt)
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
 
     # UserMixin liefert is_active=True -> kein extra Feld nötig
@@ -50,12 +52,22 @@ class Mobilstall(db.Model):
     name = db.Column(db.String(120), unique=True, nullable=False)
     aktiv = db.Column(db.Boolean, default=True, nullable=False)
     hens_start = db.Column(db.Integer, default=0, nullable=False)
+    # laufender Hennenbestand (aus HerdenBewegung nachgeführt, siehe herde.py)
+    hens_current = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     def __repr__(self) -> str:
-        return f"<Mobilstall {self.name} aktiv={self.aktiv} hens_start={self.hens_start}>"
+        return f"<Mobilstall {self.name} aktiv={self.aktiv} hens={self.hens_current}>"
+
+
+# erlaubte Ereignistypen (Formular, Rundgang, CSV-Import) – konsistent mit huehner._uebersicht_cards
+EVENT_TYPEN = {"fuetterung", "wasser", "ausmisten", "umstallung", "verlust", "notiz"}
 
 
 class HuehnerEvent(db.Model):
+    __table_args__ = (
+        db.Index('ix_huehner_event_stall_typ_datum', 'stall_id', 'typ', 'datum'),
+        db.Index('ix_huehner_event_stall_datum_id', 'stall_id', 'datum', 'id'),   # Stall-Verlauf (Keyset)
+    )
     id = db.Column(db.Integer, primary_key=True)
     stall_id = db.Column(db.Integer, db.ForeignKey('mobilstall.id'), nullable=False, index=True)
     datum = db.Column(db.Date, default=date.today, nullable=False)
@@ -69,10 +81,60 @@ class HuehnerEvent(db.Model):
         return f"<HuehnerEvent stall={self.stall_id} {self.typ} {self.datum}>"
 
 
+class HerdenBewegung(db.Model):
+    """
+    Herdenbewegung eines Stalls (Hennen-Ledger):
+      - 'einstallung' (+), 'verlust' (-), 'keulung' (-), 'verkauf' (-)
+      - 'umsetzung'   (- im Stall, + im ziel_stall)
+      - 'korrektur'   (menge mit Vorzeichen)
+    """
+    __table_args__ = (
+        db.Index('ix_herden_bewegung_stall_datum', 'stall_id', 'datum'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    stall_id = db.Column(db.Integer, db.ForeignKey('mobilstall.id'), nullable=False)
+    ziel_stall_id = db.Column(db.Integer, db.ForeignKey('mobilstall.id'), nullable=True)   # nur 'umsetzung'
+    datum = db.Column(db.Date, default=date.today, nullable=False)
+    art = db.Column(db.String(20), nullable=False)
+    menge = db.Column(db.Integer, nullable=False)
+    notiz = db.Column(db.String(255), nullable=True)
+    benutzer = db.Column(db.String(120), nullable=True)
+    huehner_event_id = db.Column(db.Integer, db.ForeignKey('huehner_event.id', ondelete='SET NULL'),
+                                 nullable=True, unique=True)    # Verlust aus HuehnerEvent
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    stall = db.relationship('Mobilstall', foreign_keys=[stall_id])
+    ziel_stall = db.relationship('Mobilstall', foreign_keys=[ziel_stall_id])
+    huehner_event = db.relationship('HuehnerEvent')
+
+    def __repr__(self) -> str:
+        return f"<HerdenBewegung stall={self.stall_id} {self.art} {self.menge} {self.datum}>"
+
+
+class HennenBestand(db.Model):
+    """Hennenbestand je Stall am Tagesende (nur Tage mit Bewegung; dazwischen gilt der Vortag)."""
+    __tablename__ = 'hennen_bestand'
+    __table_args__ = (db.UniqueConstraint('stall_id', 'datum', name='uq_hennen_bestand_stall_datum'),)
+    id = db.Column(db.Integer, primary_key=True)
+    stall_id = db.Column(db.Integer, db.ForeignKey('mobilstall.id'), nullable=False)
+    datum = db.Column(db.Date, nullable=False)
+    bestand = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<HennenBestand stall={self.stall_id} {self.datum} {self.bestand}>"
+
+
 # -------------------------------------------------
 # Eier-Log (Zugang/Abgang)
 # -------------------------------------------------
 class LogEntry(db.Model):
+    __table_args__ = (
+        db.Index('ix_log_entry_typ_datum', 'typ', 'datum'),
+        db.Index('ix_log_entry_stall_datum_id', 'stall_id', 'datum', 'id'),       # Stall-Verlauf (Keyset)
+        db.Index('ix_log_entry_kategorie_datum', 'kategorie', 'datum'),
+        db.Index('ix_log_entry_abo_datum', 'abo_id', 'datum'),
+        db.Index('ix_log_entry_datum_created_id', 'datum', 'created_at', 'id'),   # Keyset-Paging
+    )
     id = db.Column(db.Integer, primary_key=True)
     datum = db.Column(db.Date, default=date.today, nullable=False)
     zeitpunkt = db.Column(db.String(10), nullable=True)  # "HH:MM"
@@ -82,10 +144,78 @@ class LogEntry(db.Model):
     name = db.Column(db.String(200), nullable=True)      # Beschreibung
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # Strukturierte Zuordnung (statt Textsuche in `name`)
+    stall_id = db.Column(db.Integer, db.ForeignKey('mobilstall.id'), nullable=True)   # nur Zugang
+    kategorie = db.Column(db.String(20), nullable=True)                               # nur Abgang: 'verkauf','abo',...
+    abo_id = db.Column(db.Integer, db.ForeignKey('abonnement.id', ondelete='SET NULL'), nullable=True)
+
+    stall = db.relationship('Mobilstall')
+
     def __repr__(self) -> str:
         return f"<LogEntry {self.typ} {self.menge} {self.datum}>"
 
 
+class EierBestand(db.Model):
+    """
+    Laufender Eierbestand (genau eine Zeile, id=1).
+    Wird bei jedem Insert/Update/Delete auf LogEntry in derselben Transaktion
+    nachgeführt (siehe eiermanager/bestand.py) -> _bestand() ist ein O(1)-Read.
+    """
+    __tablename__ = 'eier_bestand'
+    id = db.Column(db.Integer, primary_key=True)
+    menge = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')   # +1 je Log-Änderung
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<EierBestand {self.menge} v{self.version}>"
+
+
+class Tagesabschluss(db.Model):
+    """
+    Tages-Rollup des Eier-Logs (eine Zeile pro Tag mit Buchungen).
+    start/ende werden inkrementell mitgeführt; ende_bestaetigt = gezählter Bestand.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    datum = db.Column(db.Date, unique=True, nullable=False, index=True)
+    start = db.Column(db.Integer, nullable=False, default=0)
+    zugang = db.Column(db.Integer, nullable=False, default=0)
+    abgang_defekt = db.Column(db.Integer, nullable=False, default=0)
+    abgang_verkauf = db.Column(db.Integer, nullable=False, default=0)
+    abgang_abo = db.Column(db.Integer, nullable=False, default=0)
+    abgang_automat = db.Column(db.Integer, nullable=False, default=0)
+    abgang_eigenbedarf = db.Column(db.Integer, nullable=False, default=0)
+    abgang_sonstiges = db.Column(db.Integer, nullable=False, default=0)
+    ende = db.Column(db.Integer, nullable=False, default=0)              # berechnet
+    ende_bestaetigt = db.Column(db.Integer, nullable=True)               # gezählt (optional)
+    bestaetigt_von = db.Column(db.String(120), nullable=True)
+    notiz = db.Column(db.String(255), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def abgang(self) -> int:
+        return int(self.abgang_defekt + self.abgang_verkauf + self.abgang_abo
+                   + self.abgang_automat + self.abgang_eigenbedarf + self.abgang_sonstiges)
+
+    def __repr__(self) -> str:
+        return f"<Tagesabschluss {self.datum} {self.start} -> {self.ende}>"
+
+
+class TagesabschlussStall(db.Model):
+    """Zugänge pro Tag und Stall (Detail zum Tagesabschluss)."""
+    __tablename__ = 'tagesabschluss_stall'
+    __table_args__ = (db.UniqueConstraint('datum', 'stall_id', name='uq_tagesabschluss_stall'),)
+    id = db.Column(db.Integer, primary_key=True)
+    datum = db.Column(db.Date, nullable=False, index=True)
+    stall_id = db.Column(db.Integer, db.ForeignKey('mobilstall.id'), nullable=False)
+    menge = db.Column(db.Integer, nullable=False, default=0)
+
+    stall = db.relationship('Mobilstall')
+
+    def __repr__(self) -> str:
+        return f"<TagesabschlussStall {self.datum} stall={self.stall_id} +{self.menge}>"
+
+
 # -------------------------------------------------
 # Abonnenten (Eier-Abos) + Ausnahmen (skip/shift)
 # -------------------------------------------------
@@ -108,6 +238,10 @@ class AboException(db.Model):
       - action = 'skip'  -> heutige Woche aussetzen
       - action = 'shift' -> auf new_datum verschieben (z.B. morgen)
     """
+    __table_args__ = (
+        db.Index('ix_abo_exception_datum', 'datum'),
+        db.Index('ix_abo_exception_new_datum', 'new_datum'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     abo_id = db.Column(db.Integer, db.ForeignKey('abonnement.id'), nullable=False, index=True)
     datum = db.Column(db.Date, nullable=False)                       # ursprünglicher Abholtag
@@ -119,3 +253,37 @@ class AboException(db.Model):
 
     def __repr__(self) -> str:
         return f"<AboEx abo={self.abo_id} {self.action} {self.datum} -> {self.new_datum}>"
+
+
+class AboAbholung(db.Model):
+    """
+    Gebuchte Abholung eines Abos an einem Tag (höchstens eine je Abo und Tag).
+    Die Unique-Constraint (abo_id, datum) macht das Buchen idempotent: wiederholtes
+    Absenden bucht nichts doppelt.
+    """
+    __tablename__ = 'abo_abholung'
+    __table_args__ = (db.UniqueConstraint('abo_id', 'datum', name='uq_abo_abholung_abo_datum'),)
+    id = db.Column(db.Integer, primary_key=True)
+    abo_id = db.Column(db.Integer, db.ForeignKey('abonnement.id', ondelete='CASCADE'), nullable=False)
+    datum = db.Column(db.Date, nullable=False, index=True)
+    menge = db.Column(db.Integer, nullable=False)
+    log_entry_id = db.Column(db.Integer, db.ForeignKey('log_entry.id', ondelete='SET NULL'), nullable=True)
+    benutzer = db.Column(db.String(120), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    abo = db.relationship('Abonnement')
+    buchung = db.relationship('LogEntry')
+
+    def __repr__(self) -> str:
+        return f"<AboAbholung abo={self.abo_id} {self.datum} {self.menge}>"
+
+
+class DatenVersion(db.Model):
+    """Versionszähler je Datenbereich (z.B. 'abos') – Schlüssel für prozessübergreifende Caches."""
+    __tablename__ = 'daten_version'
+    bereich = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    geaendert = db.Column(db.DateTime, nullable=True)        # letzte Erhöhung (UTC) -> Last-Modified
+
+    def __repr__(self) -> str:
+        return f"<DatenVersion {self.bereich}={self.version}>"
@@ -0,0 +1,117 @@
+# eiermanager/modulregister.py
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from eiermanager.models import Module
+from eiermanager import versionen
+
+BEREICH = "module"          # Versionszähler der Modul-Tabelle
+PRUEF_INTERVALL = 60        # Sekunden zwischen Versions-Checks (Änderungen aus anderen Prozessen)
+
+versionen.beobachten(Module, BEREICH)
+
+
+class ModulEintrag:
+    """Unveränderliche Kopie einer Module-Zeile (Templates greifen nur lesend zu)."""
+    __slots__ = ("id", "key", "label", "endpoint", "active", "admin_only")
+
+    def __init__(self, m):
+        for f in self.__slots__:
+            object.__setattr__(self, f, getattr(m, f))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ModulEintrag ist unveränderlich")
+
+    def __repr__(self) -> str:
+        return f"<ModulEintrag {self.key} -> {self.endpoint}>"
+
+
+# Registry pro Prozess; wird bei Änderungen als Ganzes ersetzt (Leser brauchen kein Lock)
+_stand = None
+_lock = threading.Lock()
+
+
+def _aufbauen(version: int) -> dict:
+    """Module (nach Label sortiert) + vorberechnete Kachel-Listen je Rolle."""
+    views = current_app.view_functions
+    alle = tuple(ModulEintrag(m) for m in Module.query.order_by(Module.label.asc()).all())
+    nutzbar = tuple(m for m in alle if m.active and m.endpoint in views)
+    return {
+        "version": version,
+        "geprueft": time.monotonic(),
+        "alle": alle,
+        "admin": nutzbar,
+        "standard": tuple(m for m in nutzbar if not m.admin_only),
+        "je_zuordnung": {},         # frozenset(modul_ids) -> tuple, lazy gefüllt
+    }
+
+
+def laden() -> None:
+    """Registry (neu) laden – beim Start und nach Modul-Änderungen."""
+    global _stand
+    with _lock:
+        _stand = _aufbauen(versionen.version(BEREICH))
+
+
+def _aktuell() -> dict:
+    global _stand
+    stand = _stand
+    if stand is not None and time.monotonic() - stand["geprueft"] < PRUEF_INTERVALL:
+        return stand
+    v = versionen.version(BEREICH)
+    with _lock:
+        if _stand is None or _stand["version"] != v:
+            _stand = _aufbauen(v)
+        else:
+            _stand["geprueft"] = time.monotonic()
+        return _stand
+
+
+def module() -> tuple:
+    """Alle Module (sortiert nach Label)."""
+    return _aktuell()["alle"]
+
+
+def sichtbare_module(user) -> tuple:
+    """Für `user` (BenutzerSnapshot) sichtbare, aktive Module mit vorhandenem Endpoint."""
+    stand = _aktuell()
+    if user.is_admin:
+        return stand["admin"]
+    if not user.modul_ids:
+        return stand["standard"]
+    hit = stand["je_zuordnung"].get(user.modul_ids)
+    if hit is None:
+        hit = stand["je_zuordnung"][user.modul_ids] = tuple(
+            m for m in stand["standard"] if m.id in user.modul_ids)
+    return hit
+
+
+# -----------------------------
+# Änderungen im eigenen Prozess: nach Commit sofort neu laden lassen
+# -----------------------------
+_PENDING = "modulregister_veraltet"
+
+
+def _vormerken(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_PENDING] = True
+
+
+for _ev in ("after_insert", "after_update", "after_delete"):
+    event.listen(Module, _ev, _vormerken)
+
+
+@event.listens_for(Session, "after_commit")
+def _nach_commit(session):
+    global _stand
+    if session.info.pop(_PENDING, False):
+        with _lock:
+            _stand = None
+
+
+@event.listens_for(Session, "after_rollback")
+def _nach_rollback(session):
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,44 @@
+# eiermanager/paging.py
+import base64
+import json
+from datetime import date, datetime
+
+
+def encode_cursor(values) -> str:
+    """Keyset-Cursor (z.B. (datum, created_at, id) der letzten Zeile) als URL-sicherer String."""
+    plain = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(plain, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types) -> tuple:
+    """
+    Cursor zurück in typisierte Werte wandeln (types z.B. (date, datetime, int)).
+    Ungültige/manipulierte Cursor -> None (= erste Seite).
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        plain = json.loads(raw.decode("utf-8"))
+        if not isinstance(plain, list) or len(plain) != len(types):
+            return None
+        out = []
+        for t, v in zip(types, plain):
+            if t is date:
+                out.append(date.fromisoformat(v))
+            elif t is datetime:
+                out.append(datetime.fromisoformat(v))
+            else:
+                out.append(t(v))
+        return tuple(out)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        return None
+
+
+def parse_date(value):
+    """'YYYY-MM-DD' -> date (leer/ungültig -> None)."""
+    try:
+        return date.fromisoformat((value or "").strip()) if value else None
+    except ValueError:
+        return None
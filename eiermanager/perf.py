@@ -0,0 +1,186 @@
+# eiermanager/perf.py
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+import numpy as np
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from eiermanager.extensions import db
+
+PERZENTILE = (50, 90, 95, 99)
+HISTOGRAMM_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)     # Obergrenzen der Buckets
+TOP_STATEMENTS = 5          # langsamste Statements je Request
+SQL_LAENGE = 500            # Statement-Text in den Aufzeichnungen kürzen
+IGNORIERT = {"static", "core.health", "core.ready"}
+
+# Ringpuffer pro Prozess
+_lock = threading.Lock()
+_je_endpoint = OrderedDict()        # endpoint -> deque[record]
+_letzte = deque(maxlen=200)         # letzte Requests (alle Endpoints)
+_langsam = deque(maxlen=50)         # Slow-Log inkl. Query-Plänen
+
+
+# -----------------------------
+# Erfassung: Engine-Events + Request-Hooks + Template-Signale
+# -----------------------------
+def _aktiv() -> bool:
+    return has_request_context() and "perf" in g and not g.perf.get("aus")
+
+
+def _vor_sql(conn, cursor, statement, parameters, context, executemany):
+    if _aktiv():
+        conn.info.setdefault("perf_start", []).append(time.perf_counter())
+
+
+def _nach_sql(conn, cursor, statement, parameters, context, executemany):
+    if not _aktiv():
+        return
+    starts = conn.info.get("perf_start")
+    if not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    p = g.perf
+    p["queries"] += 1
+    p["sql_ms"] += ms
+    eintrag = (ms, p["queries"], statement, None if executemany else parameters)
+    if len(p["top"]) < TOP_STATEMENTS:
+        heapq.heappush(p["top"], eintrag)
+    elif ms > p["top"][0][0]:
+        heapq.heapreplace(p["top"], eintrag)
+
+
+def _vor_render(sender, template, context, **extra):
+    if _aktiv():
+        g.perf["render_start"].append(time.perf_counter())
+
+
+def _nach_render(sender, template, context, **extra):
+    if _aktiv() and g.perf["render_start"]:
+        g.perf["render_ms"] += (time.perf_counter() - g.perf["render_start"].pop()) * 1000
+
+
+def _request_start():
+    if request.endpoint in IGNORIERT:
+        return
+    g.perf = {"start": time.perf_counter(), "queries": 0, "sql_ms": 0.0, "render_ms": 0.0,
+              "render_start": [], "top": []}
+
+
+def _request_ende(response):
+    if "perf" not in g or g.perf.get("aus"):
+        return response
+    from flask import current_app
+    p = g.perf
+    dauer = (time.perf_counter() - p["start"]) * 1000
+    top = sorted(p["top"], reverse=True)
+    rec = {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "endpoint": request.endpoint or "<404>",
+        "methode": request.method,
+        "pfad": request.full_path.rstrip("?"),
+        "status": response.status_code,
+        "dauer_ms": round(dauer, 2),
+        "sql_ms": round(p["sql_ms"], 2),
+        "queries": p["queries"],
+        "render_ms": round(p["render_ms"], 2),
+        "bytes": response.content_length,         # None bei Streaming-Antworten
+        "langsamste": [{"ms": round(ms, 2), "nr": nr, "sql": stmt[:SQL_LAENGE]} for ms, nr, stmt, _ in top],
+    }
+    ring = current_app.config["PERF_RING"]
+    with _lock:
+        d = _je_endpoint.get(rec["endpoint"])
+        if d is None:
+            d = _je_endpoint[rec["endpoint"]] = deque(maxlen=ring)
+        d.append(rec)
+        _letzte.append(rec)
+
+    schwelle = current_app.config["PERF_SLOW_MS"]
+    if schwelle and dauer >= schwelle:
+        p["aus"] = True                           # EXPLAIN-Queries nicht mitzählen
+        rec = dict(rec, plaene=_query_plaene(top[:current_app.config["PERF_EXPLAIN_TOP"]]))
+        with _lock:
+            _langsam.append(rec)
+        current_app.logger.warning("[perf] langsam: %s %s %.0f ms, %s Queries (%.0f ms SQL)",
+                                   rec["methode"], rec["pfad"], dauer, rec["queries"], rec["sql_ms"])
+    return response
+
+
+def _query_plaene(top) -> list:
+    """Query-Pläne der langsamsten SELECTs (SQLite: EXPLAIN QUERY PLAN, sonst EXPLAIN)."""
+    prefix = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    out = []
+    with db.engine.connect() as conn:
+        for ms, nr, stmt, params in top:
+            if params is None or not stmt.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            try:
+                plan = [" ".join(str(x) for x in row) for row in conn.exec_driver_sql(prefix + stmt, params)]
+            except Exception as e:           # Plan ist Diagnose – darf den Request nie stören
+                plan = [f"{type(e).__name__}: {e}"]
+            out.append({"ms": round(ms, 2), "nr": nr, "sql": stmt[:SQL_LAENGE], "plan": plan})
+    return out
+
+
+def init_app(app) -> None:
+    """Instrumentierung einschalten (PERF_ENABLED=0 schaltet sie ab)."""
+    app.config.setdefault("PERF_ENABLED", os.environ.get("PERF_ENABLED", "1") != "0")
+    app.config.setdefault("PERF_RING", int(os.environ.get("PERF_RING", "500")))
+    app.config.setdefault("PERF_SLOW_MS", float(os.environ.get("PERF_SLOW_MS", "0")))     # 0 = Slow-Log aus
+    app.config.setdefault("PERF_EXPLAIN_TOP", 3)
+    if not app.config["PERF_ENABLED"]:
+        return
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _vor_sql)
+        event.listen(db.engine, "after_cursor_execute", _nach_sql)
+    before_render_template.connect(_vor_render, app)
+    template_rendered.connect(_nach_render, app)
+    app.before_request(_request_start)
+    app.after_request(_request_ende)
+
+
+# -----------------------------
+# Auswertung
+# -----------------------------
+def _perzentile(werte) -> dict:
+    if not len(werte):
+        return {f"p{q}": None for q in PERZENTILE}
+    return {f"p{q}": round(float(v), 2) for q, v in zip(PERZENTILE, np.percentile(werte, PERZENTILE))}
+
+
+def auswertung() -> dict:
+    """Kennzahlen je Endpoint (sortiert nach p95), letzte Requests, Slow-Log."""
+    with _lock:
+        daten = {ep: list(d) for ep, d in _je_endpoint.items()}
+        letzte = list(_letzte)
+        langsam = list(_langsam)
+
+    grenzen = np.array(HISTOGRAMM_MS, dtype=np.float64)
+    endpoints = []
+    for ep, recs in daten.items():
+        dauer = np.array([r["dauer_ms"] for r in recs])
+        queries = np.array([r["queries"] for r in recs])
+        groessen = [r["bytes"] for r in recs if r["bytes"] is not None]
+        histo = np.bincount(np.searchsorted(grenzen, dauer), minlength=len(grenzen) + 1)
+        endpoints.append({
+            "endpoint": ep,
+            "n": len(recs),
+            "dauer_ms": dict(_perzentile(dauer), max=round(float(dauer.max()), 2)),
+            "sql_ms": _perzentile([r["sql_ms"] for r in recs]),
+            "render_ms": _perzentile([r["render_ms"] for r in recs]),
+            "queries": {"mittel": round(float(queries.mean()), 1), "max": int(queries.max())},
+            "bytes_mittel": int(sum(groessen) / len(groessen)) if groessen else None,
+            "histogramm": [{"bis_ms": b, "anzahl": int(n)}
+                           for b, n in zip(list(HISTOGRAMM_MS) + [None], histo.tolist())],
+        })
+    endpoints.sort(key=lambda e: e["dauer_ms"]["p95"] or 0, reverse=True)
+    return {"endpoints": endpoints, "letzte": letzte[::-1], "langsam": langsam[::-1]}
+
+
+def zuruecksetzen() -> None:
+    with _lock:
+        _je_endpoint.clear()
+        _letzte.clear()
+        _langsam.clear()
@@ -0,0 +1,52 @@
+# eiermanager/plugins.py
+import importlib
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from eiermanager.extensions import db
+from eiermanager.modules_seed import SEED_MODULES
+
+# Fest verdrahtete Kern-Blueprints – werden immer registriert, nie als Plugin
+KERN = {"core", "benutzer", "eier", "huehner", "einstellungen", "abonnenten"}
+
+# key -> (label, endpoint, admin_only); Code liegt in eiermanager/<key>.py als <key>_bp
+PLUGINS = {key: (label, endpoint, admin_only)
+           for key, label, endpoint, admin_only in SEED_MODULES if key not in KERN}
+
+
+def aktive_plugins(app) -> set:
+    """Keys der in der Module-Tabelle aktiven Plugins (leer bei neuer DB ohne Tabelle)."""
+    from eiermanager.models import Module
+    tbl = Module.__table__
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                keys = conn.execute(
+                    select(tbl.c.key).where(tbl.c.active.is_(True), tbl.c.key.in_(list(PLUGINS)))
+                ).scalars()
+                return set(keys)
+        except (OperationalError, ProgrammingError):
+            return set()
+
+
+def plugins_laden(app) -> dict:
+    """
+    Nur aktive Plugins importieren (Blueprint + ggf. eigene Models) und registrieren.
+    Importfehler bleiben auf das jeweilige Plugin beschränkt (Warnung, App startet weiter).
+    Templates lädt Jinja ohnehin erst beim ersten Rendern.
+    Muss vor dem Schema-Schritt laufen, damit Plugin-Tabellen mit angelegt werden.
+    Rückgabe (auch in app.extensions["plugins"]): {"geladen": [...], "fehler": {key: text}}.
+    """
+    status = {"geladen": [], "fehler": {}}
+    for key in sorted(aktive_plugins(app)):
+        try:
+            modul = importlib.import_module(f"eiermanager.{key}")
+            app.register_blueprint(getattr(modul, f"{key}_bp"))
+        except Exception as e:
+            status["fehler"][key] = f"{type(e).__name__}: {e}"
+            app.logger.warning("[plugins] '%s' nicht geladen: %s", key, status["fehler"][key])
+            continue
+        status["geladen"].append(key)
+    app.extensions["plugins"] = status
+    if status["geladen"]:
+        app.logger.info("[plugins] geladen: %s", status["geladen"])
+    return status
@@ -0,0 +1,181 @@
+# eiermanager/prognose.py
+from collections import OrderedDict
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import func
+from eiermanager.extensions import db
+from eiermanager.models import Mobilstall, Tagesabschluss, TagesabschlussStall
+from eiermanager.bestand import ABGANG_KATEGORIEN, bestand_aktuell, ledger_version
+from eiermanager.legeleistung import _matrix
+from eiermanager import abholplan, versionen
+
+HISTORIE_TAGE = 56          # Basis für Trend und Wochentagsprofil (8 Wochen)
+ALPHA = 0.1                 # Gewichtsabfall je Tag (jüngere Tage zählen mehr)
+DAEMPFUNG = 0.9             # gedämpfter Trend: Steigung klingt in die Zukunft ab
+MAX_WOCHEN = 26
+CACHE_GROESSE = 32
+
+# Zwei Cache-Stufen pro Prozess:
+#   _parameter_cache: Trend je Stall + Wochentagsprofil (nur Historie bis gestern; ändert sich
+#               höchstens einmal am Tag oder bei rückwirkenden Buchungen)
+#   _cache:     fertige Prognose; neue Buchungen/Abo-Änderungen rechnen nur die Simulation neu
+_parameter_cache = OrderedDict()
+_cache = OrderedDict()
+
+
+def _lru_put(cache: OrderedDict, key, value):
+    cache[key] = value
+    while len(cache) > CACHE_GROESSE:
+        cache.popitem(last=False)
+    return value
+
+
+# -----------------------------
+# Trend-Parameter aus der Historie (Tages-Rollups)
+# -----------------------------
+def _historie_fingerprint(start: date, ende: date) -> tuple:
+    """Ändert sich, sobald ein Tag im Fenster neu gebucht/bestätigt wird (updated_at)."""
+    n, zuletzt = (db.session.query(func.count(Tagesabschluss.id), func.max(Tagesabschluss.updated_at))
+                  .filter(Tagesabschluss.datum >= start, Tagesabschluss.datum <= ende)
+                  .one())
+    return n, zuletzt
+
+
+def _gewichteter_trend(Y: np.ndarray) -> tuple:
+    """
+    Exponentiell gewichtete lineare Regression je Zeile (vektorisiert).
+    Y: [Stall x Tag], letzter Tag = gestern. Rückgabe: (Niveau heute, Steigung je Tag).
+    """
+    n = Y.shape[1]
+    t = np.arange(-n, 0, dtype=np.float64)                  # gestern = -1, heute = 0
+    w = (1.0 - ALPHA) ** (-t - 1)
+    sw, swt, swtt = w.sum(), (w * t).sum(), (w * t * t).sum()
+    swy = Y @ w
+    swty = Y @ (w * t)
+    nenner = sw * swtt - swt * swt
+    steigung = (sw * swty - swt * swy) / nenner
+    niveau = (swy - steigung * swt) / sw                    # Achsenabschnitt bei t = 0
+    return niveau, steigung
+
+
+def _parameter_berechnen(heute: date, stall_ids: list) -> dict:
+    start = heute - timedelta(days=HISTORIE_TAGE)
+    gestern = heute - timedelta(days=1)
+    idx = {sid: i for i, sid in enumerate(stall_ids)}
+
+    # Produktion je Stall und Tag (Rollup statt Scan über das Log)
+    rows = (db.session.query(TagesabschlussStall.stall_id, TagesabschlussStall.datum, TagesabschlussStall.menge)
+            .filter(TagesabschlussStall.stall_id.in_(stall_ids),
+                    TagesabschlussStall.datum >= start, TagesabschlussStall.datum <= gestern)
+            .all()) if stall_ids else []
+    P = _matrix(rows, idx, start, (len(stall_ids), HISTORIE_TAGE))
+    if stall_ids:
+        niveau, steigung = _gewichteter_trend(P)
+        # Ställe ohne Produktion im Fenster (neu/leer) nicht extrapolieren
+        ohne = P.sum(axis=1) == 0
+        niveau[ohne], steigung[ohne] = 0.0, 0.0
+    else:
+        niveau = steigung = np.zeros(0)
+
+    # sonstige Abgänge (alles außer Abo) als Mittel je Wochentag
+    sonstige_spalten = [getattr(Tagesabschluss, f"abgang_{k}") for k in ABGANG_KATEGORIEN if k != "abo"]
+    tage = (db.session.query(Tagesabschluss.datum, sum(sonstige_spalten[1:], sonstige_spalten[0]))
+            .filter(Tagesabschluss.datum >= start, Tagesabschluss.datum <= gestern)
+            .all())
+    sonstige = np.zeros(HISTORIE_TAGE)
+    for d, menge in tage:
+        sonstige[(d - start).days] = menge or 0
+    wochentag = (start.weekday() + np.arange(HISTORIE_TAGE)) % 7
+    profil = np.bincount(wochentag, weights=sonstige, minlength=7) / np.bincount(wochentag, minlength=7)
+
+    return {"stall_ids": stall_ids, "niveau": niveau, "steigung": steigung, "sonstige_profil": profil}
+
+
+def _parameter(heute: date, stall_ids: list) -> dict:
+    key = (heute, tuple(stall_ids),
+           _historie_fingerprint(heute - timedelta(days=HISTORIE_TAGE), heute - timedelta(days=1)))
+    hit = _parameter_cache.get(key)
+    if hit is not None:
+        _parameter_cache.move_to_end(key)
+        return hit
+    return _lru_put(_parameter_cache, key, _parameter_berechnen(heute, stall_ids))
+
+
+# -----------------------------
+# Simulation (vektorisiert über alle Tage)
+# -----------------------------
+def _simulieren(heute: date, wochen: int, stalls: list, par: dict) -> dict:
+    n = wochen * 7
+    k = np.arange(n, dtype=np.float64)
+    # gedämpfter Trend: Niveau + Steigung * (φ + φ² + … + φ^k)
+    daempf = np.concatenate(([0.0], np.cumsum(DAEMPFUNG ** np.arange(1, n))))
+    Z = np.clip(par["niveau"][:, None] + par["steigung"][:, None] * daempf[None, :], 0, None)   # [Stall x Tag]
+    zugang = Z.sum(axis=0)
+
+    wochentag = (heute.weekday() + k.astype(np.intp)) % 7
+    sonstige = par["sonstige_profil"][wochentag]
+
+    tage_plan = abholplan.plan(heute, heute + timedelta(days=n - 1))
+    abo = np.array([t["summe"] for t in tage_plan], dtype=np.float64)
+
+    # heute: bereits Gebuchtes steckt schon im Bestand -> nur den Rest einplanen
+    t_heute = Tagesabschluss.query.filter(Tagesabschluss.datum == heute).first()
+    if t_heute is not None:
+        zugang[0] = max(zugang[0] - t_heute.zugang, 0)
+        sonstige[0] = max(sonstige[0] - (t_heute.abgang - t_heute.abgang_abo), 0)
+    gebucht = abholplan.gebuchte_abholungen(heute, [x["abo_id"] for x in tage_plan[0]["abholungen"]])
+    abo[0] = sum(x["menge"] for x in tage_plan[0]["abholungen"] if x["abo_id"] not in gebucht)
+
+    start_bestand = bestand_aktuell()
+    nur_abo = start_bestand + np.cumsum(zugang - abo)          # Bestand, wenn nur Abos abgehen
+    bestand = nur_abo - np.cumsum(sonstige)                     # inkl. erwarteter sonstiger Abgänge
+    # für Hofladen/Verkauf frei: was bis zum Horizont nicht für Abos gebraucht wird
+    verfuegbar = np.clip(np.minimum.accumulate(nur_abo[::-1])[::-1], 0, None)
+
+    rund = lambda a: np.rint(a).astype(int).tolist()        # noqa: E731
+    zugang_l, abo_l, sonstige_l = rund(zugang), rund(abo), rund(sonstige)
+    bestand_l, nur_abo_l, verfuegbar_l = rund(bestand), rund(nur_abo), np.floor(verfuegbar).astype(int).tolist()
+    tage = []
+    for i, t in enumerate(tage_plan):
+        tage.append({
+            "datum": t["datum"],
+            "zugang": zugang_l[i],
+            "abo": abo_l[i],
+            "sonstige": sonstige_l[i],
+            "bestand": bestand_l[i],
+            "bestand_nur_abo": nur_abo_l[i],
+            "verfuegbar": verfuegbar_l[i],
+            "engpass": bestand_l[i] < 0,
+            "abo_engpass": nur_abo_l[i] < 0,
+        })
+
+    return {
+        "heute": heute,
+        "wochen": wochen,
+        "bestand_heute": start_bestand,
+        "tage": tage,
+        "engpass_tage": [t["datum"] for t in tage if t["engpass"]],
+        "abo_engpass_tage": [t["datum"] for t in tage if t["abo_engpass"]],
+        "staelle": [{"stall_id": s.id, "name": s.name,
+                     "niveau": round(float(par["niveau"][i]), 1),
+                     "steigung": round(float(par["steigung"][i]), 2)} for i, s in enumerate(stalls)],
+    }
+
+
+def prognose(wochen: int = 4, heute: date = None) -> dict:
+    """
+    Bestandsprognose für `wochen` Wochen ab heute: Produktionstrend je Stall minus
+    Abo-Abholungen (Abholplan inkl. Ausnahmen) minus sonstige Abgänge (Wochentagsprofil).
+    Gecacht pro Log-/Abo-Version; die Trend-Parameter nur pro Tag bzw. Historienstand.
+    """
+    heute = heute or date.today()
+    wochen = max(1, min(int(wochen), MAX_WOCHEN))
+    stalls = Mobilstall.query.filter_by(aktiv=True).order_by(Mobilstall.name.asc()).all()
+    stall_ids = [s.id for s in stalls]
+
+    key = (heute, wochen, tuple(stall_ids), ledger_version(), versionen.version(abholplan.BEREICH))
+    hit = _cache.get(key)
+    if hit is not None:
+        _cache.move_to_end(key)
+        return hit
+    return _lru_put(_cache, key, _simulieren(heute, wochen, stalls, _parameter(heute, stall_ids)))
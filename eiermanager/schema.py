@@ -0,0 +1,83 @@
+# eiermanager/schema.py
+import zlib
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from eiermanager.extensions import db
+
+
+def ensure_schema(app) -> None:
+    """
+    Leichtgewichtige Schema-Nachführung für bestehende Datenbanken.
+    db.create_all() legt nur fehlende Tabellen an – neue (nullable) Spalten und
+    Indizes an bestehenden Tabellen werden hier ergänzt.
+    """
+    with app.app_context():
+        engine = db.engine
+        insp = inspect(engine)
+        existing_tables = set(insp.get_table_names())
+
+        with engine.begin() as conn:
+            for table in db.metadata.sorted_tables:
+                if table.name not in existing_tables:
+                    continue
+
+                have = {c["name"] for c in insp.get_columns(table.name)}
+                for col in table.columns:
+                    if col.name in have:
+                        continue
+                    if not col.nullable and col.server_default is None:
+                        app.logger.warning("[schema] Spalte %s.%s fehlt (NOT NULL ohne Default) – bitte manuell migrieren.",
+                                           table.name, col.name)
+                        continue
+                    col_type = col.type.compile(dialect=engine.dialect)
+                    ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col_type}'
+                    if col.server_default is not None:
+                        ddl += f" DEFAULT {col.server_default.arg}"
+                    conn.execute(text(ddl))
+                    app.logger.info("[schema] Spalte %s.%s ergänzt.", table.name, col.name)
+
+                for idx in table.indexes:
+                    idx.create(bind=conn, checkfirst=True)
+
+
+# -----------------------------
+# Start-Version: Schema + Seeds unverändert -> create_all/ensure_schema/Seeding überspringen
+# -----------------------------
+START_BEREICH = "start"
+
+
+def schema_fingerprint() -> str:
+    """Tabellen, Spalten (+Typ/Nullable) und Indizes aus den Models – ohne DB-Zugriff."""
+    teile = []
+    for table in db.metadata.sorted_tables:
+        teile.append(table.name)
+        teile.extend(f"{c.name}:{c.type}:{c.nullable}" for c in table.columns)
+        teile.extend(sorted(i.name or "" for i in table.indexes))
+    return "|".join(teile)
+
+
+def start_version(seed_version: int) -> int:
+    return zlib.crc32(f"{seed_version}|{schema_fingerprint()}".encode("utf-8")) & 0x7FFFFFFF
+
+
+def gespeicherte_start_version(app):
+    """Zuletzt erfolgreich gestartete Version (None bei neuer DB/Altbestand ohne Tabelle)."""
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                return conn.execute(
+                    text("SELECT version FROM daten_version WHERE bereich = :b"), {"b": START_BEREICH}
+                ).scalar()
+        except OperationalError:
+            return None
+
+
+def start_version_speichern(app, version: int) -> None:
+    from eiermanager.models import DatenVersion
+    with app.app_context():
+        row = db.session.get(DatenVersion, START_BEREICH)
+        if row is None:
+            db.session.add(DatenVersion(bereich=START_BEREICH, version=version))
+        else:
+            row.version = version
+        db.session.commit()
@@ -1,12 +1,205 @@
 # eiermanager/security.py
 import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
 from flask import current_app
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash, check_password_hash
+from eiermanager.extensions import db
 
-def pin_index_from_pin(pin: str) -> str:
+MIGRATION_BATCH = 200
+PEPPER_DATEI = "pin_pepper"
+
+
+def pepper_laden(instance_path: str) -> str:
+    """
+    Pepper aus instance/pin_pepper lesen; fehlt die Datei, einmalig zufällig erzeugen
+    (nur für den Besitzer lesbar). Paralleler Erststart: O_EXCL, der Verlierer liest.
+    """
+    pfad = os.path.join(instance_path, PEPPER_DATEI)
+    try:
+        fd = os.open(pfad, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(pfad, encoding="utf-8") as fh:
+            pepper = fh.read().strip()
+        if not pepper:
+            raise RuntimeError(f"{pfad} ist leer – Datei löschen (alle PINs neu vergeben) oder PIN_PEPPER setzen.")
+        return pepper
+    pepper = secrets.token_hex(32)
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(pepper)
+    return pepper
+
+
+def pin_index_from_pin(pin: str, pepper: str = None) -> str:
     """
     Berechnet einen deterministischen, durchsuchbaren Index für eine PIN.
     Speichert NICHT die PIN im Klartext. Für Lookup + danach Hash-Check.
     """
     pin = (pin or "").strip()
-    pepper = current_app.config.get("PIN_PEPPER", "default-pepper")
+    pepper = pepper or current_app.config["PIN_PEPPER"]
     return hashlib.sha256((pepper + pin).encode("utf-8")).hexdigest()
+
+
+def _indizes(pin: str) -> list:
+    """Index mit aktuellem Pepper (+ mit PIN_PEPPER_ALT, falls für einen Pepper-Wechsel gesetzt)."""
+    out = [pin_index_from_pin(pin)]
+    alt = current_app.config.get("PIN_PEPPER_ALT")
+    if alt:
+        out.append(pin_index_from_pin(pin, alt))
+    return out
+
+
+# -----------------------------
+# PIN setzen / prüfen
+# -----------------------------
+def pin_setzen(user, pin: str) -> None:
+    """Index (gepeppert, eindeutig) + langsamer Hash setzen; Klartext-Spalte leeren."""
+    pin = (pin or "").strip()
+    user.pin_index = pin_index_from_pin(pin)
+    user.pin_hash = generate_password_hash(pin)
+    user.pin = ""
+
+
+def pin_vergeben(pin: str, ausser_user_id: int = None) -> bool:
+    """Ist die PIN schon einem (anderen) Benutzer zugeordnet?"""
+    from eiermanager.models import User
+    q = db.session.query(User.id).filter(User.pin_index.in_(_indizes(pin)))
+    if ausser_user_id is not None:
+        q = q.filter(User.id != ausser_user_id)
+    return q.first() is not None
+
+
+def user_fuer_pin(pin: str):
+    """
+    Login-Lookup: ein Index-Treffer über den Unique-Index, danach der (teure)
+    Hash-Check nur für diesen einen Kandidaten. None bei falscher PIN.
+    """
+    from eiermanager.models import User
+    pin = (pin or "").strip()
+    if not pin:
+        return None
+    indizes = _indizes(pin)
+    u = User.query.filter(User.pin_index.in_(indizes)).first()
+    if u is None or not u.pin_hash or not check_password_hash(u.pin_hash, pin):
+        return None
+    if u.pin_index != indizes[0]:
+        # Index stammt noch vom alten Pepper -> mit der jetzt bekannten PIN umschlüsseln
+        u.pin_index = indizes[0]
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+    return u
+
+
+# -----------------------------
+# Migration: Klartext-PINs -> Index + Hash (in Batches)
+# -----------------------------
+def pins_migrieren(batch: int = MIGRATION_BATCH) -> dict:
+    """
+    Alle Benutzer mit Klartext-PIN und ohne Hash übernehmen; Commit je Batch.
+    Doppelte PINs (Unique-Index!) bekommt nur der erste Benutzer – bei den übrigen wird
+    der Klartext trotzdem gelöscht; ohne Index/Hash können sie sich nicht anmelden, bis
+    der Admin eine neue PIN vergibt (Benutzerliste: "neu vergeben").
+    Rückgabe: {"migriert", "doppelt": [username, ...]}.
+    """
+    from eiermanager.models import User
+    tbl = User.__table__
+    vergeben = set(db.session.execute(select(tbl.c.pin_index).where(tbl.c.pin_index.isnot(None))).scalars())
+    migriert, doppelt, letzte_id = 0, [], 0
+    while True:
+        rows = db.session.execute(
+            select(tbl.c.id, tbl.c.username, tbl.c.pin)
+            .where(tbl.c.pin_hash.is_(None), tbl.c.pin != "", tbl.c.id > letzte_id)
+            .order_by(tbl.c.id)
+            .limit(batch)
+        ).all()
+        if not rows:
+            break
+        letzte_id = rows[-1].id
+        werte, ohne = [], []
+        for r in rows:
+            idx = pin_index_from_pin(r.pin)
+            if idx in vergeben:
+                doppelt.append(r.username)
+                ohne.append({"b_id": r.id})
+                continue
+            vergeben.add(idx)
+            werte.append({"b_id": r.id, "b_index": idx, "b_hash": generate_password_hash(r.pin.strip())})
+        if werte:
+            db.session.execute(
+                update(tbl).where(tbl.c.id == bindparam("b_id"))
+                .values(pin_index=bindparam("b_index"), pin_hash=bindparam("b_hash"), pin=""),
+                werte,
+            )
+        if ohne:
+            db.session.execute(update(tbl).where(tbl.c.id == bindparam("b_id")).values(pin=""), ohne)
+        db.session.commit()
+        migriert += len(werte)
+    return {"migriert": migriert, "doppelt": doppelt}
+
+
+# -----------------------------
+# Fehlversuch-Drossel (pro Prozess, im Speicher)
+# -----------------------------
+class LoginDrossel:
+    """
+    Zählt Fehlversuche je Schlüssel (Client-IP) in einem gleitenden Fenster.
+    Ab `max_versuche` wird der Schlüssel gesperrt; jede weitere Fehlserie verdoppelt
+    die Sperre (bis `max_sperre`). Gesperrte Anfragen werden vor DB-Zugriff und
+    Hash-Check abgewiesen. Speicher ist auf `max_eintraege` Schlüssel begrenzt (LRU).
+
+    Der Zustand liegt im Speicher jedes Worker-Prozesses: mit N gunicorn-Workern sind bis
+    zu N x max_versuche Fehlversuche je Fenster möglich, bevor alle Worker sperren. Die
+    Client-IP ist request.remote_addr – hinter einem Reverse-Proxy nur mit PROXY_ANZAHL
+    der echte Client (sonst teilen sich alle Geräte die Proxy-Adresse und eine Sperre).
+    """
+
+    def __init__(self, max_versuche=5, fenster=300, sperre=30, max_sperre=900, max_eintraege=10000):
+        self.max_versuche = max_versuche
+        self.fenster = fenster
+        self.sperre = sperre
+        self.max_sperre = max_sperre
+        self.max_eintraege = max_eintraege
+        self._lock = threading.Lock()
+        self._eintraege = OrderedDict()       # key -> {"fehler": deque[ts], "bis": ts, "stufe": n}
+
+    def wartezeit(self, key: str) -> int:
+        """Sekunden bis zum nächsten erlaubten Versuch (0 = frei)."""
+        with self._lock:
+            e = self._eintraege.get(key)
+            if e is None:
+                return 0
+            rest = e["bis"] - time.monotonic()
+            return int(rest) + 1 if rest > 0 else 0
+
+    def fehlschlag(self, key: str) -> None:
+        jetzt = time.monotonic()
+        with self._lock:
+            e = self._eintraege.get(key)
+            if e is None:
+                e = self._eintraege[key] = {"fehler": deque(), "bis": 0.0, "stufe": 0}
+                while len(self._eintraege) > self.max_eintraege:
+                    self._eintraege.popitem(last=False)
+            else:
+                self._eintraege.move_to_end(key)
+            fehler = e["fehler"]
+            fehler.append(jetzt)
+            while fehler and fehler[0] < jetzt - self.fenster:
+                fehler.popleft()
+            if len(fehler) >= self.max_versuche:
+                e["bis"] = jetzt + min(self.sperre * 2 ** e["stufe"], self.max_sperre)
+                e["stufe"] += 1
+                fehler.clear()
+
+    def erfolg(self, key: str) -> None:
+        with self._lock:
+            self._eintraege.pop(key, None)
+
+
+login_drossel = LoginDrossel()
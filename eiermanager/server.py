@@ -0,0 +1,76 @@
+# eiermanager/server.py
+"""
+Produktionsserver (gunicorn, gthread-Worker) – Start über `python run.py`.
+
+- App wird einmal im Master gebaut (Schema/Seeds laufen nur dort), Worker erben sie per fork
+- Nach dem fork bekommt jeder Worker einen eigenen Verbindungs-Pool
+- Worker-Recycling nach SERVER_MAX_REQUESTS (+ Jitter, damit nicht alle gleichzeitig neu starten)
+- Threads je Worker: langsame Tablet-Clients blockieren keinen ganzen Prozess
+- kill -HUP <master>: Worker werden nacheinander ersetzt (graceful). Neuer Code braucht wegen
+  des Preloads einen Neustart des Masters (oder USR2 + QUIT am alten Master)
+- Health-Checks: /_health (Liveness), /_health/ready (Readiness inkl. DB)
+- Hinter einem Reverse-Proxy PROXY_ANZAHL setzen (Client-IP aus X-Forwarded-For, siehe
+  create_app); die Login-Drossel zählt je Worker (siehe security.LoginDrossel)
+"""
+import multiprocessing
+import os
+
+DEFAULT_BIND = "0.0.0.0:5010"
+
+
+def optionen() -> dict:
+    """gunicorn-Einstellungen aus der Umgebung (SERVER_*)."""
+    env = os.environ.get
+    return {
+        "bind": env("SERVER_BIND", DEFAULT_BIND),
+        "workers": int(env("SERVER_WORKERS", multiprocessing.cpu_count())),
+        "threads": int(env("SERVER_THREADS", "4")),
+        "worker_class": "gthread",
+        "preload_app": env("SERVER_PRELOAD", "1") != "0",
+        "max_requests": int(env("SERVER_MAX_REQUESTS", "2000")),
+        "max_requests_jitter": int(env("SERVER_MAX_REQUESTS_JITTER", "200")),
+        "timeout": int(env("SERVER_TIMEOUT", "30")),                  # hängender Worker -> Neustart
+        "graceful_timeout": int(env("SERVER_GRACEFUL_TIMEOUT", "30")),
+        "keepalive": int(env("SERVER_KEEPALIVE", "5")),
+        "accesslog": env("SERVER_ACCESSLOG", "-") or None,
+        "loglevel": env("SERVER_LOGLEVEL", "info"),
+        "proc_name": "eiermanager",
+    }
+
+
+def _post_fork(server, worker):
+    """Geerbte DB-Verbindungen des Masters nicht weiterverwenden (SQLite verträgt kein fork)."""
+    if not server.cfg.preload_app:
+        return
+    from eiermanager.extensions import db
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def starten(app_factory=None) -> None:
+    """gunicorn mit der App aus `app_factory` (Default: create_app) starten."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("gunicorn fehlt (pip install -r requirements.txt) – "
+                         "unter Windows stattdessen: python run.py --dev")
+
+    if app_factory is None:
+        from eiermanager import create_app as app_factory
+
+    class EiermanagerServer(BaseApplication):
+        def __init__(self, einstellungen: dict):
+            self.einstellungen = einstellungen
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.einstellungen.items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+            self.cfg.set("post_fork", _post_fork)
+
+        def load(self):
+            return app_factory()
+
+    EiermanagerServer(optionen()).run()
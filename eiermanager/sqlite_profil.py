@@ -0,0 +1,116 @@
+# eiermanager/sqlite_profil.py
+"""
+Produktionsprofil für SQLite-Datei-DBs (mehrere Tablets schreiben gleichzeitig):
+
+- WAL: Leser blockieren Schreiber nicht und umgekehrt; synchronous=NORMAL reicht mit WAL
+- busy_timeout: ein Schreiber wartet auf die Sperre, statt sofort "database is locked" zu werfen
+- mmap/cache_size: Lesen großer Tabellen (Log, Ereignisse) ohne Syscalls pro Seite
+- Pool: feste Anzahl Verbindungen je Worker, Pragmas werden je Verbindung einmal gesetzt
+- Kurze Schreib-Transaktionen: pysqlite öffnet die Transaktion erst beim ersten
+  INSERT/UPDATE/DELETE, die Schreibsperre hält also nur vom Flush bis zum Commit
+- Bleibt die Sperre trotzdem länger als busy_timeout belegt (oder meldet SQLite SQLITE_BUSY
+  ohne zu warten), wiederholen die mit @mit_wiederholung markierten Views den kompletten
+  Request nach Rollback – nur Buchungs-Views mit genau einem Commit, alle anderen verlassen
+  sich auf busy_timeout
+
+SQLITE_PROFIL=0 schaltet alles ab; für andere DBs und In-Memory-SQLite greift es nie.
+"""
+import os
+import random
+import time
+from functools import wraps
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from eiermanager.extensions import db
+
+SCHREIBEND = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def _datei_sqlite(uri: str) -> bool:
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def konfigurieren(app) -> None:
+    """
+    Defaults setzen und Engine-Optionen (Pool, Verbindungs-Timeout) eintragen.
+    Muss vor db.init_app laufen – die Engine wird dort mit diesen Optionen angelegt.
+    """
+    app.config.setdefault("SQLITE_PROFIL", os.environ.get("SQLITE_PROFIL", "1") != "0")
+    app.config.setdefault("SQLITE_BUSY_TIMEOUT_MS", int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")))
+    app.config.setdefault("SQLITE_MMAP_MB", int(os.environ.get("SQLITE_MMAP_MB", "256")))
+    app.config.setdefault("SQLITE_CACHE_MB", int(os.environ.get("SQLITE_CACHE_MB", "32")))
+    app.config.setdefault("SQLITE_POOL_SIZE", int(os.environ.get("SQLITE_POOL_SIZE", "8")))
+    app.config.setdefault("SQLITE_WIEDERHOLUNGEN", int(os.environ.get("SQLITE_WIEDERHOLUNGEN", "5")))
+    app.config["SQLITE_PROFIL"] = app.config["SQLITE_PROFIL"] and _datei_sqlite(app.config["SQLALCHEMY_DATABASE_URI"])
+    if not app.config["SQLITE_PROFIL"]:
+        return
+    optionen = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    optionen.setdefault("pool_size", app.config["SQLITE_POOL_SIZE"])
+    optionen.setdefault("max_overflow", 2)
+    optionen.setdefault("pool_timeout", 10)
+    connect_args = optionen.setdefault("connect_args", {})
+    connect_args.setdefault("timeout", app.config["SQLITE_BUSY_TIMEOUT_MS"] / 1000)
+    connect_args.setdefault("check_same_thread", False)      # Pool reicht Verbindungen zwischen Threads weiter
+
+
+def _pragmas(app) -> list:
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT_MS']}",
+        f"PRAGMA mmap_size={app.config['SQLITE_MMAP_MB'] * 1024 * 1024}",
+        f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_MB'] * 1024}",    # negativ = KiB
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def init_app(app) -> None:
+    """Pragmas bei jeder neuen Pool-Verbindung setzen (nach db.init_app, vor dem ersten Query)."""
+    if not app.config.get("SQLITE_PROFIL"):
+        return
+    pragmas = _pragmas(app)
+
+    def _verbunden(dbapi_conn, connection_record):
+        cur = dbapi_conn.cursor()
+        try:
+            for p in pragmas:
+                cur.execute(p)
+        finally:
+            cur.close()
+
+    with app.app_context():
+        event.listen(db.engine, "connect", _verbunden)
+
+
+def gesperrt(exc: Exception) -> bool:
+    """SQLITE_BUSY/SQLITE_LOCKED ("database is locked", "database table is locked")?"""
+    return isinstance(exc, OperationalError) and "is locked" in str(exc.orig)
+
+
+def mit_wiederholung(view):
+    """
+    Schreibenden Request bei gesperrter DB komplett wiederholen (Rollback, Backoff mit Jitter).
+    Nur für Views, die genau einmal committen und den Request-Body mehrfach lesen können –
+    bis zum Commit ist nichts geschrieben. Direkt über die View setzen (unter login_required).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in SCHREIBEND or not current_app.config.get("SQLITE_PROFIL"):
+            return view(*args, **kwargs)
+        versuche = current_app.config["SQLITE_WIEDERHOLUNGEN"]
+        for versuch in range(1, versuche + 1):
+            try:
+                return view(*args, **kwargs)
+            except OperationalError as e:
+                if not gesperrt(e) or versuch == versuche:
+                    raise
+                db.session.rollback()
+                pause = 0.05 * 2 ** (versuch - 1) * random.uniform(0.5, 1.5)
+                current_app.logger.warning("[sqlite] DB gesperrt (%s %s), Versuch %s/%s in %.0f ms",
+                                           request.method, request.path, versuch, versuche, pause * 1000)
+                time.sleep(pause)
+    return wrapper
+
@@ -0,0 +1,210 @@
+# eiermanager/testdaten.py
+import math
+import random
+from datetime import date, datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, func
+from eiermanager.extensions import db
+from eiermanager.models import (User, Mobilstall, HuehnerEvent, LogEntry, Abonnement, AboException,
+                                AboAbholung)
+from eiermanager.security import pin_setzen
+from eiermanager import versionen
+
+BATCH = 5000
+ABO_MENGEN = (6, 10, 10, 12, 12, 20, 30)
+VORNAMEN = ("Anna", "Ben", "Clara", "David", "Eva", "Felix", "Greta", "Hannes", "Ida", "Jonas",
+            "Karla", "Lukas", "Mia", "Noah", "Olga", "Paul", "Rita", "Sven", "Tina", "Uwe")
+NACHNAMEN = ("Bauer", "Becker", "Fischer", "Hofmann", "Koch", "Lange", "Meier", "Neumann",
+             "Richter", "Schmidt", "Schulz", "Wagner", "Weber", "Wolf", "Zimmermann")
+
+
+def _schreiben(tbl, rows: list) -> None:
+    conn = db.session.connection()
+    for i in range(0, len(rows), BATCH):
+        conn.execute(insert(tbl), rows[i:i + BATCH])
+
+
+def _legequote(d: date, alter_tage: int) -> float:
+    """Grobe Legekurve: Anlauf, Plateau, langsamer Abfall + Winterdelle."""
+    wochen = alter_tage / 7
+    kurve = min(1.0, wochen / 6) * max(0.55, 0.92 - max(0.0, wochen - 30) * 0.004)
+    winter = 0.12 * math.cos(2 * math.pi * (d.timetuple().tm_yday - 15) / 365)
+    return max(0.0, kurve - max(0.0, winter))
+
+
+def erzeugen(jahre: int = 3, staelle: int = 24, hennen: int = 150, abos: int = 300,
+             benutzer: int = 20, seed: int = 42, bis: date = None) -> dict:
+    """
+    Synthetische Betriebsdaten in eine leere DB schreiben (Core-Bulk-Inserts, ohne
+    Mapper-Events) und danach Bestand, Tagesabschlüsse und Hennen-Ledger neu aufbauen.
+    Rückgabe: Anzahl Zeilen je Tabelle.
+    """
+    from eiermanager.bestand import bestand_neu_berechnen, tagesabschluss_neu_aufbauen
+    from eiermanager.herde import herde_neu_aufbauen
+
+    rnd = random.Random(seed)
+    bis = bis or date.today()
+    von = bis - timedelta(days=365 * jahre - 1)
+    now = datetime.utcnow()
+
+    # --- Benutzer (echte PIN-Hashes, damit der Login realistisch kostet) ---
+    vergeben = {"0000"}
+    for i in range(benutzer):
+        pin = f"{rnd.randrange(1, 10000):04d}"
+        while pin in vergeben:
+            pin = f"{rnd.randrange(1, 10000):04d}"
+        vergeben.add(pin)
+        u = User(username=f"sim{i + 1:03d}")
+        pin_setzen(u, pin)
+        db.session.add(u)
+
+    # --- Ställe (bestehende aus dem Bootstrap weiterverwenden) ---
+    stall_objs = Mobilstall.query.order_by(Mobilstall.id).all()
+    for i in range(len(stall_objs), staelle):
+        s = Mobilstall(name=f"Mobil {i + 1}", aktiv=True)
+        db.session.add(s)
+        stall_objs.append(s)
+    stall_objs = stall_objs[:staelle]
+    for s in stall_objs:
+        s.hens_start = max(20, int(rnd.gauss(hennen, hennen * 0.15)))
+        s.aktiv = True
+    db.session.flush()
+
+    # --- Abonnements ---
+    abo_rows = []
+    for i in range(abos):
+        seit = von + timedelta(days=rnd.randrange(0, max(1, (bis - von).days - 30)))
+        abo_rows.append({
+            "name": f"{rnd.choice(NACHNAMEN)}, {rnd.choice(VORNAMEN)} ({i + 1})",
+            "menge": rnd.choice(ABO_MENGEN), "abholtag": rnd.randrange(7),
+            "aktiv": rnd.random() > 0.1, "notizen": None,
+            "created_at": datetime.combine(seit, datetime.min.time()),
+        })
+    _schreiben(Abonnement.__table__, abo_rows)
+    abo_liste = db.session.execute(
+        db.select(Abonnement.id, Abonnement.menge, Abonnement.abholtag, Abonnement.aktiv, Abonnement.created_at)
+    ).all()
+
+    # --- Ausnahmen (Vergangenheit + die nächsten 8 Wochen) ---
+    ausnahmen = {}
+    for a in abo_liste:
+        d = a.created_at.date()
+        d += timedelta(days=(a.abholtag - d.weekday()) % 7)
+        while d <= bis + timedelta(weeks=8):
+            if rnd.random() < 0.05:
+                shift = rnd.random() < 0.4
+                ausnahmen[(a.id, d)] = {
+                    "abo_id": a.id, "datum": d, "action": "shift" if shift else "skip",
+                    "new_datum": d + timedelta(days=rnd.choice((-1, 1, 2))) if shift else None,
+                    "created_at": now,
+                }
+            d += timedelta(days=7)
+    _schreiben(AboException.__table__, list(ausnahmen.values()))
+
+    # --- Tagesweise: Produktion, Ereignisse, Abholungen, sonstige Abgänge ---
+    log_id = int(db.session.query(func.max(LogEntry.id)).scalar() or 0)
+    logs, events, abholungen = [], [], []
+    hennen_jetzt = {s.id: s.hens_start for s in stall_objs}
+    abo_je_tag = {}
+    for a in abo_liste:
+        if a.aktiv:
+            abo_je_tag.setdefault(a.abholtag, []).append(a)
+    aktiv = {a.id for a in abo_liste if a.aktiv}
+    verschoben = {}
+    for (abo_id, d), ex in ausnahmen.items():
+        if ex["action"] == "shift" and abo_id in aktiv:
+            verschoben.setdefault(ex["new_datum"], []).append(abo_id)
+    menge_von = {a.id: a.menge for a in abo_liste}
+
+    def log(**kw):
+        nonlocal log_id
+        log_id += 1
+        row = {"id": log_id, "zeitpunkt": None, "benutzer": "sim", "name": None, "created_at": now,
+               "stall_id": None, "kategorie": None, "abo_id": None}
+        row.update(kw)
+        logs.append(row)
+        return log_id
+
+    bestand = 0
+    d = von
+    while d <= bis:
+        for s in stall_objs:
+            menge = int(hennen_jetzt[s.id] * _legequote(d, (d - von).days) * rnd.uniform(0.93, 1.05))
+            if menge > 0:
+                log(datum=d, zeitpunkt="08:30", typ="zugang", menge=menge, stall_id=s.id,
+                    name=f"Produktion {s.name}")
+                bestand += menge
+            events.append({"stall_id": s.id, "datum": d, "typ": "fuetterung", "menge": None,
+                           "notiz": None})
+            if d.weekday() == 5:
+                events.append({"stall_id": s.id, "datum": d, "typ": "ausmisten", "menge": None,
+                               "notiz": None})
+            if rnd.random() < 0.04 and hennen_jetzt[s.id] > 20:
+                tote = rnd.randint(1, 3)
+                hennen_jetzt[s.id] -= tote
+                events.append({"stall_id": s.id, "datum": d, "typ": "verlust", "menge": tote,
+                               "notiz": "Fuchs" if tote > 2 else None})
+
+        # Abo-Abholungen (regulär + hierher verschoben), nur bis gestern bzw. heute Vormittag
+        if d < bis:
+            ids = [a.id for a in abo_je_tag.get(d.weekday(), [])
+                   if a.created_at.date() <= d and (a.id, d) not in ausnahmen]
+            ids += verschoben.get(d, [])
+            for abo_id in ids:
+                m = menge_von[abo_id]
+                lid = log(datum=d, zeitpunkt="17:00", typ="abgang", menge=m, kategorie="abo",
+                          abo_id=abo_id, name=f"Abo {abo_id}")
+                abholungen.append({"abo_id": abo_id, "datum": d, "menge": m, "log_entry_id": lid,
+                                   "benutzer": "sim", "created_at": now})
+                bestand -= m
+
+        # sonstige Abgänge: Großteil des Überschusses verkaufen, Rest als Puffer
+        ueberschuss = bestand - 500
+        if ueberschuss > 0:
+            for kat, anteil in (("verkauf", 0.55), ("automat", 0.25), ("eigenbedarf", 0.03), ("defekt", 0.02)):
+                m = int(ueberschuss * anteil * rnd.uniform(0.8, 1.2))
+                if m > 0:
+                    log(datum=d, zeitpunkt="12:00", typ="abgang", menge=m, kategorie=kat,
+                        name=kat.capitalize())
+                    bestand -= m
+        d += timedelta(days=1)
+
+    _schreiben(LogEntry.__table__, logs)
+    _schreiben(HuehnerEvent.__table__, events)
+    _schreiben(AboAbholung.__table__, abholungen)
+
+    # Caches/Rollups neu aufbauen (die Bulk-Inserts laufen an den Mapper-Events vorbei)
+    versionen.erhoehen(db.session.connection(), "abos")
+    bestand_neu_berechnen(commit=False)
+    tage = tagesabschluss_neu_aufbauen(commit=False)
+    herde = herde_neu_aufbauen(commit=False)
+    db.session.commit()
+    return {"benutzer": benutzer, "staelle": len(stall_objs), "abos": len(abo_rows),
+            "ausnahmen": len(ausnahmen), "buchungen": len(logs), "ereignisse": len(events),
+            "abholungen": len(abholungen), "tage": tage, "herdenbewegungen": herde["uebernommen"]}
+
+
+# -----------------------------
+# CLI: flask testdaten erzeugen
+# -----------------------------
+@click.group("testdaten")
+def testdaten_cli():
+    """Synthetische Betriebsdaten für Last- und Benchmark-Tests."""
+
+
+@testdaten_cli.command("erzeugen")
+@click.option("--jahre", default=3, show_default=True, help="Historie in Jahren")
+@click.option("--staelle", default=24, show_default=True, help="Anzahl Mobilställe")
+@click.option("--hennen", default=150, show_default=True, help="Ø Hennen je Stall")
+@click.option("--abos", default=300, show_default=True, help="Anzahl Abonnements")
+@click.option("--benutzer", default=20, show_default=True, help="Anzahl zusätzlicher Benutzer")
+@click.option("--seed", default=42, show_default=True, help="Zufalls-Seed (reproduzierbar)")
+@click.option("--force", is_flag=True, help="Auch in eine DB mit vorhandenen Buchungen schreiben")
+@with_appcontext
+def erzeugen_cmd(jahre, staelle, hennen, abos, benutzer, seed, force):
+    """Leere DB mit realistischen Mengen füllen (Buchungen, Ereignisse, Abos, Benutzer)."""
+    if not force and db.session.query(LogEntry.id).first() is not None:
+        raise click.ClickException("DB enthält bereits Buchungen – nur für frische DBs gedacht (--force).")
+    r = erzeugen(jahre=jahre, staelle=staelle, hennen=hennen, abos=abos, benutzer=benutzer, seed=seed)
+    click.echo(", ".join(f"{k}={v}" for k, v in r.items()))
@@ -0,0 +1,56 @@
+# eiermanager/versionen.py
+from datetime import datetime
+from sqlalchemy import event, select, insert, update
+from sqlalchemy.exc import IntegrityError
+from eiermanager.extensions import db
+from eiermanager.models import DatenVersion
+
+_tbl = DatenVersion.__table__
+
+
+def version(bereich: str) -> int:
+    """Aktuelle Version eines Datenbereichs (0, solange nie geändert)."""
+    return int(db.session.execute(select(_tbl.c.version).where(_tbl.c.bereich == bereich)).scalar() or 0)
+
+
+def erhoehen(connection, bereich: str) -> None:
+    """Version in der laufenden Transaktion erhöhen (legt die Zeile bei Bedarf an)."""
+    jetzt = datetime.utcnow()
+    res = connection.execute(
+        update(_tbl).where(_tbl.c.bereich == bereich).values(version=_tbl.c.version + 1, geaendert=jetzt)
+    )
+    if res.rowcount == 0:
+        connection.execute(insert(_tbl).values(bereich=bereich, version=1, geaendert=jetzt))
+
+
+def stand(*bereiche) -> dict:
+    """{bereich: (version, geaendert)} für mehrere Bereiche in einem Query (fehlende: (0, None))."""
+    rows = db.session.execute(
+        select(_tbl.c.bereich, _tbl.c.version, _tbl.c.geaendert).where(_tbl.c.bereich.in_(bereiche))
+    ).all()
+    out = {b: (0, None) for b in bereiche}
+    out.update({r.bereich: (int(r.version), r.geaendert) for r in rows})
+    return out
+
+
+def anlegen(*bereiche, commit: bool = True) -> None:
+    """Zeilen vorab anlegen (beim Start), damit parallele Erst-Inserts nicht kollidieren."""
+    vorhanden = set(db.session.execute(select(_tbl.c.bereich)).scalars())
+    for b in bereiche:
+        if b not in vorhanden:
+            db.session.execute(insert(_tbl).values(bereich=b, version=0))
+    if not commit:
+        return
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def beobachten(model, bereich: str) -> None:
+    """Jede Änderung an `model` (insert/update/delete) erhöht die Version von `bereich`."""
+    def _bump(mapper, connection, target):
+        erhoehen(connection, bereich)
+
+    for ev in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, ev, _bump)
@@ -0,0 +1,168 @@
+# eiermanager/zeitreihen.py
+from collections import OrderedDict
+from datetime import date, timedelta
+from sqlalchemy import func, case, cast, Integer
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry, Mobilstall
+from eiermanager.bestand import ABGANG_KATEGORIEN, abgang_kategorie, stall_name_aus_text, ledger_version
+from eiermanager.herde import BEREICH_STAELLE
+from eiermanager import versionen
+
+GRANULARITAETEN = ("tag", "woche", "monat", "jahr")
+AUFTEILUNGEN = ("stall", "kategorie")
+MAX_BUCKETS = 4000          # Schutz gegen riesige Antworten (≈ 11 Jahre tageweise)
+CACHE_GROESSE = 128
+OHNE_STALL = "ohne Stall"   # Zugänge, die keinem Stall zugeordnet werden können
+
+# LRU-Cache pro Prozess; Schlüssel enthält die Log-Version -> nie veraltet
+_cache = OrderedDict()
+
+
+# -----------------------------
+# Buckets (Start-Datum je Zeitraum)
+# -----------------------------
+def bucket_start(d: date, granularitaet: str) -> date:
+    if granularitaet == "woche":
+        return d - timedelta(days=d.weekday())          # ISO-Woche beginnt Montag
+    if granularitaet == "monat":
+        return d.replace(day=1)
+    if granularitaet == "jahr":
+        return d.replace(month=1, day=1)
+    return d
+
+
+def _naechster(d: date, granularitaet: str) -> date:
+    if granularitaet == "woche":
+        return d + timedelta(days=7)
+    if granularitaet == "monat":
+        return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if granularitaet == "jahr":
+        return d.replace(year=d.year + 1)
+    return d + timedelta(days=1)
+
+
+def bucket_label(d: date, granularitaet: str) -> str:
+    if granularitaet == "woche":
+        jahr, woche, _ = d.isocalendar()
+        return f"{jahr}-W{woche:02d}"
+    if granularitaet == "monat":
+        return d.strftime("%Y-%m")
+    if granularitaet == "jahr":
+        return d.strftime("%Y")
+    return d.isoformat()
+
+
+def _bucket_expr(granularitaet: str):
+    """SQL-Ausdruck für den Bucket-Start (dialektabhängig, Ergebnis 'YYYY-MM-DD')."""
+    if granularitaet == "tag":
+        return LogEntry.datum
+    if db.engine.dialect.name == "postgresql":
+        unit = {"woche": "week", "monat": "month", "jahr": "year"}[granularitaet]
+        return func.date(func.date_trunc(unit, LogEntry.datum))
+    # SQLite
+    if granularitaet == "woche":
+        wochentag = (cast(func.strftime("%w", LogEntry.datum), Integer) + 6) % 7     # Mo=0
+        return func.date(LogEntry.datum, func.printf("-%d days", wochentag))
+    if granularitaet == "monat":
+        return func.strftime("%Y-%m-01", LogEntry.datum)
+    return func.strftime("%Y-01-01", LogEntry.datum)
+
+
+def _as_date(v) -> date:
+    return v if isinstance(v, date) else date.fromisoformat(str(v)[:10])
+
+
+# -----------------------------
+# Serie berechnen (ein gruppiertes Query)
+# -----------------------------
+def _berechnen(von: date, bis: date, granularitaet: str, aufteilung):
+    buckets = []
+    b = bucket_start(von, granularitaet)
+    while b <= bis:
+        buckets.append(b)
+        b = _naechster(b, granularitaet)
+    index = {b: i for i, b in enumerate(buckets)}
+
+    bucket = _bucket_expr(granularitaet).label("bucket")
+    q = db.session.query(bucket)
+    if aufteilung == "stall":
+        # Alt-Buchungen ohne stall_id: Buchungstext mitgruppieren ('Produktion Mobil 1')
+        ohne_stall = case((LogEntry.stall_id.is_(None), LogEntry.name)).label("name")
+        q = (q.add_columns(LogEntry.stall_id, ohne_stall, func.sum(LogEntry.menge))
+             .filter(LogEntry.typ == "zugang")
+             .group_by(bucket, LogEntry.stall_id, ohne_stall))
+    elif aufteilung == "kategorie":
+        # Alt-Buchungen ohne (gültige) Kategorie: Buchungstext mitgruppieren und wie der
+        # Tagesabschluss einordnen
+        ohne_kategorie = case((LogEntry.kategorie.in_(ABGANG_KATEGORIEN), None),
+                              else_=LogEntry.name).label("name")
+        q = (q.add_columns(LogEntry.kategorie, ohne_kategorie, func.sum(LogEntry.menge))
+             .filter(LogEntry.typ == "abgang")
+             .group_by(bucket, LogEntry.kategorie, ohne_kategorie))
+    else:
+        q = (q.add_columns(
+                func.coalesce(func.sum(case((LogEntry.typ == "zugang", LogEntry.menge), else_=0)), 0),
+                func.coalesce(func.sum(case((LogEntry.typ == "abgang", LogEntry.menge), else_=0)), 0))
+             .group_by(bucket))
+    rows = q.filter(LogEntry.datum >= von, LogEntry.datum <= bis).all()
+
+    leer = lambda: [0] * len(buckets)       # noqa: E731
+    if aufteilung == "stall":
+        staelle = Mobilstall.query.all()
+        namen = {s.id: s.name for s in staelle}
+        ids = {s.name: s.id for s in staelle}
+        serien = {}
+        for bk, stall_id, name, menge in rows:
+            if stall_id is None:
+                stall_id = ids.get(stall_name_aus_text(name))
+            key = namen.get(stall_id, OHNE_STALL)
+            serien.setdefault(key, leer())[index[_as_date(bk)]] += int(menge or 0)
+        serien = dict(sorted(serien.items()))
+    elif aufteilung == "kategorie":
+        serien = {k: leer() for k in ABGANG_KATEGORIEN}
+        for bk, kategorie, name, menge in rows:
+            key = kategorie if kategorie in serien else abgang_kategorie(name)
+            serien[key][index[_as_date(bk)]] += int(menge or 0)
+    else:
+        zugang, abgang = leer(), leer()
+        for bk, z, a in rows:
+            i = index[_as_date(bk)]
+            zugang[i], abgang[i] = int(z), int(a)
+        serien = {"zugang": zugang, "abgang": abgang,
+                  "netto": [z - a for z, a in zip(zugang, abgang)]}
+
+    return {
+        "von": von.isoformat(),
+        "bis": bis.isoformat(),
+        "granularitaet": granularitaet,
+        "aufteilung": aufteilung,
+        "buckets": [b.isoformat() for b in buckets],
+        "labels": [bucket_label(b, granularitaet) for b in buckets],
+        "serien": serien,
+        # Zugänge ohne erkennbaren Stall (Alt-Daten): Aufteilung unvollständig, siehe
+        # 'flask bestand backfill-struktur'
+        "unvollstaendig": any(serien.get(OHNE_STALL, ())) if aufteilung == "stall" else False,
+    }
+
+
+def anzahl_buckets(von: date, bis: date, granularitaet: str) -> int:
+    tage = (bis - von).days + 1
+    return {"tag": tage, "woche": tage // 7 + 2, "monat": tage // 28 + 2, "jahr": tage // 365 + 2}[granularitaet]
+
+
+def serie(von: date, bis: date, granularitaet: str = "tag", aufteilung=None) -> dict:
+    """
+    Zeitreihe Zugang/Abgang (optional je Stall/Kategorie), gecacht pro Log-Version.
+    Die Stall-Aufteilung hängt zusätzlich an den Stallnamen (Version 'staelle').
+    """
+    stall_version = versionen.version(BEREICH_STAELLE) if aufteilung == "stall" else 0
+    key = (von, bis, granularitaet, aufteilung, ledger_version(), stall_version)
+    hit = _cache.get(key)
+    if hit is not None:
+        _cache.move_to_end(key)
+        return hit
+    data = _berechnen(von, bis, granularitaet, aufteilung)
+    _cache[key] = data
+    while len(_cache) > CACHE_GROESSE:
+        _cache.popitem(last=False)
+    return data
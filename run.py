@@ -1,6 +1,13 @@
 # run.py
+import sys
 from eiermanager import create_app
 
 if __name__ == "__main__":
-    app = create_app()
-    app.run(host="0.0.0.0", port=5010, debug=True)
\ No newline at end of file
+    if "--dev" in sys.argv:
+        # Entwicklung: Reloader + Debugger (nie im Stallnetz laufen lassen)
+        app = create_app()
+        app.run(host="0.0.0.0", port=5010, debug=True)
+    else:
+        # Produktion: gunicorn, Einstellungen über SERVER_* (siehe eiermanager/server.py)
+        from eiermanager.server import starten
+        starten(create_app)
@@ -0,0 +1,36 @@
+# tests/conftest.py
+"""Gemeinsame Fixtures: App mit frischer SQLite-Datei je Test (Schema + Seeds wie beim echten Start)."""
+import pytest
+from eiermanager import create_app
+from eiermanager.extensions import db
+
+ADMIN_PIN = "0000"      # Seed aus bootstrap._stammdaten
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("PIN_PEPPER", "test-pepper")
+    monkeypatch.setenv("PERF_ENABLED", "0")
+    app = create_app()
+    # Prozess-Caches sind auf Versionszähler geschlüsselt, die in jeder frischen Test-DB wieder bei 0 beginnen
+    from eiermanager import abholplan, zeitreihen, berechtigungen
+    abholplan._cache.clear()
+    zeitreihen._cache.clear()
+    berechtigungen.invalidieren()
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(client):
+    r = client.post("/login", data={"pin": ADMIN_PIN})
+    assert r.status_code == 302
+    return client
@@ -0,0 +1,82 @@
+# tests/test_abholplan.py
+"""Abholplan: Aussetzen/Verschieben über Wochengrenzen, jüngste Ausnahme gewinnt."""
+from datetime import date, timedelta
+from eiermanager.extensions import db
+from eiermanager.models import Abonnement, AboException
+from eiermanager.abholplan import berechnen, montag, plan, wochenplan
+
+MONTAG = montag(date.today()) + timedelta(days=14)      # Woche in der Zukunft (Abos existieren ab heute)
+SONNTAG = MONTAG + timedelta(days=6)
+NAECHSTER_MONTAG = MONTAG + timedelta(days=7)
+
+
+def _abo(name: str, abholtag: int, menge: int = 10) -> Abonnement:
+    a = Abonnement(name=name, menge=menge, abholtag=abholtag, aktiv=True)
+    db.session.add(a)
+    db.session.commit()
+    return a
+
+
+def _ausnahme(abo, datum, action, new_datum=None) -> None:
+    db.session.add(AboException(abo_id=abo.id, datum=datum, action=action, new_datum=new_datum))
+    db.session.commit()
+
+
+def _tag(tage: list, d: date) -> dict:
+    return next(t for t in tage if t["datum"] == d)
+
+
+def _ids(tag: dict) -> list:
+    return [x["abo_id"] for x in tag["abholungen"]]
+
+
+def test_verschieben_in_die_naechste_woche(app):
+    a = _abo("Sonntag", 6)
+    _ausnahme(a, SONNTAG, "shift", NAECHSTER_MONTAG)
+
+    diese = wochenplan(MONTAG)
+    assert _ids(_tag(diese, SONNTAG)) == []
+    assert _tag(diese, SONNTAG)["ausgesetzt"][0]["new_datum"] == NAECHSTER_MONTAG
+
+    naechste = wochenplan(NAECHSTER_MONTAG)
+    montag_ = _tag(naechste, NAECHSTER_MONTAG)
+    assert _ids(montag_) == [a.id]
+    assert montag_["abholungen"][0]["verschoben_von"] == SONNTAG
+    assert montag_["summe"] == 10
+
+
+def test_verschieben_in_die_vorwoche(app):
+    a = _abo("Montag", 0)
+    _ausnahme(a, NAECHSTER_MONTAG, "shift", SONNTAG)
+    assert _ids(_tag(wochenplan(MONTAG), SONNTAG)) == [a.id]
+    assert _ids(_tag(wochenplan(NAECHSTER_MONTAG), NAECHSTER_MONTAG)) == []
+
+
+def test_aussetzen_nur_eine_woche(app):
+    a = _abo("Montag", 0)
+    _ausnahme(a, MONTAG, "skip")
+    assert _ids(_tag(wochenplan(MONTAG), MONTAG)) == []
+    assert _ids(_tag(wochenplan(NAECHSTER_MONTAG), NAECHSTER_MONTAG)) == [a.id]
+
+
+def test_juengste_ausnahme_gewinnt_auch_ausserhalb_des_zeitraums(app):
+    a = _abo("Sonntag", 6)
+    _ausnahme(a, SONNTAG, "shift", NAECHSTER_MONTAG)
+    # später umentschieden: doch zwei Tage früher abholen (Ziel in derselben Woche)
+    _ausnahme(a, SONNTAG, "shift", SONNTAG - timedelta(days=2))
+
+    assert _ids(_tag(wochenplan(NAECHSTER_MONTAG), NAECHSTER_MONTAG)) == []
+    assert _ids(_tag(wochenplan(MONTAG), SONNTAG - timedelta(days=2))) == [a.id]
+
+    # und zuletzt ganz ausgesetzt
+    _ausnahme(a, SONNTAG, "skip")
+    tage = plan(MONTAG, NAECHSTER_MONTAG + timedelta(days=6))
+    assert [t["datum"] for t in tage if a.id in _ids(t)] == [SONNTAG + timedelta(days=7)]    # nur der reguläre
+
+
+def test_wochenplaene_gleich_direkter_berechnung(app):
+    a, b = _abo("A", 6), _abo("B", 0)
+    _ausnahme(a, SONNTAG, "shift", NAECHSTER_MONTAG)
+    _ausnahme(b, NAECHSTER_MONTAG, "skip")
+    von, bis = MONTAG, NAECHSTER_MONTAG + timedelta(days=6)
+    assert plan(von, bis) == wochenplan(MONTAG) + wochenplan(NAECHSTER_MONTAG) == berechnen(von, bis)
@@ -0,0 +1,64 @@
+# tests/test_abonnenten_heute.py
+"""Abos heute buchen: nur laut Abholplan fällige Abos, wiederholtes Absenden bucht nichts doppelt."""
+from datetime import date, timedelta
+from eiermanager.extensions import db
+from eiermanager.models import Abonnement, AboException, AboAbholung, LogEntry
+
+HEUTE = date.today()
+
+
+def _abo(name: str, abholtag: int) -> Abonnement:
+    a = Abonnement(name=name, menge=10, abholtag=abholtag, aktiv=True)
+    db.session.add(a)
+    db.session.commit()
+    return a
+
+
+def _absenden(client, *abos):
+    return client.post("/abonnenten/heute", data={f"selected_{a.id}": "on" for a in abos},
+                       follow_redirects=True)
+
+
+def test_nur_faellige_abos_werden_gebucht(admin_client):
+    faellig = _abo("Fällig", HEUTE.weekday())
+    anderer_tag = _abo("Anderer Tag", (HEUTE.weekday() + 1) % 7)
+    ausgesetzt = _abo("Ausgesetzt", HEUTE.weekday())
+    verschoben = _abo("Verschoben", HEUTE.weekday())
+    db.session.add_all([
+        AboException(abo_id=ausgesetzt.id, datum=HEUTE, action="skip"),
+        AboException(abo_id=verschoben.id, datum=HEUTE, action="shift", new_datum=HEUTE + timedelta(days=1)),
+    ])
+    db.session.commit()
+
+    r = _absenden(admin_client, faellig, anderer_tag, ausgesetzt, verschoben)
+    assert "3 Abo(s) sind heute nicht fällig" in r.get_data(as_text=True)
+    assert [x.abo_id for x in AboAbholung.query.all()] == [faellig.id]
+    assert LogEntry.query.filter_by(kategorie="abo").count() == 1
+
+
+def test_erneutes_absenden_bucht_nicht_doppelt(admin_client):
+    a = _abo("Doppeltipp", HEUTE.weekday())
+    _absenden(admin_client, a)
+    r = _absenden(admin_client, a)
+    assert "1 Abo(s) waren heute bereits gebucht" in r.get_data(as_text=True)
+    assert AboAbholung.query.count() == 1
+    assert LogEntry.query.filter_by(kategorie="abo").count() == 1
+
+
+def test_gleichzeitige_buchung_wird_als_bereits_gebucht_gemeldet(admin_client, monkeypatch):
+    from eiermanager import abholplan
+    a = _abo("Parallel", HEUTE.weekday())
+    _absenden(admin_client, a)
+
+    # anderes Gerät bucht zwischen Prüfung und Commit: erste Prüfung sieht noch nichts
+    original, aufrufe = abholplan.gebuchte_abholungen, []
+
+    def _verspaetet(datum, abo_ids):
+        aufrufe.append(1)
+        return {} if len(aufrufe) == 1 else original(datum, abo_ids)
+
+    monkeypatch.setattr(abholplan, "gebuchte_abholungen", _verspaetet)
+    r = _absenden(admin_client, a)
+    assert "1 Abo(s) waren heute bereits gebucht" in r.get_data(as_text=True)
+    assert len(aufrufe) == 2
+    assert AboAbholung.query.count() == 1
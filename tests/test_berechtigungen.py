@@ -0,0 +1,37 @@
+# tests/test_berechtigungen.py
+"""Benutzer-Snapshots: Änderungen aus einem anderen Worker gelten ab dem nächsten Request."""
+from sqlalchemy.orm import Session
+from eiermanager.extensions import db
+from eiermanager.models import User, Module
+from eiermanager.berechtigungen import benutzer
+
+
+def _anderer_worker(aenderung) -> None:
+    """Eigene Session/Verbindung – der Prozess-Cache dieses Workers bekommt davon nichts mit."""
+    with Session(db.engine) as s:
+        aenderung(s)
+        s.commit()
+
+
+def test_admin_entzogen_in_anderem_worker(app):
+    u = User.query.filter_by(is_admin=True).first()
+    assert benutzer(u.id).is_admin
+    assert benutzer(u.id) is benutzer(u.id)                     # Cache-Treffer ohne Änderung
+
+    _anderer_worker(lambda s: setattr(s.get(User, u.id), "is_admin", False))
+    assert benutzer(u.id).is_admin is False
+
+
+def test_modulzuordnung_in_anderem_worker(app):
+    u = User(username="gast", is_admin=False)
+    db.session.add(u)
+    db.session.commit()
+    modul = Module.query.first()
+    assert benutzer(u.id).modul_ids == frozenset()
+
+    def zuordnen(s):
+        gast = s.get(User, u.id)
+        gast.modules.append(s.get(Module, modul.id))
+
+    _anderer_worker(zuordnen)
+    assert benutzer(u.id).modul_ids == {modul.id}
@@ -0,0 +1,103 @@
+# tests/test_bestand.py
+"""Bestandszeile und Tagesabschluss müssen nach jeder Log-Änderung zum Eier-Log passen."""
+from datetime import date, timedelta
+from sqlalchemy import insert
+from eiermanager import create_app
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry, Mobilstall, Tagesabschluss, TagesabschlussStall
+from eiermanager.bestand import (ABGANG_KATEGORIEN, bestand_aktuell, bestand_aus_log, bestand_pruefen,
+                                 tagesabschluss_neu_aufbauen)
+
+HEUTE = date.today()
+GESTERN = HEUTE - timedelta(days=1)
+VORGESTERN = HEUTE - timedelta(days=2)
+
+
+def _rollup() -> tuple:
+    """Tagesabschluss + Zugänge pro Stall als vergleichbare Werte (Tage ohne Bewegung zählen nicht)."""
+    db.session.expire_all()
+    tage = [(t.datum, t.start, t.zugang, tuple(getattr(t, f"abgang_{k}") for k in ABGANG_KATEGORIEN), t.ende)
+            for t in Tagesabschluss.query.order_by(Tagesabschluss.datum).all()]
+    tage = [t for t in tage if t[2] or any(t[3])]
+    staelle = sorted((s.datum, s.stall_id, s.menge) for s in TagesabschlussStall.query.all() if s.menge)
+    return tage, staelle
+
+
+def _pruefen() -> tuple:
+    """Bestand = Log-Summe und inkrementeller Rollup = kompletter Neuaufbau; gibt den Rollup zurück."""
+    gespeichert, berechnet = bestand_pruefen()
+    assert gespeichert == berechnet
+    inkrementell = _rollup()
+    tagesabschluss_neu_aufbauen(commit=False)
+    assert _rollup() == inkrementell
+    db.session.rollback()
+    return inkrementell
+
+
+def _stall_id() -> int:
+    return db.session.query(Mobilstall.id).order_by(Mobilstall.id).limit(1).scalar()
+
+
+def _buchen(datum, typ, menge, name, **kw) -> LogEntry:
+    e = LogEntry(datum=datum, typ=typ, menge=menge, name=name, benutzer="test", **kw)
+    db.session.add(e)
+    db.session.commit()
+    return e
+
+
+def test_insert_update_delete(app):
+    stall_id = _stall_id()
+    zugang = _buchen(GESTERN, "zugang", 30, "Produktion", stall_id=stall_id)
+    _buchen(HEUTE, "abgang", 4, "Verkauf Hofladen", kategorie="verkauf")
+    _buchen(HEUTE, "abgang", 2, "Bruch")                  # ohne Kategorie -> aus dem Text
+    assert bestand_aktuell() == 24
+    tage, staelle = _pruefen()
+    assert [(d, s, e) for d, s, _, _, e in tage] == [(GESTERN, 0, 30), (HEUTE, 30, 24)]
+    assert tage[1][3][ABGANG_KATEGORIEN.index("defekt")] == 2
+    assert staelle == [(GESTERN, stall_id, 30)]
+
+    # Menge + Datum ändern: alter Tag wird zurückgebucht, neuer Tag nachgeführt
+    zugang.menge, zugang.datum = 50, VORGESTERN
+    db.session.commit()
+    assert bestand_aktuell() == 44
+    tage, staelle = _pruefen()
+    assert tage[0][:3] == (VORGESTERN, 0, 50)
+    assert staelle == [(VORGESTERN, stall_id, 50)]
+
+    db.session.delete(zugang)
+    db.session.commit()
+    assert bestand_aktuell() == -6
+    _pruefen()
+
+
+def test_rueckwirkende_buchung_verschiebt_folgetage(app):
+    _buchen(GESTERN, "zugang", 10, "Produktion")
+    _buchen(HEUTE, "zugang", 5, "Produktion")
+    _buchen(VORGESTERN, "zugang", 7, "Produktion")         # vor allen bisherigen Tagen
+    tage, _ = _pruefen()
+    assert [(d, s, e) for d, s, _, _, e in tage] == [(VORGESTERN, 0, 7), (GESTERN, 7, 17), (HEUTE, 17, 22)]
+
+
+def test_mehrere_buchungen_in_einem_flush(app):
+    db.session.add_all([LogEntry(datum=HEUTE, typ="zugang", menge=m, name="Produktion", benutzer="test")
+                        for m in (1, 2, 3)])
+    db.session.commit()
+    assert bestand_aktuell() == 6
+    _pruefen()
+
+
+def test_bootstrap_baut_leeren_tagesabschluss_auf(app, monkeypatch):
+    # Alt-DB: Buchungen ohne Mapper-Events, Tagesabschluss leer
+    db.session.execute(insert(LogEntry.__table__), [
+        {"datum": GESTERN, "typ": "zugang", "menge": 12, "name": "Produktion", "benutzer": "alt"},
+        {"datum": HEUTE, "typ": "abgang", "menge": 5, "name": "Verkauf", "benutzer": "alt"},
+    ])
+    db.session.commit()
+    assert Tagesabschluss.query.count() == 0
+
+    monkeypatch.setenv("FORCE_BOOTSTRAP", "1")
+    create_app()
+    db.session.expire_all()
+    tage, _ = _rollup()
+    assert [(d, s, e) for d, s, _, _, e in tage] == [(GESTERN, 0, 12), (HEUTE, 12, 7)]
+    assert bestand_aus_log() == 7
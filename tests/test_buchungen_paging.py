@@ -0,0 +1,64 @@
+# tests/test_buchungen_paging.py
+"""Buchungshistorie: Keyset-Cursor liefern jede Buchung genau einmal, in stabiler Reihenfolge."""
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry
+from eiermanager.paging import encode_cursor, decode_cursor
+
+HEUTE = date.today()
+
+
+def _buchungen_anlegen(anzahl: int = 53) -> None:
+    # Viele Gleichstände auf (datum, created_at): nur die id trennt die Zeilen
+    zeitpunkt = datetime(2026, 1, 1, 12, 0, 0)
+    db.session.execute(insert(LogEntry.__table__), [{
+        "datum": HEUTE - timedelta(days=i % 4), "typ": "zugang" if i % 3 else "abgang", "menge": 1,
+        "name": "Produktion", "benutzer": "test", "created_at": zeitpunkt + timedelta(seconds=i % 2),
+    } for i in range(anzahl)])
+    db.session.commit()
+
+
+def _alle_seiten(client, limit: int, **filter_) -> tuple:
+    ids, seiten, cursor = [], 0, None
+    while True:
+        r = client.get("/eier/api/buchungen", query_string={"limit": limit, "cursor": cursor or "", **filter_})
+        assert r.status_code == 200
+        daten = r.get_json()
+        ids.extend(e["id"] for e in daten["items"])
+        seiten += 1
+        cursor = daten["next_cursor"]
+        if not cursor:
+            return ids, seiten
+
+
+def _erwartet(**filter_) -> list:
+    q = LogEntry.query.filter_by(**filter_)
+    return [e.id for e in q.order_by(LogEntry.datum.desc(), LogEntry.created_at.desc(), LogEntry.id.desc())]
+
+
+def test_cursor_ohne_luecken_und_doppelte(admin_client):
+    _buchungen_anlegen()
+    ids, seiten = _alle_seiten(admin_client, limit=7)
+    assert ids == _erwartet()
+    assert len(set(ids)) == len(ids) == 53
+    assert seiten == 8
+
+
+def test_cursor_mit_filter(admin_client):
+    _buchungen_anlegen()
+    ids, _ = _alle_seiten(admin_client, limit=5, typ="abgang")
+    assert ids == _erwartet(typ="abgang")
+
+
+def test_letzte_seite_genau_voll(admin_client):
+    _buchungen_anlegen(10)
+    ids, seiten = _alle_seiten(admin_client, limit=5)
+    assert len(ids) == 10 and seiten == 2
+
+
+def test_cursor_roundtrip_und_manipulation():
+    werte = (HEUTE, datetime(2026, 1, 1, 12, 0, 0, 123456), 42)
+    assert decode_cursor(encode_cursor(werte), (date, datetime, int)) == werte
+    assert decode_cursor("kaputt", (date, datetime, int)) is None
+    assert decode_cursor(encode_cursor((1, 2)), (date, datetime, int)) is None
@@ -0,0 +1,38 @@
+# tests/test_etag.py
+"""Conditional GET: 304 solange sich die Datenversionen nicht ändern, 200 nach einer Buchung."""
+from datetime import date
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry, Mobilstall
+
+
+def _buchen(menge: int = 5) -> None:
+    """Zugang wie von einem anderen Tablet – ohne Flash in der Session dieses Clients."""
+    stall = Mobilstall.query.filter_by(aktiv=True).first()
+    db.session.add(LogEntry(datum=date.today(), typ="zugang", menge=menge, name=f"Produktion {stall.name}",
+                            benutzer="tablet", stall_id=stall.id))
+    db.session.commit()
+
+
+def test_304_ohne_aenderung(admin_client):
+    r = admin_client.get("/eier/uebersicht")
+    assert r.status_code == 200 and r.headers["ETag"]
+    assert "no-cache" in r.headers["Cache-Control"] and "private" in r.headers["Cache-Control"]
+
+    r2 = admin_client.get("/eier/uebersicht", headers={"If-None-Match": r.headers["ETag"]})
+    assert r2.status_code == 304 and not r2.data
+
+
+def test_200_nach_buchung(admin_client):
+    etag = admin_client.get("/eier/uebersicht").headers["ETag"]
+    _buchen()
+    r = admin_client.get("/eier/uebersicht", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["ETag"] != etag
+    assert admin_client.get("/eier/uebersicht", headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+
+
+def test_offene_flash_meldung_ohne_etag(admin_client):
+    etag = admin_client.get("/eier/uebersicht").headers["ETag"]
+    stall = Mobilstall.query.filter_by(aktiv=True).first()
+    admin_client.post("/eier/zugang", data={"stall_id": stall.id, "menge": 3})
+    r = admin_client.get("/eier/uebersicht", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and "ETag" not in r.headers and "no-store" in r.headers["Cache-Control"]
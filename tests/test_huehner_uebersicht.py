@@ -0,0 +1,61 @@
+# tests/test_huehner_uebersicht.py
+"""Hühner-Übersicht: Anzahl Queries darf nicht mit der Zahl der Ställe wachsen."""
+from datetime import date, timedelta
+from sqlalchemy import event
+from eiermanager.extensions import db
+from eiermanager.models import Mobilstall, HuehnerEvent, LogEntry
+from eiermanager.huehner import _uebersicht_cards
+
+N = 5
+
+
+def _staelle_anlegen(anzahl: int) -> None:
+    heute = date.today()
+    start = db.session.query(Mobilstall).count()
+    for i in range(anzahl):
+        s = Mobilstall(name=f"Test {start + i + 1}", aktiv=True, hens_start=0)
+        db.session.add(s)
+        db.session.flush()
+        for typ in ("fuetterung", "wasser", "ausmisten", "umstallung"):
+            db.session.add(HuehnerEvent(stall_id=s.id, datum=heute - timedelta(days=i % 3), typ=typ))
+        db.session.add(LogEntry(datum=heute, typ="zugang", menge=10 + i, benutzer="test",
+                                name=f"Produktion {s.name}", stall_id=s.id))
+    db.session.commit()
+
+
+def _queries_fuer_karten() -> tuple:
+    stalls = Mobilstall.query.filter_by(aktiv=True).order_by(Mobilstall.name.asc()).all()
+    anzahl = [0]
+
+    def zaehlen(*args, **kwargs):
+        anzahl[0] += 1
+
+    event.listen(db.engine, "before_cursor_execute", zaehlen)
+    try:
+        cards = _uebersicht_cards(stalls)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", zaehlen)
+    return anzahl[0], cards
+
+
+def test_queries_konstant_bei_mehr_staellen(app):
+    _staelle_anlegen(N)
+    queries_n, cards_n = _queries_fuer_karten()
+
+    _staelle_anlegen(N)
+    queries_2n, cards_2n = _queries_fuer_karten()
+
+    assert len(cards_2n) == len(cards_n) + N
+    assert queries_2n == queries_n
+    assert queries_n <= 2
+
+
+def test_karten_enthalten_eier_und_letzte_ereignisse(app):
+    _staelle_anlegen(N)
+    _, cards = _queries_fuer_karten()
+    test_cards = [c for c in cards if c["stall"].name.startswith("Test ")]
+    assert len(test_cards) == N
+    for c in test_cards:
+        assert c["eggs7"] > 0
+        assert c["last_feed"][0] is not None
+        assert c["last_move"][0] is not None
@@ -0,0 +1,46 @@
+# tests/test_importer.py
+"""CSV-Import: alles oder nichts, Bestand/Tagesabschluss passen danach zum Log."""
+import io
+import pytest
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry, Tagesabschluss
+from eiermanager.bestand import bestand_aktuell, bestand_pruefen
+from eiermanager.importer import import_buchungen
+
+KOPF = "datum;typ;menge;name\n"
+
+
+def _datei(zeilen: list, rest: bytes = b"") -> io.TextIOWrapper:
+    roh = (KOPF + "".join(zeilen)).encode("utf-8") + rest
+    return io.TextIOWrapper(io.BytesIO(roh), encoding="utf-8", newline="")
+
+
+def test_import_baut_bestand_und_tagesabschluss_auf(app):
+    zeilen = [f"2026-01-0{i};zugang;{10 * i};Produktion\n" for i in range(1, 6)] + ["2026-01-05;abgang;7;Bruch\n"]
+    report = import_buchungen(_datei(zeilen), batch_size=2)
+    assert report["importiert"] == 6 and report["fehler_anzahl"] == 0
+    assert bestand_aktuell() == 143
+    assert bestand_pruefen() == (143, 143)
+    assert Tagesabschluss.query.count() == 5
+
+    # zweiter Lauf: alles Duplikate
+    report = import_buchungen(_datei(zeilen), batch_size=2)
+    assert report["importiert"] == 0 and report["duplikate"] == 6
+
+
+def test_abbruch_in_spaeterem_chunk_schreibt_nichts(app):
+    # > 8 KiB gültige Zeilen (mehrere Chunks), danach kaputte Bytes -> UnicodeDecodeError beim Weiterlesen
+    zeilen = [f"2026-01-01;zugang;{i};Produktion\n" for i in range(1, 1001)]
+    fh = _datei(zeilen, rest=b"2026-01-02;zugang;5;\xff\xfe\n")
+    with pytest.raises(UnicodeDecodeError):
+        import_buchungen(fh, batch_size=100)
+    db.session.expire_all()
+    assert LogEntry.query.count() == 0
+    assert bestand_aktuell() == 0
+    assert Tagesabschluss.query.count() == 0
+
+
+def test_probelauf_schreibt_nichts(app):
+    report = import_buchungen(_datei(["2026-01-01;zugang;5;Produktion\n"]), dry_run=True)
+    assert report["importiert"] == 1
+    assert LogEntry.query.count() == 0
@@ -0,0 +1,17 @@
+# tests/test_parallel.py
+"""Mehrere Tablets buchen gleichzeitig in dieselbe SQLite-Datei: keine Buchung geht verloren."""
+from eiermanager.extensions import db
+from eiermanager.models import EierBestand
+from eiermanager.bestand import bestand_aus_log
+from eiermanager.benchmark import parallel_buchen, wegwerf_db
+
+
+def test_parallele_schreiber(app):
+    assert wegwerf_db() and app.config["SQLITE_PROFIL"]       # Datei-DB mit WAL, nicht :memory:
+    r = parallel_buchen(app, schreiber=6, buchungen=20)
+
+    assert r["fehler"] == []
+    assert r["gebucht"] == r["erwartet"] == 120                 # keine verlorene Buchung
+    assert r["bestand_delta"] == r["erwartet"] and r["konsistent"]
+    db.session.expire_all()
+    assert db.session.get(EierBestand, 1).menge == bestand_aus_log()
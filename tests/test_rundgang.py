@@ -0,0 +1,43 @@
+# tests/test_rundgang.py
+"""Rundgang-API: ungültige JSON-Werte liefern 400 mit Fehlerliste, gültige werden gebucht."""
+import pytest
+from eiermanager.models import Mobilstall, LogEntry, HuehnerEvent
+
+
+@pytest.fixture
+def stall_id(app):
+    return Mobilstall.query.filter_by(aktiv=True).order_by(Mobilstall.id).first().id
+
+
+@pytest.mark.parametrize("eintrag, text", [
+    ("kaputt", "kein Objekt"),
+    ({"notiz": 5}, "Notiz muss ein Text sein"),
+    ({"notiz": {"a": 1}}, "Notiz muss ein Text sein"),
+    ({"notiz": "x" * 300}, "Notiz länger"),
+    ({"ereignisse": "wasser"}, "Liste von Texten"),
+    ({"ereignisse": [1]}, "Liste von Texten"),
+    ({"produktion": 12.5}, "Produktion keine Zahl"),
+    ({"produktion": True}, "Produktion keine Zahl"),
+    ({"verlust": [1]}, "Verlust keine Zahl"),
+])
+def test_ungueltige_werte(admin_client, stall_id, eintrag, text):
+    if isinstance(eintrag, dict):
+        eintrag = {"stall_id": stall_id, **eintrag}
+    r = admin_client.post("/huehner/api/rundgang", json={"staelle": [eintrag]})
+    assert r.status_code == 400
+    assert any(text in f for f in r.get_json()["fehler"])
+    assert LogEntry.query.count() == 0 and HuehnerEvent.query.count() == 0
+
+
+def test_ungueltiges_datum(admin_client, stall_id):
+    r = admin_client.post("/huehner/api/rundgang", json={"datum": 20260101, "staelle": []})
+    assert r.status_code == 400
+
+
+def test_gueltiger_rundgang(admin_client, stall_id):
+    r = admin_client.post("/huehner/api/rundgang", json={"staelle": [
+        {"stall_id": stall_id, "produktion": 120, "ereignisse": ["Wasser", "fuetterung"], "notiz": " ok "},
+    ]})
+    assert r.status_code == 200
+    assert r.get_json()["produktion"] == 120
+    assert {e.typ for e in HuehnerEvent.query.all()} == {"wasser", "fuetterung"}
@@ -0,0 +1,74 @@
+# tests/test_security.py
+"""PIN-Login: Index-Lookup + Hash, Pepper je Installation, Umschlüsseln nur mit PIN_PEPPER_ALT."""
+import os
+import stat
+import pytest
+from eiermanager.extensions import db
+from eiermanager.models import User
+from eiermanager.security import pepper_laden, pin_index_from_pin, pin_setzen, user_fuer_pin, PEPPER_DATEI
+
+
+def _benutzer(name: str, pin: str) -> User:
+    u = User(username=name, is_admin=False)
+    pin_setzen(u, pin)
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+def test_lookup_und_hash(app):
+    u = _benutzer("anna", "4711")
+    assert u.pin == "" and u.pin_hash and u.pin_index == pin_index_from_pin("4711")
+    assert user_fuer_pin(" 4711 ").id == u.id
+    assert user_fuer_pin("4712") is None
+    assert user_fuer_pin("") is None
+
+
+def test_kein_alter_pepper_ohne_umgebungsvariable(app):
+    assert app.config["PIN_PEPPER_ALT"] is None
+    u = _benutzer("bernd", "1234")
+    u.pin_index = pin_index_from_pin("1234", "default-pepper")
+    db.session.commit()
+    assert user_fuer_pin("1234") is None
+
+
+def test_umschluesseln_mit_pin_pepper_alt(app, monkeypatch):
+    u = _benutzer("clara", "2468")
+    u.pin_index = pin_index_from_pin("2468", "alter-pepper")
+    db.session.commit()
+    monkeypatch.setitem(app.config, "PIN_PEPPER_ALT", "alter-pepper")
+    assert user_fuer_pin("2468").id == u.id
+    db.session.expire_all()
+    assert db.session.get(User, u.id).pin_index == pin_index_from_pin("2468")
+
+
+def test_pepper_datei_zufaellig_und_stabil(tmp_path):
+    p1 = pepper_laden(str(tmp_path))
+    assert len(p1) == 64 and p1 == pepper_laden(str(tmp_path))
+    assert stat.S_IMODE(os.stat(tmp_path / PEPPER_DATEI).st_mode) == 0o600
+    (tmp_path / "andere").mkdir()
+    assert pepper_laden(str(tmp_path / "andere")) != p1         # jede Installation eigener Pepper
+
+
+
+def _fehlversuche(client, ip: str, anzahl: int) -> None:
+    for _ in range(anzahl):
+        client.post("/login", data={"pin": "9999"}, headers={"X-Forwarded-For": ip},
+                    environ_base={"REMOTE_ADDR": "10.0.0.1"})
+
+
+@pytest.fixture
+def hinter_proxy(monkeypatch):
+    monkeypatch.setenv("PROXY_ANZAHL", "1")
+
+
+def test_drossel_hinter_proxy_je_client(hinter_proxy, app, client, monkeypatch):
+    from eiermanager.security import login_drossel
+    monkeypatch.setattr(login_drossel, "_eintraege", type(login_drossel._eintraege)())
+
+    _fehlversuche(client, "192.168.1.20", login_drossel.max_versuche)
+    assert login_drossel.wartezeit("192.168.1.20") > 0
+    assert login_drossel.wartezeit("10.0.0.1") == 0             # Proxy-Adresse bleibt frei
+    r = client.post("/login", data={"pin": "0000"}, headers={"X-Forwarded-For": "192.168.1.21"},
+                    environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    assert r.status_code == 302 and r.location.endswith("/dashboard")
@@ -0,0 +1,37 @@
+# tests/test_sqlite_profil.py
+"""Wiederholung bei gesperrter DB: nur für markierte Views, nur bei "database is locked"."""
+import pytest
+from sqlalchemy.exc import OperationalError
+from eiermanager.sqlite_profil import mit_wiederholung
+
+
+def _gesperrt_bis(versuch: int, aufrufe: list):
+    @mit_wiederholung
+    def view():
+        aufrufe.append(1)
+        if len(aufrufe) < versuch:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return "ok"
+    return view
+
+
+def test_wiederholt_bis_frei(app):
+    assert app.config["SQLITE_PROFIL"]
+    aufrufe = []
+    with app.test_request_context(method="POST"):
+        assert _gesperrt_bis(3, aufrufe)() == "ok"
+    assert len(aufrufe) == 3
+
+
+def test_gibt_nach_letztem_versuch_auf(app):
+    aufrufe = []
+    with app.test_request_context(method="POST"), pytest.raises(OperationalError):
+        _gesperrt_bis(99, aufrufe)()
+    assert len(aufrufe) == app.config["SQLITE_WIEDERHOLUNGEN"]
+
+
+def test_lesende_requests_ohne_wiederholung(app):
+    aufrufe = []
+    with app.test_request_context(method="GET"), pytest.raises(OperationalError):
+        _gesperrt_bis(2, aufrufe)()
+    assert len(aufrufe) == 1
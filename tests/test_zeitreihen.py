@@ -0,0 +1,46 @@
+# tests/test_zeitreihen.py
+"""Zeitreihen: Cache folgt Log- und Stall-Änderungen, Alt-Buchungen werden zugeordnet."""
+from datetime import date
+from sqlalchemy import insert
+from eiermanager.extensions import db
+from eiermanager.models import LogEntry, Mobilstall
+from eiermanager.zeitreihen import serie, OHNE_STALL
+
+HEUTE = date.today()
+
+
+def _alt_buchungen(*zeilen) -> None:
+    """Buchungen wie vor den strukturierten Spalten (ohne stall_id/kategorie)."""
+    db.session.execute(insert(LogEntry.__table__), [
+        {"datum": HEUTE, "typ": typ, "menge": menge, "name": name, "benutzer": "alt"} for typ, menge, name in zeilen
+    ])
+    db.session.commit()
+
+
+def test_stall_umbenennen_leert_cache(app):
+    stall = Mobilstall.query.order_by(Mobilstall.id).first()
+    db.session.add(LogEntry(datum=HEUTE, typ="zugang", menge=9, name=f"Produktion {stall.name}",
+                            benutzer="test", stall_id=stall.id))
+    db.session.commit()
+    alt = stall.name
+    assert serie(HEUTE, HEUTE, aufteilung="stall")["serien"][alt] == [9]
+
+    stall.name = "Umbenannt"
+    db.session.commit()
+    serien = serie(HEUTE, HEUTE, aufteilung="stall")["serien"]
+    assert serien["Umbenannt"] == [9] and alt not in serien
+
+
+def test_alt_buchungen_ohne_stall(app):
+    stall = Mobilstall.query.order_by(Mobilstall.id).first()
+    _alt_buchungen(("zugang", 4, f"Produktion {stall.name}"), ("zugang", 3, "Zugang Nachbar"))
+    daten = serie(HEUTE, HEUTE, aufteilung="stall")
+    assert daten["serien"][stall.name] == [4]
+    assert daten["serien"][OHNE_STALL] == [3]
+    assert daten["unvollstaendig"] is True
+
+
+def test_alt_buchungen_ohne_kategorie(app):
+    _alt_buchungen(("abgang", 2, "Bruch"), ("abgang", 5, "Abo Müller"), ("abgang", 1, "Irgendwas"))
+    serien = serie(HEUTE, HEUTE, aufteilung="kategorie")["serien"]
+    assert (serien["defekt"], serien["abo"], serien["sonstiges"]) == ([2], [5], [1])